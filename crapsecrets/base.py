@@ -1,20 +1,360 @@
 import re
 import os
+import sys
 import gzip
 import base64
 import hashlib
 import binascii
+import threading
+import multiprocessing
+import concurrent.futures
 import httpx
 import crapsecrets.errors
+from crapsecrets.resource_pack import DEFAULT_PACK_PATH, load_pack
+from crapsecrets.derived_keys import DerivedKeyCache, derived_keys_dir
 from abc import abstractmethod
 import zlib, bz2, lzma
 from enum import Enum, auto
+from itertools import chain
+from collections import OrderedDict
+from contextlib import suppress
+from functools import partial
 import traceback
+from array import array
 
 generic_base64_regex = re.compile(
     r"^(?:[A-Za-z0-9+\/]{4}){8,}(?:[A-Za-z0-9+\/]{4}|[A-Za-z0-9+\/]{3}=|[A-Za-z0-9+\/]{2}={2})$"
 )
 
+# Stable shard (1 to count) of a candidate key, the same in every process and on every platform
+def key_shard(key, count):
+    return zlib.crc32(key.encode("utf-8", "surrogatepass")) % count + 1
+
+
+# Parses a shard given as "i/N" or (i, N), where 1 <= i <= N
+def parse_shard(shard):
+    if isinstance(shard, str):
+        try:
+            shard = tuple(int(n) for n in shard.split("/"))
+        except ValueError:
+            raise ValueError(f"Invalid shard [{shard}]: expected i/N") from None
+    if len(shard) != 2 or not 1 <= shard[0] <= shard[1]:
+        raise ValueError(f"Invalid shard {shard}: expected i/N with 1 <= i <= N")
+    return tuple(shard)
+
+
+class KeyShard:
+    """Read-only sequence of the entries of keys at the given indices (one shard of a wordlist)"""
+
+    def __init__(self, keys, indices):
+        self.keys = keys
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        return self.keys[self.indices[i]]
+
+    def __iter__(self):
+        keys = self.keys
+        for i in self.indices:
+            yield keys[i]
+
+
+class MachineKeyStore:
+    """
+    Immutable ASP.NET machine keys, from "validationKey,decryptionKey" lines, shared by the modules using them.
+
+    validation[i] and decryption[i] are the keys of line i as written (blank lines and comments skipped, first
+    occurrence of a line kept), so the pairing is by index. Their unhexlified bytes are packed in one buffer per
+    side with an offset array; validation_bytes(i)/decryption_bytes(i) is None for the keys which are not hex
+    (AutoGenerate, broken lines), which the searches skip.
+    """
+
+    def __init__(self, validation, decryption):
+        self.validation = tuple(validation)
+        self.decryption = tuple(decryption)
+        self._validation = self.pack(self.validation)
+        self._decryption = self.pack(self.decryption)
+        self._merged = None
+
+    @classmethod
+    def from_lines(cls, lines):
+        validation = []
+        decryption = []
+        for line in dict.fromkeys(l.strip() for l in lines):
+            if not line or line.startswith("#"):
+                continue
+            with suppress(ValueError):
+                # Split only at the first comma in case keys contain commas
+                validation_key, decryption_key = line.split(",", 1)
+                validation.append(validation_key.strip())
+                decryption.append(decryption_key.strip())
+        return cls(validation, decryption)
+
+    # Returns (buffer, offsets): the bytes of keys[i] are buffer[offsets[i]:offsets[i + 1]], empty when not hex
+    @staticmethod
+    def pack(keys):
+        buffer = bytearray()
+        offsets = array("I", [0])
+        for key in keys:
+            with suppress(binascii.Error):
+                buffer += binascii.unhexlify(key)
+            offsets.append(len(buffer))
+        return bytes(buffer), offsets
+
+    @staticmethod
+    def unpack(packed, i):
+        buffer, offsets = packed
+        start, stop = offsets[i], offsets[i + 1]
+        return buffer[start:stop] if stop > start else None
+
+    def __len__(self):
+        return len(self.validation)
+
+    def validation_bytes(self, i):
+        return self.unpack(self._validation, i)
+
+    def decryption_bytes(self, i):
+        return self.unpack(self._decryption, i)
+
+    # [(key, bytes)] of each side, by index
+    def validation_keys(self):
+        return [(key, self.validation_bytes(i)) for i, key in enumerate(self.validation)]
+
+    def decryption_keys(self):
+        return [(key, self.decryption_bytes(i)) for i, key in enumerate(self.decryption)]
+
+    # The store of --allviewstatekeys: every distinct key of either side, tried both as validation and decryption key
+    def merged(self):
+        if self._merged is None:
+            keys = [key for key in dict.fromkeys(self.validation + self.decryption) if key.strip()]
+            self._merged = MachineKeyStore(keys, keys)
+        return self._merged
+
+    def size(self):
+        return sum(sys.getsizeof(k) for k in self.validation + self.decryption) + len(self._validation[0]) + len(self._decryption[0])
+
+
+class ResourceCache:
+    """
+    Process-wide LRU cache of decoded wordlists shared by every module (and custom resources).
+
+    Each file is read once, right-stripped and de-duplicated (keeping the first occurrence). Entries are keyed by
+    the absolute path plus mtime/size, so an edited file is picked up on its next use. Merged lists built for a
+    combination of files share their strings with the per-file entries. max_bytes caps the (approximate) memory
+    held by the cache; the least recently used lists are evicted first and a list larger than the cap is not cached.
+
+    When a compiled wordlist pack (see crapsecrets.resource_pack) is up to date with the requested files, the lists
+    are served straight from the memory-mapped pack instead and only their entry indices are cached.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, pack_path=DEFAULT_PACK_PATH):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.pack_path = pack_path
+        self._pack = None
+        self._pack_loaded = False
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get_pack(self):
+        with self._lock:
+            if not self._pack_loaded:
+                self._pack = load_pack(self.pack_path) if self.pack_path else None
+                self._pack_loaded = True
+            return self._pack
+
+    @staticmethod
+    def file_signature(filepath):
+        st = os.stat(filepath)
+        return (os.path.abspath(filepath), st.st_mtime_ns, st.st_size)
+
+    # Which backend serves filepaths and the signature of every file, so a checkpoint can tell the keys it was made
+    # with from those of edited files or of another backend (the order of the keys differs)
+    def files_identity(self, filepaths):
+        pack = self.get_pack()
+        backend = "pack" if pack and all(pack.is_fresh(f) for f in filepaths) else "text"
+        return (backend,) + tuple(self.file_signature(f) for f in filepaths)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self._pack = None
+            self._pack_loaded = False
+
+    def load_file(self, filepath):
+        key = ("file",) + self.file_signature(filepath)
+        lines = self.get(key)
+        if lines is None:
+            with open(filepath, encoding="utf-8") as r:
+                lines = tuple(dict.fromkeys(l.rstrip() for l in r))
+            self.put(key, lines, sys.getsizeof(lines) + sum(sys.getsizeof(l) for l in lines))
+        return lines
+
+    def load_files(self, filepaths):
+        pack = self.get_pack()
+        if pack and all(pack.is_fresh(f) for f in filepaths):
+            key = ("pack",) + tuple(os.path.abspath(f) for f in filepaths)
+            lines = self.get(key)
+            if lines is None:
+                lines = pack.wordlist(filepaths)
+                self.put(key, lines, sys.getsizeof(lines.indices))
+            return lines
+        if len(filepaths) == 1:
+            return self.load_file(filepaths[0])
+        key = ("merged",) + tuple(self.file_signature(f) for f in filepaths)
+        lines = self.get(key)
+        if lines is None:
+            lines = tuple(dict.fromkeys(chain.from_iterable(self.load_file(f) for f in filepaths)))
+            # The strings themselves are owned by the per-file entries, only the tuple is new
+            self.put(key, lines, sys.getsizeof(lines))
+        return lines
+
+    # Returns (load_files(filepaths), indices of its entries in shard (i, N)), see key_shard
+    def load_shard(self, filepaths, shard):
+        lines = self.load_files(filepaths)
+        key = ("shard", type(lines).__name__, shard) + tuple(self.file_signature(f) for f in filepaths)
+        indices = self.get(key)
+        if indices is None:
+            index, count = shard
+            indices = array("I", (n for n, l in enumerate(lines) if key_shard(l, count) == index))
+            self.put(key, indices, sys.getsizeof(indices))
+        return lines, indices
+
+    # Returns the stripped lines of filepaths (only those of shard (i, N) when given) encoded with encoding, in the
+    # order of load_files / load_shard
+    def load_encoded(self, filepaths, encoding, shard=None):
+        key = ("encoded", encoding, shard) + tuple(self.file_signature(f) for f in filepaths)
+        encoded = self.get(key)
+        if encoded is None:
+            lines = KeyShard(*self.load_shard(filepaths, shard)) if shard else self.load_files(filepaths)
+            encoded = tuple(l.strip().encode(encoding, errors="ignore") for l in lines)
+            self.put(key, encoded, sys.getsizeof(encoded) + sum(sys.getsizeof(e) for e in encoded))
+        return encoded
+
+    # Returns the MachineKeyStore of the lines of filepaths (only those of shard (i, N) when given)
+    def load_machine_keys(self, filepaths, shard=None):
+        key = ("machinekeys", shard) + tuple(self.file_signature(f) for f in filepaths)
+        store = self.get(key)
+        if store is None:
+            lines = KeyShard(*self.load_shard(filepaths, shard)) if shard else self.load_files(filepaths)
+            store = MachineKeyStore.from_lines(lines)
+            self.put(key, store, store.size())
+        return store
+
+
+# Shared by all modules; adjust resource_cache.max_bytes to change the memory cap
+resource_cache = ResourceCache()
+
+# Derived keys are kept in memory, and only persisted across runs when CRAPSECRETS_CACHE_DIR is set; set
+# derived_key_cache.cache_dir to a directory to save them there
+derived_key_cache = DerivedKeyCache(derived_keys_dir())
+
+
+class KeySearch:
+    """
+    A key_major_search split into shards of consecutive keys, scanned by worker threads or processes.
+
+    best[i] is the lowest key index that matched target i so far (len(keys) while none did). A shard skips the
+    targets an earlier key already matched and returns as soon as none is left, so the first hit cancels the
+    shards after it while the result stays the one a serial walk of the keys would find.
+    """
+
+    # How many keys a shard checks between two looks at the other shards' hits
+    refresh_interval = 64
+
+    def __init__(self, targets, keys, verify, prepare_key, best, lock):
+        self.targets = targets
+        self.keys = keys
+        self.verify = verify
+        self.prepare_key = prepare_key
+        self.best = best
+        self.lock = lock
+
+    # Returns {target index: (key index, result)} for keys[start:stop]
+    def scan(self, start, stop):
+        found = {}
+        best = self.best
+        pending = [(i, target) for i, target in enumerate(self.targets) if best[i] > start]
+        for n in range(start, stop):
+            if not (n - start) % self.refresh_interval:
+                pending = [(i, target) for i, target in pending if best[i] > n]
+            if not pending:
+                break
+            key = self.keys[n]
+            prepared_key = self.prepare_key(key) if self.prepare_key else key
+            if prepared_key is None:
+                continue
+            hit = False
+            for i, target in pending:
+                r = self.verify(target, prepared_key, key)
+                if r:
+                    found[i] = (n, r)
+                    hit = True
+                    with self.lock:
+                        if n < best[i]:
+                            best[i] = n
+            if hit:
+                pending = [(i, target) for i, target in pending if i not in found]
+        return found
+
+
+# Worker processes are forked with the search they run, so verify/prepare_key can be closures over the module
+_process_key_search = None
+
+
+# The context worker processes are forked with, or None to use threads instead: on platforms without fork, and while
+# any other thread runs in the process (the carve_all_modules pool, the daemon handlers, the --url-file threads, but
+# also unrelated library threads) since a child forked then can deadlock on a lock one of them held. Only one thread
+# can start a process search, so they never overlap. (The ViewState key pool does not fork, see key_worker_context.)
+def worker_fork_context():
+    if threading.active_count() > 1:
+        return None
+    with suppress(ValueError):
+        return multiprocessing.get_context("fork")
+    return None
+
+
+# Modules whose process searches fell back to threads, each reported once per process
+_process_fallback_reported = set()
+
+
+def report_process_fallback(module_name, thread_number):
+    if module_name not in _process_fallback_reported:
+        _process_fallback_reported.add(module_name)
+        print(
+            f"{module_name}: other threads are running, so its keys are checked by {thread_number} threads instead of worker processes (--use-processes)",
+            file=sys.stderr,
+        )
+
+
+def _scan_in_process(start, stop):
+    return _process_key_search.scan(start, stop)
+
+
 class Section(Enum):
     BODY = auto()
     COOKIES = auto()
@@ -42,8 +382,38 @@ class CrapsecretsBase:
 
     product_group_number_in_carve = 0
 
-    def __init__(self, custom_resource=None, **kwargs):
+    # Workers used to walk the wordlists (see key_major_search), threads unless use_processes is set
+    thread_number = 1
+    use_processes = False
+
+    # Modules whose carve is dominated by their own key search: with use_processes, carve_all_modules runs their carve
+    # tasks on the calling thread instead of its thread pool
+    carve_on_caller = False
+
+    # Smallest number of keys handed to one worker
+    min_shard_size = 1024
+
+    # (i, N): only the candidate keys of keyspace shard i out of N are tried (see key_shard), so N nodes can split
+    # one job between them. None tries every key.
+    shard = None
+
+    # crapsecrets.checkpoint.Checkpoint the key searches save their progress to (and resume from)
+    checkpoint = None
+
+    def __init__(self, custom_resource=None, num_threads=None, use_processes=None, shard=None, checkpoint=None, **kwargs):
         self.custom_resource = custom_resource
+        if num_threads and num_threads > 0:
+            self.thread_number = num_threads
+        if use_processes is not None:
+            self.use_processes = use_processes
+        if shard:
+            self.shard = parse_shard(shard)
+        if checkpoint:
+            self.checkpoint = checkpoint
+        # Modules update their severity as they check, which must not leak into the class or other instances
+        self.description = dict(self.description)
+        # files_identity of every resource list loaded, part of the identity of the checkpointed searches
+        self.loaded_resources = {}
 
         if self.custom_resource:
             if not os.path.exists(self.custom_resource):
@@ -55,6 +425,133 @@ class CrapsecretsBase:
     def check_secret(self, secret):
         raise NotImplementedError
 
+    # One result (or None) per product, in order. A product is the value itself, or a tuple of arguments for modules
+    # taking several. Modules with per-key work override this to walk their wordlist once for the whole batch.
+    def check_secrets(self, products):
+        return [self.check_secret(*p) if isinstance(p, tuple) else self.check_secret(p) for p in products]
+
+    # Walks the keys once for all the targets: keys on the outside, targets on the inside, so whatever prepare_key
+    # derives from a key is computed once and shared by every target. verify(target, prepared_key, key) returns a
+    # result or None; a target is dropped after its first hit. Returns {target index: result}.
+    # With thread_number > 1 the keys are split into shards checked in parallel (see KeySearch). With a checkpoint,
+    # the keys done and the hits are saved as the search goes and an interrupted search resumes where it stopped.
+    def key_major_search(self, targets, keys, verify, prepare_key=None):
+        progress = None
+        if self.thread_number > 1 or self.checkpoint:
+            targets = list(targets)
+            if not hasattr(keys, "__getitem__"):
+                keys = list(keys)
+        if self.checkpoint:
+            progress = self.checkpoint.search(
+                type(self).__name__,
+                getattr(verify, "__qualname__", None),
+                getattr(prepare_key, "__qualname__", None),
+                repr(targets),
+                len(keys),
+                sorted(self.loaded_resources),
+                self.shard,
+            )
+            if progress.complete:
+                return {int(i): r for i, r in progress.found().items()}
+        if self.thread_number > 1 and targets and len(keys) >= self.min_shard_size * 2:
+            return self.parallel_key_major_search(targets, keys, verify, prepare_key, progress)
+        if progress:
+            return self.resumable_key_major_search(targets, keys, verify, prepare_key, progress)
+
+        found = {}
+        pending = list(enumerate(targets))
+        for key in keys:
+            if not pending:
+                break
+            prepared_key = prepare_key(key) if prepare_key else key
+            if prepared_key is None:
+                continue
+            hit = False
+            for i, target in pending:
+                r = verify(target, prepared_key, key)
+                if r:
+                    found[i] = r
+                    hit = True
+            if hit:
+                pending = [(i, target) for i, target in pending if i not in found]
+        return found
+
+    # Serial key_major_search saving its progress: the keys done (every refresh_interval keys) and each hit
+    def resumable_key_major_search(self, targets, keys, verify, prepare_key, progress):
+        found = {int(i): r for i, r in progress.found().items()}
+        pending = [(i, target) for i, target in enumerate(targets) if i not in found]
+        refresh_interval = KeySearch.refresh_interval * 16
+        for start, stop in progress.remaining(len(keys)):
+            mark = start
+            for n in range(start, stop):
+                if not pending:
+                    break
+                key = keys[n]
+                prepared_key = prepare_key(key) if prepare_key else key
+                if prepared_key is not None:
+                    hit = False
+                    for i, target in pending:
+                        r = verify(target, prepared_key, key)
+                        if r:
+                            found[i] = r
+                            progress.add_found(i, r)
+                            hit = True
+                    if hit:
+                        pending = [(i, target) for i, target in pending if i not in found]
+                if n + 1 - mark >= refresh_interval:
+                    progress.done(mark, n + 1)
+                    mark = n + 1
+            if not pending:
+                break
+            progress.done(mark, stop)
+        progress.finish()
+        return found
+
+    def parallel_key_major_search(self, targets, keys, verify, prepare_key=None, progress=None):
+        global _process_key_search
+        # A few shards per worker, so the workers that finish early pick up more work
+        shard_size = max(self.min_shard_size, -(-len(keys) // (self.thread_number * 4)))
+        # Only the keys not done yet when resuming
+        ranges = progress.remaining(len(keys)) if progress else [(0, len(keys))]
+        shards = [(start, min(start + shard_size, stop)) for first, stop in ranges for start in range(first, stop, shard_size)]
+        starts = [start for start, _ in shards]
+        stops = [stop for _, stop in shards]
+
+        # Targets solved before a resume are not searched again
+        found = {int(i): r for i, r in progress.found().items()} if progress else {}
+        best = [-1 if i in found else len(keys) for i in range(len(targets))]
+
+        fork_context = worker_fork_context() if self.use_processes else None
+        if self.use_processes and not fork_context:
+            report_process_fallback(type(self).__name__, self.thread_number)
+        if fork_context:
+            best = fork_context.Array("q", best)
+            _process_key_search = KeySearch(targets, keys, verify, prepare_key, best, best.get_lock())
+            try:
+                with concurrent.futures.ProcessPoolExecutor(self.thread_number, mp_context=fork_context) as executor:
+                    self.merge_key_search_shards(executor.map(_scan_in_process, starts, stops), starts, stops, found, progress)
+            finally:
+                _process_key_search = None
+        else:
+            search = KeySearch(targets, keys, verify, prepare_key, best, threading.Lock())
+            with concurrent.futures.ThreadPoolExecutor(self.thread_number) as executor:
+                self.merge_key_search_shards(executor.map(search.scan, starts, stops), starts, stops, found, progress)
+        if progress:
+            progress.finish()
+        return found
+
+    # Shards come back in key order, so the first one to match a target has its lowest matching key
+    @staticmethod
+    def merge_key_search_shards(shard_results, starts, stops, found, progress=None):
+        for start, stop, shard_found in zip(starts, stops, shard_results):
+            for i, (n, r) in shard_found.items():
+                if i not in found:
+                    found[i] = r
+                    if progress:
+                        progress.add_found(i, r)
+            if progress:
+                progress.done(start, stop)
+
     @staticmethod
     def attempt_decompress(value):
         try:
@@ -94,17 +591,16 @@ class CrapsecretsBase:
         return self.description
 
     def get_product_from_carve(self, regex_search):
-        global x
         target = 0
-        if x.product_group_number_in_carve and isinstance(x.product_group_number_in_carve, list):
-            for target in x.product_group_number_in_carve:
+        if self.product_group_number_in_carve and isinstance(self.product_group_number_in_carve, list):
+            for target in self.product_group_number_in_carve:
                 if(len(regex_search.groups()) < target + 1):
                     target = 0
                     break
                 elif regex_search.groups()[target]:
                     break
-        elif x.product_group_number_in_carve:
-            target = x.product_group_number_in_carve
+        elif self.product_group_number_in_carve:
+            target = self.product_group_number_in_carve
         product = regex_search.groups()[target]
         if product == None:
             product = "Unknown"
@@ -113,7 +609,7 @@ class CrapsecretsBase:
     def get_hashcat_commands(self, s):
         return None
 
-    def load_resources(self, resource_list, is_custom=False):
+    def resource_filepaths(self, resource_list, is_custom=False):
         filepaths = []
         if self.custom_resource:
             filepaths.append(self.custom_resource)
@@ -123,17 +619,51 @@ class CrapsecretsBase:
         else:
             for r in resource_list:
                 filepaths.append(f"{os.path.dirname(os.path.abspath(__file__))}/resources/{r}")
-        for filepath in filepaths:
-            with open(filepath, encoding="utf-8") as r:
-                for l in r.readlines():
-                    if len(l) > 0:
-                        yield l
+        return filepaths
+
+    # files_identity of the resources (see load_resources)
+    def resources_identity(self, resource_list, is_custom=False):
+        return resource_cache.files_identity(self.resource_filepaths(resource_list, is_custom))
+
+    def record_resources(self, filepaths):
+        if self.checkpoint:
+            self.loaded_resources[resource_cache.files_identity(filepaths)] = True
+
+    # Returns the de-duplicated, right-stripped lines of all the resources (custom resource first) from the shared cache,
+    # or only the ones in self.shard
+    def load_resources(self, resource_list, is_custom=False):
+        filepaths = self.resource_filepaths(resource_list, is_custom)
+        self.record_resources(filepaths)
+        if self.shard:
+            return KeyShard(*resource_cache.load_shard(filepaths, self.shard))
+        return resource_cache.load_files(filepaths)
+
+    # Returns the MachineKeyStore of the machine key files (see load_resources)
+    def load_machine_keys(self, resource_list, is_custom=False):
+        filepaths = self.resource_filepaths(resource_list, is_custom)
+        self.record_resources(filepaths)
+        return resource_cache.load_machine_keys(filepaths, self.shard)
+
+    # Returns the stripped lines of the resources (see load_resources) encoded with encoding, built once per process
+    def load_encoded_resources(self, resource_list, encoding, is_custom=False):
+        filepaths = self.resource_filepaths(resource_list, is_custom)
+        self.record_resources(filepaths)
+        return resource_cache.load_encoded(filepaths, encoding, self.shard)
+
+    # Returns (keys, derived) where derived[i] is derive(keys[i]) (record_size bytes, or None), read from the
+    # persistent derived key cache and only computed the first time a given version of the resources is used
+    def load_derived_resources(self, resource_list, name, derive, record_size, is_custom=False):
+        filepaths = self.resource_filepaths(resource_list, is_custom)
+        keys = self.load_resources(resource_list, is_custom)
+        # A node only derives the keys of its own shard
+        if self.shard:
+            name = f"{name}-shard-{self.shard[0]}-of-{self.shard[1]}"
+        return keys, derived_key_cache.table(name, filepaths, keys, derive, record_size)
 
     def carve_to_check_secret(self, s, **kwargs):
-        global x
         target = 0
-        if x.product_group_number_in_carve:
-            target = x.product_group_number_in_carve
+        if self.product_group_number_in_carve:
+            target = self.product_group_number_in_carve
         if s.groups():
             r = self.check_secret(s.groups()[target])
             return r
@@ -143,8 +673,15 @@ class CrapsecretsBase:
         return None
 
     def carve(self, body=None, cookies=None, headers=None, requests_response=None, **kwargs):
-        global x
         results = []
+        for task in self.carve_tasks(body, cookies, headers, requests_response, **kwargs):
+            results += task()
+        return self.carve_results(results)
+
+    # Splits a carve into independent tasks, one per cookie, header and body: each task is a callable returning a
+    # list of results. carve() runs them in order, carve_all_modules() runs the tasks of all modules concurrently.
+    def carve_tasks(self, body=None, cookies=None, headers=None, requests_response=None, **kwargs):
+        tasks = []
         if not body and not cookies and not headers and requests_response == None:
             raise crapsecrets.errors.CarveException("Either body/headers/cookies or requests_response required")
 
@@ -171,71 +708,87 @@ class CrapsecretsBase:
         if cookies and Section.COOKIES in self.supported_sections:
             if type(cookies) != dict:
                 raise crapsecrets.errors.CarveException("Header argument must be type dict")
-            for k, v in cookies.items():
-                r = self.check_secret(v)
-                if r:
-                    r["type"] = "SecretFound"
-                    r["product"] = v
-                    r["location"] = "cookies"
-                    results.append(r)
+            for v in cookies.values():
+                tasks.append(partial(self.carve_cookie, v))
         
         if headers and Section.HEADERS in self.supported_sections:
             for header_value in headers.values():
-                # Check if we have a match outright
-                r = self.check_secret(header_value)
-                if r:
-                    r["type"] = "SecretFound"
-                    r["product"] = header_value
-                    r["location"] = "headers"
-                    results.append(r)
-                # If we dont, we will only be able to add context if we have a match with carve_regex()
-                elif self.carve_regex():
-                    s = re.search(self.carve_regex(), header_value)
-                    if s:
-                        r = self.carve_to_check_secret(s)
-                        if r:
-                            r["type"] = "SecretFound"
-                        # the carve regex hit but no secret was found
-                        else:
-                            r = {"type": "IdentifyOnly"}
-                            target = 0
-                            if x.product_group_number_in_carve:
-                                target = x.product_group_number_in_carve
-                            r["hashcat"] = self.get_hashcat_commands(s.groups()[target])
-                        if "product" not in r.keys():
-                            r["product"] = self.get_product_from_carve(s)
-                        r["location"] = "headers"
-                        results.append(r)
+                tasks.append(partial(self.carve_header, header_value))
     
         if body and Section.BODY in self.supported_sections:
             if type(body) != str:
                 raise crapsecrets.errors.CarveException("Body argument must be type str")
             if self.carve_regex():
-                s = re.search(self.carve_regex(), body)
-                if s:
-                    res = self.carve_to_check_secret(s, url=kwargs.get("url", None), requests_response=requests_response, isFromBody=True, client=kwargs.get("client", None), commandargs=kwargs.get("commandargs", None))
-                    if isinstance(res, dict):
-                        res = [res]
-                    if res:
-                        for r in res:
-                            if r:
-                                r["type"] = "SecretFound"
-                            else:
-                                r = {"type": "IdentifyOnly"}
-                                r["hashcat"] = self.get_hashcat_commands(self.get_product_from_carve(s))
-                            if "product" not in r.keys():
-                                temp_product = self.get_product_from_carve(s)
-                                if len(temp_product) > 200:
-                                    r["product"] = temp_product[:100] + "..." + temp_product[-10:]
-                                else:
-                                    r["product"] = temp_product
-                            r["location"] = "body"
-                            if kwargs.get("url"):
-                                r["location"] += " - URL: " + kwargs.get("url")
-                            results.append(r)
-    
+                tasks.append(partial(self.carve_body, body, requests_response, **kwargs))
+        return tasks
+
+    def carve_cookie(self, v):
+        r = self.check_secret(v)
+        if r:
+            r["type"] = "SecretFound"
+            r["product"] = v
+            r["location"] = "cookies"
+            return [r]
+        return []
+
+    def carve_header(self, header_value):
+        # Check if we have a match outright
+        r = self.check_secret(header_value)
+        if r:
+            r["type"] = "SecretFound"
+            r["product"] = header_value
+            r["location"] = "headers"
+            return [r]
+        # If we dont, we will only be able to add context if we have a match with carve_regex()
+        elif self.carve_regex():
+            s = re.search(self.carve_regex(), header_value)
+            if s:
+                r = self.carve_to_check_secret(s)
+                if r:
+                    r["type"] = "SecretFound"
+                # the carve regex hit but no secret was found
+                else:
+                    r = {"type": "IdentifyOnly"}
+                    target = 0
+                    if self.product_group_number_in_carve:
+                        target = self.product_group_number_in_carve
+                    r["hashcat"] = self.get_hashcat_commands(s.groups()[target])
+                if "product" not in r.keys():
+                    r["product"] = self.get_product_from_carve(s)
+                r["location"] = "headers"
+                return [r]
+        return []
+
+    def carve_body(self, body, requests_response=None, **kwargs):
+        results = []
+        s = re.search(self.carve_regex(), body)
+        if s:
+            res = self.carve_to_check_secret(s, url=kwargs.get("url", None), requests_response=requests_response, isFromBody=True, client=kwargs.get("client", None), commandargs=kwargs.get("commandargs", None))
+            if isinstance(res, dict):
+                res = [res]
+            if res:
+                for r in res:
+                    if r:
+                        r["type"] = "SecretFound"
+                    else:
+                        r = {"type": "IdentifyOnly"}
+                        r["hashcat"] = self.get_hashcat_commands(self.get_product_from_carve(s))
+                    if "product" not in r.keys():
+                        temp_product = self.get_product_from_carve(s)
+                        if len(temp_product) > 200:
+                            r["product"] = temp_product[:100] + "..." + temp_product[-10:]
+                        else:
+                            r["product"] = temp_product
+                    r["location"] = "body"
+                    if kwargs.get("url"):
+                        r["location"] += " - URL: " + kwargs.get("url")
+                    results.append(r)
+        return results
+
+    # Merges the results of the carve tasks (which may come with the description of the instance that ran them)
+    def carve_results(self, results):
         for r in results:
-            r["description"] = self.get_description()
+            r.setdefault("description", self.get_description())
     
         # Don't report an IdentifyOnly result if we have a SecretFound result for the same 'product'
         secret_found_results = set(d["product"] for d in results if d["type"] == "SecretFound")
@@ -255,7 +808,6 @@ class CrapsecretsBase:
 
 
 def hashcat_all_modules(product, detecting_module=None, *args):
-    global x
     hashcat_candidates = []
     for m in CrapsecretsBase.__subclasses__():
         if detecting_module == m.__name__ or detecting_module == None:
@@ -273,10 +825,22 @@ def hashcat_all_modules(product, detecting_module=None, *args):
     return hashcat_candidates
 
 
+# Constructor arguments of the modules created by the *_all_modules helpers below; the worker and shard settings
+# default to the ones of the CLI arguments (commandargs) when those are given
+def module_options(kwargs):
+    commandargs = kwargs.get("commandargs", None)
+    return {
+        "custom_resource": kwargs.get("custom_resource", None),
+        "num_threads": kwargs.get("num_threads", getattr(commandargs, "num_threads", None)),
+        "use_processes": kwargs.get("use_processes", getattr(commandargs, "use_processes", None)),
+        "shard": kwargs.get("shard", getattr(commandargs, "shard", None)),
+        "checkpoint": kwargs.get("checkpoint", getattr(commandargs, "checkpoint", None)),
+    }
+
+
 def check_all_modules(*args, **kwargs):
-    global x
     for m in CrapsecretsBase.__subclasses__():
-        x = m(custom_resource=kwargs.get("custom_resource", None))
+        x = m(**module_options(kwargs))
         r = x.check_secret(*args[0 : x.check_secret_args])
         if r:
             r["detecting_module"] = m.__name__
@@ -290,19 +854,91 @@ def check_all_modules(*args, **kwargs):
     return None
 
 
+# Batch version of check_all_modules: each token is a value or a tuple of check_secret arguments. Every module gets
+# all the tokens still unsolved in one check_secrets call, so modules walk their wordlists once per batch instead
+# of once per token. Returns one result (or None) per token, in order, with the same fields as check_all_modules.
+# modules optionally restricts the check to those module (class) names.
+def check_secrets_batch(tokens, modules=None, **kwargs):
+    results = [None] * len(tokens)
+    for m in CrapsecretsBase.__subclasses__():
+        if modules and m.__name__ not in modules:
+            continue
+        pending = [i for i, r in enumerate(results) if not r]
+        if not pending:
+            break
+        x = m(**module_options(kwargs))
+        args_list = [tuple(tokens[i]) if isinstance(tokens[i], (tuple, list)) else (tokens[i],) for i in pending]
+        products = [args[0] if x.check_secret_args == 1 else args[0 : x.check_secret_args] for args in args_list]
+        for i, args, r in zip(pending, args_list, x.check_secrets(products)):
+            # Modules returning several results (e.g. ASPNET_Viewstate) get every non-empty one annotated
+            found = [d for d in (r if isinstance(r, list) else [r]) if d]
+            if not found:
+                continue
+            for d in found:
+                d["detecting_module"] = m.__name__
+                d["description"] = x.get_description()
+                if "product" not in d.keys():
+                    d["product"] = args[0]
+                d["location"] = "manual"
+            results[i] = r
+    return results
+
+
+# Runs a carve task (see CrapsecretsBase.carve_tasks) on its own instance of module m, so concurrent tasks do not share
+# the state a module keeps while checking (e.g. its severity). The results keep that instance's description.
+def run_carve_task(m, options, task):
+    x = m(**options)
+    results = partial(getattr(x, task.func.__name__), *task.args, **task.keywords)()
+    for r in results:
+        r["description"] = x.get_description()
+    return results
+
+
+# A finished future holding the result (or exception) of fn(*args), run on the calling thread
+def run_on_caller(fn, *args):
+    future = concurrent.futures.Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+# The carve tasks of every module (one per cookie, header and body) run concurrently on a shared executor of
+# carve_workers threads; the results are merged back per module, in module order, as a serial carve returns them.
+# With use_processes, the tasks of the carve_on_caller modules run first on the calling thread, before the pool
+# starts its threads, so their key searches can use worker processes.
 def carve_all_modules(**kwargs):
-    global x
     results = []
+    module_tasks = []
+    options = module_options(kwargs)
     for m in CrapsecretsBase.__subclasses__():
         try:
-            x = m(custom_resource=kwargs.get("custom_resource", None))
-            r_list = x.carve(**kwargs)
-            if len(r_list) > 0:
-                for r in r_list:
-                    r["detecting_module"] = m.__name__
-                    results.append(r)
+            x = m(**options)
+            module_tasks.append((m, x, x.carve_tasks(**kwargs)))
         except Exception as e:
             print(f"An error occurred in module {m.__name__}: {e}")
             traceback.print_exc()
+
+    caller_futures = {}
+    if options["use_processes"]:
+        for m, x, tasks in module_tasks:
+            if m.carve_on_caller:
+                caller_futures[m] = [run_on_caller(run_carve_task, m, options, task) for task in tasks]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=kwargs.get("carve_workers", None)) as executor:
+        module_futures = [
+            (m, x, caller_futures.get(m) or [executor.submit(run_carve_task, m, options, task) for task in tasks])
+            for m, x, tasks in module_tasks
+        ]
+        for m, x, futures in module_futures:
+            try:
+                r_list = x.carve_results(list(chain.from_iterable(f.result() for f in futures)))
+                for r in r_list:
+                    r["detecting_module"] = m.__name__
+                    results.append(r)
+            except Exception as e:
+                print(f"An error occurred in module {m.__name__}: {e}")
+                traceback.print_exc()
     if results:
         return results
\ No newline at end of file
@@ -0,0 +1,148 @@
+# Checkpoints of long key searches, so that an interrupted run can be resumed
+#
+# A checkpoint file holds the progress of every search of a run, keyed by a hash of what the search is about
+# (module, product, options, number of keys, ...):
+#   done:     merged [start, stop) ranges of the key indices fully tested
+#   cursors:  the position reached inside the keys being tested (e.g. apppath/mode/generator for ViewState)
+#   found:    the hits so far
+#   complete: whether the search is over
+# Bytes in the hits are stored as {"__bytes__": base64} and decoded back on load; any other value JSON does not know
+# is an error. It is rewritten atomically at most every interval seconds while the searches progress, on every hit and when
+# save() is called (e.g. on exit).
+
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+
+import crapsecrets.errors
+
+CHECKPOINT_VERSION = 1
+
+
+def merge_ranges(ranges):
+    merged = []
+    for start, stop in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], stop)
+        else:
+            merged.append([start, stop])
+    return merged
+
+
+def encode_value(value):
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise crapsecrets.errors.CheckpointException(f"Cannot save a {type(value).__name__} in a checkpoint")
+
+
+def decode_value(obj):
+    if len(obj) == 1 and "__bytes__" in obj:
+        return base64.b64decode(obj["__bytes__"])
+    return obj
+
+
+class SearchProgress:
+    """Progress of one search over a list of keys, stored in (and saved with) its Checkpoint"""
+
+    def __init__(self, checkpoint, state):
+        self.checkpoint = checkpoint
+        self.state = state
+
+    @property
+    def complete(self):
+        return self.state["complete"]
+
+    # The [start, stop) ranges of the key indices below count which are not done yet
+    def remaining(self, count):
+        with self.checkpoint.lock:
+            done = [tuple(r) for r in self.state["done"]]
+        ranges = []
+        position = 0
+        for start, stop in done:
+            if start > position:
+                ranges.append((position, min(start, count)))
+            position = max(position, stop)
+        if position < count:
+            ranges.append((position, count))
+        return [(start, stop) for start, stop in ranges if start < stop]
+
+    # Keys start to stop - 1 (or only start) have been fully tested
+    def done(self, start, stop=None):
+        if stop is None:
+            stop = start + 1
+        with self.checkpoint.lock:
+            self.state["done"] = merge_ranges(self.state["done"] + [[start, stop]])
+            cursors = self.state["cursors"]
+            for n in [n for n in cursors if start <= int(n) < stop]:
+                del cursors[n]
+        self.checkpoint.changed()
+
+    # The position reached inside key n (a tuple of loop indices), or None when it was not started
+    def cursor(self, n):
+        with self.checkpoint.lock:
+            cursor = self.state["cursors"].get(str(n))
+        return tuple(cursor) if cursor else None
+
+    def advance(self, n, cursor):
+        with self.checkpoint.lock:
+            self.state["cursors"][str(n)] = list(cursor)
+        self.checkpoint.changed()
+
+    def found(self):
+        with self.checkpoint.lock:
+            return dict(self.state["found"])
+
+    def add_found(self, key, value):
+        with self.checkpoint.lock:
+            self.state["found"][str(key)] = value
+        self.checkpoint.save()
+
+    def finish(self):
+        with self.checkpoint.lock:
+            self.state["complete"] = True
+            self.state["cursors"] = {}
+        self.checkpoint.save()
+
+
+class Checkpoint:
+    def __init__(self, path, interval=30, resume=False):
+        self.path = path
+        self.interval = interval
+        self.lock = threading.RLock()
+        self.last_save = time.monotonic()
+        self.searches = self.load(path) if resume else {}
+
+    @staticmethod
+    def load(path):
+        try:
+            with open(path) as f:
+                data = json.load(f, object_hook=decode_value)
+        except FileNotFoundError:
+            return {}
+        except ValueError as e:
+            raise crapsecrets.errors.CheckpointException(f"[{path}] is not a valid checkpoint: {e}")
+        if not isinstance(data, dict) or data.get("version") != CHECKPOINT_VERSION:
+            raise crapsecrets.errors.CheckpointException(f"[{path}] is not a supported checkpoint")
+        return data["searches"]
+
+    # The progress of the search described by identity (any repr()-stable values), resumed from the file if it is there
+    def search(self, *identity):
+        key = hashlib.sha1(repr(identity).encode()).hexdigest()
+        with self.lock:
+            state = self.searches.setdefault(key, {"done": [], "cursors": {}, "found": {}, "complete": False})
+        return SearchProgress(self, state)
+
+    def changed(self):
+        if time.monotonic() - self.last_save >= self.interval:
+            self.save()
+
+    def save(self):
+        with self.lock:
+            data = json.dumps({"version": CHECKPOINT_VERSION, "searches": self.searches}, default=encode_value)
+            self.last_save = time.monotonic()
+            with open(self.path + ".tmp", "w") as f:
+                f.write(data)
+            os.replace(self.path + ".tmp", self.path)
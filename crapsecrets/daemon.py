@@ -0,0 +1,315 @@
+# Long-running scanner daemon: keeps the modules, wordlists and derived keys loaded and serves checks and carves as
+# JSON over HTTP, on a local Unix socket (the default) or a TCP port
+#
+#   GET  /health  -> {"status": "ok", "modules": [...]}
+#   POST /check   {"tokens": [token or [arg, ...], ...], "modules": [...], "custom_resource": path, "shard": "i/N"}
+#                 -> {"results": [result or null, ...]}  (same results as check_secrets_batch)
+#   POST /carve   {"url": ..., "response_url": ..., "status_code": ..., "headers": [[name, value], ...],
+#                  "content": base64 body, "request_headers": {...}, "request_cookies": {...}, "options": {...}}
+#                 -> {"results": [...]}  (same results as carve_all_modules)
+#
+# There is no authentication: the Unix socket is only accessible to its owner, and a TCP daemon refuses to listen on
+# anything but a loopback address unless --allow-remote is given. The wordlists a request can name (custom_resource,
+# machinekeyfile) are limited to the ones allowed when the daemon starts.
+
+import os
+import sys
+import json
+import stat
+import socket
+import base64
+import argparse
+import ipaddress
+import traceback
+import http.client
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+import crapsecrets.errors
+from crapsecrets.base import CrapsecretsBase, check_secrets_batch, carve_all_modules, derived_key_cache, resource_cache
+from crapsecrets.derived_keys import default_cache_dir
+
+DEFAULT_ADDRESS = "unix:" + os.path.join(default_cache_dir(), "daemon.sock")
+
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
+
+# The CLI arguments read by the modules while carving, with the values used when a /carve request omits them
+carve_option_defaults = {
+    "allviewstatekeys": False,
+    "findviewstatepage": False,
+    "machinekeyfile": None,
+    "enable_viewstate_decryption": False,
+    "disable_active_path_check": False,
+    "debug": False,
+}
+
+# Response headers describing the transfer rather than the (already decoded) content
+transfer_headers = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+# Returns (socket family, address) for "unix:/path/to.sock" or "host:port" (optionally prefixed with http://)
+def parse_address(address):
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, os.path.expanduser(address[5:])
+    host, _, port = address.split("://", 1)[-1].rstrip("/").rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError(f"Invalid daemon address [{address}]: expected unix:/path/to.sock or host:port")
+    return socket.AF_INET, (host.strip("[]"), int(port))
+
+
+# The parts of a fetched httpx.Response a carve needs, as sent to /carve
+def response_payload(response, url=None):
+    return {
+        "url": url or str(response.url),
+        "response_url": str(response.url),
+        "status_code": response.status_code,
+        "headers": [[k, v] for k, v in response.headers.multi_items() if k.lower() not in transfer_headers],
+        "content": base64.b64encode(response.content).decode(),
+    }
+
+
+def payload_response(payload):
+    return httpx.Response(
+        payload.get("status_code", 200),
+        headers=payload.get("headers") or [],
+        content=base64.b64decode(payload.get("content") or ""),
+        request=httpx.Request("GET", payload.get("response_url") or payload["url"]),
+    )
+
+
+# Whether every address host resolves to is a loopback one
+def is_loopback(host):
+    try:
+        infos = socket.getaddrinfo(host, None)
+    except socket.gaierror:
+        return False
+    return bool(infos) and all(ipaddress.ip_address(info[4][0].split("%")[0]).is_loopback for info in infos)
+
+
+class ScannerDaemon:
+    # allowed_resources are the wordlist files requests may name, in addition to custom_resource
+    def __init__(self, custom_resource=None, num_threads=None, use_processes=None, carve_workers=None, timeout=30, allowed_resources=()):
+        self.custom_resource = custom_resource
+        self.allowed_resources = {os.path.realpath(f) for f in allowed_resources}
+        if custom_resource:
+            self.allowed_resources.add(os.path.realpath(custom_resource))
+        self.num_threads = num_threads
+        self.use_processes = use_processes
+        self.carve_workers = carve_workers
+        self.timeout = timeout
+
+    # Loads the wordlist pack (or every wordlist) into the shared resource cache; returns the number of wordlists
+    def warm(self):
+        filepaths = [os.path.join(RESOURCES_DIR, f) for f in sorted(os.listdir(RESOURCES_DIR)) if f.endswith(".txt")]
+        if self.custom_resource:
+            filepaths.append(self.custom_resource)
+        for filepath in filepaths:
+            resource_cache.load_files([filepath])
+        return len(filepaths)
+
+    def health(self):
+        return {"status": "ok", "modules": [m.__name__ for m in CrapsecretsBase.__subclasses__()]}
+
+    # A wordlist named by a request, which must be one of the allowed resources
+    def allowed_resource(self, filepath):
+        if not isinstance(filepath, str) or os.path.realpath(filepath) not in self.allowed_resources:
+            raise ValueError(f"[{filepath}] is not a resource allowed by this daemon (see --allow-resource)")
+        return filepath
+
+    def module_kwargs(self, payload):
+        custom_resource = payload.get("custom_resource")
+        return {
+            "custom_resource": self.allowed_resource(custom_resource) if custom_resource else self.custom_resource,
+            "num_threads": self.num_threads,
+            "use_processes": self.use_processes,
+            "shard": payload.get("shard"),
+        }
+
+    def check(self, payload):
+        tokens = payload.get("tokens")
+        if not isinstance(tokens, list):
+            raise ValueError("tokens must be a list")
+        return {"results": check_secrets_batch(tokens, modules=payload.get("modules"), **self.module_kwargs(payload))}
+
+    def carve(self, payload):
+        if not payload.get("url"):
+            raise ValueError("url is required")
+        response = payload_response(payload)
+        options = payload.get("options") or {}
+        if options.get("machinekeyfile"):
+            if not isinstance(options["machinekeyfile"], list):
+                raise ValueError("machinekeyfile must be a list")
+            for filepath in options["machinekeyfile"]:
+                self.allowed_resource(filepath)
+        commandargs = argparse.Namespace(
+            **{k: options.get(k, v) for k, v in carve_option_defaults.items()},
+            num_threads=self.num_threads,
+            use_processes=self.use_processes,
+            carve_workers=self.carve_workers,
+        )
+        # Modules sending their own requests (e.g. to find the ViewState application path) use this client
+        with httpx.Client(
+            headers=payload.get("request_headers") or {},
+            cookies=payload.get("request_cookies") or {},
+            verify=False,
+            follow_redirects=False,
+            trust_env=False,
+            timeout=self.timeout,
+        ) as client:
+            results = carve_all_modules(
+                requests_response=response,
+                url=payload["url"],
+                client=client,
+                commandargs=commandargs,
+                carve_workers=self.carve_workers,
+                **self.module_kwargs(payload),
+            )
+        return {"results": results or []}
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    server_version = "crapsecrets-daemon"
+    # Keep-alive, so that a client can send many small jobs over one connection
+    protocol_version = "HTTP/1.1"
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self.send_json(200, self.server.scanner.health())
+        else:
+            self.send_json(404, {"error": f"Unknown endpoint [{self.path}]"})
+
+    def do_POST(self):
+        handler = {"/check": self.server.scanner.check, "/carve": self.server.scanner.carve}.get(self.path)
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        except ValueError as e:
+            self.send_json(400, {"error": f"Invalid JSON: {e}"})
+            return
+        if handler is None:
+            self.send_json(404, {"error": f"Unknown endpoint [{self.path}]"})
+            return
+        if not isinstance(payload, dict):
+            self.send_json(400, {"error": "The request must be a JSON object"})
+            return
+        try:
+            self.send_json(200, handler(payload))
+        except (ValueError, TypeError, KeyError, crapsecrets.errors.BadsecretsException) as e:
+            self.send_json(400, {"error": str(e)})
+        except Exception as e:
+            traceback.print_exc()
+            self.send_json(500, {"error": str(e)})
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            sys.stderr.write(f"{self.command} {self.path} - {format % args}\n")
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# A TCP server only listens on a loopback address unless allow_remote is set
+def make_server(address, scanner, verbose=False, allow_remote=False):
+    family, target = parse_address(address)
+    if family != socket.AF_UNIX and not allow_remote and not is_loopback(target[0]):
+        raise crapsecrets.errors.DaemonException(
+            f"Refusing to listen on [{address}]: the daemon has no authentication, use a loopback address or --allow-remote"
+        )
+    if family == socket.AF_UNIX:
+        os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+        # A socket left behind by a daemon that was killed is replaced, anything else is not
+        if os.path.exists(target):
+            if not stat.S_ISSOCK(os.stat(target).st_mode):
+                raise crapsecrets.errors.DaemonException(f"[{target}] exists and is not a socket")
+            os.remove(target)
+        umask = os.umask(0o177)
+        try:
+            server = ThreadingUnixHTTPServer(target, DaemonRequestHandler)
+        finally:
+            os.umask(umask)
+    else:
+        server = ThreadingHTTPServer(target, DaemonRequestHandler)
+    server.scanner = scanner
+    server.verbose = verbose
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+# Sends one request to a running daemon (a GET when payload is None) and returns the decoded JSON answer
+def daemon_request(address, path, payload=None, timeout=None):
+    family, target = parse_address(address)
+    if family == socket.AF_UNIX:
+        conn = UnixHTTPConnection(target, timeout)
+    else:
+        conn = http.client.HTTPConnection(*target, timeout=timeout)
+    try:
+        if payload is None:
+            conn.request("GET", path)
+        else:
+            conn.request("POST", path, json.dumps(payload, default=str), {"Content-Type": "application/json"})
+        response = conn.getresponse()
+        data = json.loads(response.read() or b"{}")
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        raise crapsecrets.errors.DaemonException(f"Could not reach the crapsecrets daemon at [{address}]: {e}")
+    finally:
+        conn.close()
+    if response.status != 200:
+        raise crapsecrets.errors.DaemonException(f"The crapsecrets daemon returned an error ({response.status}): {data.get('error')}")
+    return data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve crapsecrets checks and carves from a warm process")
+    parser.add_argument("-l", "--listen", default=DEFAULT_ADDRESS, help=f"unix:/path/to.sock or host:port (default: {DEFAULT_ADDRESS})")
+    parser.add_argument("-c", "--custom-secrets", default=None, help="Include a custom list of secrets to check, in addition to the default lists")
+    parser.add_argument("-nt", "--num-threads", type=int, default=None, help="Number of threads (or processes with --use-processes) used to check keys")
+    parser.add_argument("-up", "--use-processes", action="store_true", help="Check keys with worker processes instead of threads")
+    parser.add_argument("-cw", "--carve-workers", type=int, default=os.cpu_count(), help="Number of threads carving a response")
+    parser.add_argument("-t", "--timeout", type=int, default=30, help="Timeout of the requests modules send while carving")
+    parser.add_argument("--allow-remote", action="store_true", help="Allow listening on a non-loopback TCP address (anyone reaching it can use the daemon)")
+    parser.add_argument("-ar", "--allow-resource", action="append", default=[], help="A wordlist file requests may use as custom_resource or machinekeyfile (can be used multiple times)")
+    parser.add_argument("-dkc", "--derived-key-cache", nargs="?", const=default_cache_dir(), default=None, help=f"Save the derived keys to this directory and reuse them after a restart (default directory: {default_cache_dir()})")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log every request to stderr")
+    args = parser.parse_args()
+
+    if args.derived_key_cache:
+        derived_key_cache.cache_dir = args.derived_key_cache
+    scanner = ScannerDaemon(args.custom_secrets, args.num_threads, args.use_processes, args.carve_workers, args.timeout, args.allow_resource)
+    wordlist_count = scanner.warm()
+    try:
+        server = make_server(args.listen, scanner, args.verbose, args.allow_remote)
+    except crapsecrets.errors.DaemonException as e:
+        parser.error(str(e))
+    print(f"Loaded {len(scanner.health()['modules'])} modules and {wordlist_count} wordlists, listening on [{args.listen}]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if server.address_family == socket.AF_UNIX:
+            os.remove(server.server_address)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# Persistent tables of keys derived from the wordlists (PBKDF2, SHA1PRNG, ...)
+#
+# A table holds derive(key) for every entry of a wordlist, in wordlist order, as fixed-size records. It is built
+# the first time it is needed and, when a cache directory is set (CRAPSECRETS_CACHE_DIR, or the --derived-key-cache
+# option of the CLI and the daemon), saved there in a file named after the source wordlists' path/mtime/size, so
+# editing a wordlist simply builds a new table.
+#
+# Layout (little-endian):
+#   header:  magic, record size, number of records
+#   records: one flag byte (0 when derive() returned None) followed by record size bytes
+
+import os
+import struct
+import hashlib
+import threading
+
+TABLE_MAGIC = b"CSDKEY\x00\x01"
+
+_header = struct.Struct("<8sII")
+
+
+def default_cache_dir():
+    if os.environ.get("CRAPSECRETS_CACHE_DIR"):
+        return os.environ["CRAPSECRETS_CACHE_DIR"]
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "crapsecrets")
+
+
+# The directory derived key tables are saved to by default: CRAPSECRETS_CACHE_DIR when set, otherwise None (memory only)
+def derived_keys_dir():
+    return os.environ.get("CRAPSECRETS_CACHE_DIR") or None
+
+
+class DerivedKeyTable:
+    """Read-only sequence of derived keys (bytes, or None when the key could not be derived)"""
+
+    def __init__(self, data, record_size, count):
+        self.data = data
+        self.record_size = record_size
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("derived key table index out of range")
+        pos = i * (self.record_size + 1)
+        if not self.data[pos]:
+            return None
+        return bytes(self.data[pos + 1 : pos + 1 + self.record_size])
+
+    def __iter__(self):
+        data = self.data
+        step = self.record_size + 1
+        for pos in range(0, self.count * step, step):
+            yield bytes(data[pos + 1 : pos + step]) if data[pos] else None
+
+
+class DerivedKeyCache:
+    # max_bytes caps the tables kept in memory, the least recently used being dropped first
+    def __init__(self, cache_dir=None, max_bytes=256 * 1024 * 1024):
+        # None means the tables are only kept in memory
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._tables = {}
+        # One lock per table being built, so a table is derived once while the others stay available
+        self._building = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def table_filename(name, filepaths, keys, record_size):
+        signature = []
+        for filepath in filepaths:
+            st = os.stat(filepath)
+            signature.append((os.path.abspath(filepath), st.st_mtime_ns, st.st_size))
+        # The order of the keys differs between the text files and the wordlist pack
+        signature = repr((signature, type(keys).__name__, len(keys), record_size))
+        safe_name = "".join(c if c.isalnum() or c in "-_" else "_" for c in name)
+        return f"{safe_name}-{hashlib.sha1(signature.encode()).hexdigest()[:20]}.bin"
+
+    def read_table(self, path, record_size, count):
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < _header.size:
+            return None
+        magic, table_record_size, table_count = _header.unpack_from(data, 0)
+        if magic != TABLE_MAGIC or table_record_size != record_size or table_count != count:
+            return None
+        if len(data) != _header.size + count * (record_size + 1):
+            return None
+        return DerivedKeyTable(memoryview(data)[_header.size :], record_size, count)
+
+    def write_table(self, path, table):
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(_header.pack(TABLE_MAGIC, table.record_size, table.count))
+                f.write(table.data)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            # A read-only cache directory only costs rebuilding the table in the next process
+            pass
+
+    @staticmethod
+    def build_table(keys, derive, record_size):
+        data = bytearray()
+        empty = bytes(record_size + 1)
+        for key in keys:
+            derived = derive(key)
+            if derived is None:
+                data += empty
+            else:
+                if len(derived) != record_size:
+                    raise ValueError(f"Derived key of {len(derived)} bytes does not fit a {record_size} byte record")
+                data += b"\x01"
+                data += derived
+        return DerivedKeyTable(memoryview(bytes(data)), record_size, len(keys))
+
+    def get(self, filename):
+        with self._lock:
+            table = self._tables.pop(filename, None)
+            if table is not None:
+                self._tables[filename] = table
+            return table
+
+    def put(self, filename, table):
+        with self._lock:
+            self._tables.pop(filename, None)
+            if len(table.data) > self.max_bytes:
+                return
+            self._tables[filename] = table
+            total = sum(len(t.data) for t in self._tables.values())
+            while total > self.max_bytes:
+                total -= len(self._tables.pop(next(iter(self._tables))).data)
+
+    # Returns a table aligned with keys (read from the wordlists in filepaths), building and saving it when missing
+    def table(self, name, filepaths, keys, derive, record_size):
+        filename = self.table_filename(name, filepaths, keys, record_size)
+        table = self.get(filename)
+        if table is not None:
+            return table
+        with self._lock:
+            building = self._building.setdefault(filename, threading.Lock())
+        try:
+            with building:
+                # Built by another thread while this one waited
+                table = self.get(filename)
+                if table is None:
+                    path = os.path.join(self.cache_dir, filename) if self.cache_dir else None
+                    if path:
+                        table = self.read_table(path, record_size, len(keys))
+                    if table is None:
+                        table = self.build_table(keys, derive, record_size)
+                        if path:
+                            self.write_table(path, table)
+                    self.put(filename, table)
+                return table
+        finally:
+            with self._lock:
+                if self._building.get(filename) is building and not building.locked():
+                    del self._building[filename]
+
+    def clear(self):
+        with self._lock:
+            self._tables.clear()
@@ -12,3 +12,11 @@ class Telerik_EncryptionKey_Exception(BadsecretsException):
 
 class CarveException(BadsecretsException):
     pass
+
+
+class DaemonException(BadsecretsException):
+    pass
+
+
+class CheckpointException(BadsecretsException):
+    pass
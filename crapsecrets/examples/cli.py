@@ -3,8 +3,12 @@
 # Black Lantern Security - https://www.blacklanternsecurity.com
 # @paulmmueller
 
-from crapsecrets.base import check_all_modules, carve_all_modules, hashcat_all_modules
+from crapsecrets.base import CrapsecretsBase, check_all_modules, check_secrets_batch, carve_all_modules, hashcat_all_modules, parse_shard, derived_key_cache
+from crapsecrets.derived_keys import default_cache_dir
 from crapsecrets.helpers import print_status
+from crapsecrets.daemon import carve_option_defaults, daemon_request, response_payload
+from crapsecrets.checkpoint import Checkpoint
+import crapsecrets.errors
 from importlib.metadata import version, PackageNotFoundError
 import httpx
 import argparse
@@ -14,7 +18,15 @@ import re
 import toml
 import ssl
 import time
-from urllib.parse import urljoin, urlparse
+import signal
+import json
+import hashlib
+import contextlib
+import asyncio
+import threading
+import itertools
+import concurrent.futures
+from urllib.parse import urljoin, urlparse, urlsplit
 
 # Suppress SSL verification warnings in httpx
 import warnings
@@ -108,6 +120,20 @@ def validate_url(
     return arg_value
 
 
+def validate_url_file(file):
+    # "-" reads the URLs from stdin
+    if file == "-":
+        return file
+    return validate_file(file)
+
+
+def validate_shard(value):
+    try:
+        return parse_shard(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(print_status(str(e), color="red"))
+
+
 def validate_file(file):
     if not os.path.exists(file):
         raise argparse.ArgumentTypeError(print_status(f"The file {file} does not exist!", color="red"))
@@ -141,6 +167,13 @@ def main():
         help="Disable color message in the console",
     )
 
+    color_parser.add_argument(
+        "-s",
+        "--stream",
+        action="store_true",
+        help="Read tokens from stdin (one per line, or NDJSON records with token/args/module/id) and write one JSON result per line",
+    )
+
     args, unknown_args = color_parser.parse_known_args()
     colorenabled = not args.no_color
 
@@ -148,12 +181,14 @@ def main():
         description="Check cryptographic products against crapsecrets library", parents=[color_parser]
     )
 
-    if colorenabled:
-        print_status(ascii_art_banner, color="green")
+    # In --stream mode stdout only carries the NDJSON results
+    with contextlib.redirect_stdout(sys.stderr if args.stream else sys.stdout):
+        if colorenabled:
+            print_status(ascii_art_banner, color="green")
 
-    else:
-        print(ascii_art_banner)
-    print_version()
+        else:
+            print(ascii_art_banner)
+        print_version()
 
     parser.add_argument(
         "-u",
@@ -162,6 +197,80 @@ def main():
         help="Use URL Mode. Specified the URL of the page to access and attempt to check for secrets",
     )
 
+    parser.add_argument(
+        "-bs",
+        "--batch-size",
+        type=int,
+        default=1000,
+        help="In --stream mode, the number of tokens read and checked at once (bounds memory use). Default is 1000.",
+    )
+
+    parser.add_argument(
+        "-uf",
+        "--url-file",
+        type=validate_url_file,
+        help="Use URL Mode with many targets: read one URL per line from this file (- for stdin) and scan them concurrently",
+    )
+
+    parser.add_argument(
+        "-cc",
+        "--concurrency",
+        type=int,
+        default=50,
+        help="In --url-file mode, the maximum number of targets fetched at once. Default is 50.",
+    )
+
+    parser.add_argument(
+        "-phc",
+        "--per-host-concurrency",
+        type=int,
+        default=2,
+        help="In --url-file mode, the maximum number of requests sent to the same host at once. Default is 2.",
+    )
+
+    parser.add_argument(
+        "-cw",
+        "--carve-workers",
+        type=int,
+        default=os.cpu_count() or 4,
+        help="Number of threads carving a response with the modules, and in --url-file mode the number of responses carved at once. Default is the number of CPUs.",
+    )
+
+    parser.add_argument(
+        "-cp",
+        "--checkpoint",
+        dest="checkpoint_file",
+        help="Save the progress of the key searches to this state file (periodically, on every hit and when interrupted)",
+    )
+
+    parser.add_argument(
+        "-rs",
+        "--resume",
+        action="store_true",
+        help="Resume the key searches from the --checkpoint state file of an interrupted run",
+    )
+
+    parser.add_argument(
+        "-cpi",
+        "--checkpoint-interval",
+        type=int,
+        default=30,
+        help="Seconds between two saves of the --checkpoint state file. Default is 30.",
+    )
+
+    parser.add_argument(
+        "-sh",
+        "--shard",
+        type=validate_shard,
+        help="Only try the candidate keys of keyspace shard i out of N (e.g. 2/4), to split one job across N nodes. A completion record is printed when the shard is done.",
+    )
+
+    parser.add_argument(
+        "-dm",
+        "--daemon",
+        help="Send the checks and carves to a running crapsecrets-daemon (unix:/path/to.sock or host:port) instead of running them in this process",
+    )
+
     parser.add_argument(
         "-nh",
         "--no-hashcat",
@@ -251,7 +360,23 @@ def main():
         "--num-threads",
         type=int,
         default=1,
-        help="Specify the number of threads to use (only applicable for the viewstate module). Default is 1.",
+        help="Specify the number of threads (or processes with --use-processes) used to check keys. Default is 1.",
+    )
+
+    parser.add_argument(
+        "-up",
+        "--use-processes",
+        action="store_true",
+        help="Use --num-threads worker processes instead of threads to check keys. Scales across CPU cores.",
+    )
+
+    parser.add_argument(
+        "-dkc",
+        "--derived-key-cache",
+        nargs="?",
+        const=default_cache_dir(),
+        default=None,
+        help=f"Save the keys derived from the wordlists (e.g. PBKDF2) to this directory and reuse them in later runs (default directory: {default_cache_dir()}). Without it they are only kept in memory, unless CRAPSECRETS_CACHE_DIR is set.",
     )
 
     parser.add_argument(
@@ -273,14 +398,18 @@ def main():
         help="Enable debug mode to print detailed error messages",
     )
 
-    args = parser.parse_args(unknown_args)
+    args = parser.parse_args(unknown_args, namespace=args)
     if args.debug:
         global is_debug
         is_debug = True
         # Re-enable warnings in debug mode
         warnings.resetwarnings()
     
-    if not args.url and not args.product:
+    if args.stream and (args.url or args.url_file or args.product):
+        parser.error(print_status("In --stream mode, tokens are read from stdin: neither URLs nor positional arguments should be used", color="red"))
+        return
+
+    if not args.url and not args.url_file and not args.product and not args.stream:
         parser.error(
             print_status(
                 "Either supply the product as a positional argument (supply all products for multi-product modules), use --hashcat followed by the product as a positional argument, or use --url mode with a valid URL",
@@ -293,6 +422,10 @@ def main():
         parser.error(print_status("In --url mode, no positional arguments should be used", color="red"))
         return
 
+    if args.url_file and (args.url or args.product):
+        parser.error(print_status("In --url-file mode, neither --url nor positional arguments should be used", color="red"))
+        return
+
     allow_auto_redirects = False
     if args.allow_auto_redirects:
         allow_auto_redirects = True
@@ -322,12 +455,43 @@ def main():
         else:
             proxy = args.proxy
 
+    if args.derived_key_cache:
+        derived_key_cache.cache_dir = args.derived_key_cache
+
     custom_resource = None
     if args.custom_secrets:
         custom_resource = args.custom_secrets
-        print_status(f"Including custom secrets list [{custom_resource}]\n", color="yellow")
+        with contextlib.redirect_stdout(sys.stderr if args.stream else sys.stdout):
+            print_status(f"Including custom secrets list [{custom_resource}]\n", color="yellow")
+
+    if args.resume and not args.checkpoint_file:
+        parser.error(print_status("--resume needs the --checkpoint state file to resume from", color="red"))
+        return
+
+    if args.checkpoint_file and args.daemon:
+        parser.error(print_status("--checkpoint cannot be used with --daemon, the searches run in the daemon", color="red"))
+        return
+
+    args.checkpoint = None
+    if args.checkpoint_file:
+        try:
+            args.checkpoint = Checkpoint(args.checkpoint_file, args.checkpoint_interval, args.resume)
+        except crapsecrets.errors.CheckpointException as e:
+            parser.error(print_status(str(e), color="red"))
+            return
+        previous_handlers = save_checkpoint_on_signals(args)
 
-    if args.url:
+    if args.daemon:
+        try:
+            daemon_request(args.daemon, "/health", timeout=args.timeout)
+        except (ValueError, crapsecrets.errors.DaemonException) as e:
+            parser.error(print_status(str(e), color="red"))
+            return
+
+    if args.stream:
+        stream_tokens(args, custom_resource)
+
+    elif args.url or args.url_file:
         
         # Parse the custom headers into a dictionary
         headers = parse_headers(args.header) if args.header else {}
@@ -335,7 +499,8 @@ def main():
             headers["Accept"] = "*/*"
         if "Accept-Language" not in headers:
             headers["Accept-Language"] = "en-US;q=0.9,en;q=0.8"
-        if "Connection" not in headers:
+        # Many targets are fetched over pooled keep-alive connections
+        if "Connection" not in headers and not args.url_file:
             headers["Connection"] = "close"
 
         if args.user_agent:
@@ -421,28 +586,43 @@ def main():
             client_kwargs["proxy"] = proxy
         
 
-        print_status(f"Target: {args.url}", color="yellow")
-
-        client = httpx.Client(**client_kwargs)
+        if args.url_file:
+            async_client_kwargs = dict(client_kwargs)
+            async_client_kwargs["transport"] = httpx.AsyncHTTPTransport(
+                retries=3,
+                local_address="0.0.0.0",
+                verify=ssl_context,
+                limits=httpx.Limits(
+                    max_keepalive_connections=args.concurrency,
+                    max_connections=args.concurrency,
+                    keepalive_expiry=30
+                )
+            )
+            asyncio.run(scan_url_file(args.url_file, async_client_kwargs, allow_auto_redirects, max_redirect_depth, custom_resource, args))
 
-        result_list = send_requests(args.url, args.timeout, allow_auto_redirects, max_redirect_depth, custom_resource, client, args)
-        
-        if result_list:
-            for r in result_list:
-                if r["type"] == "SecretFound":
-                    report = ReportSecret(r)
-                else:
-                    if not args.no_hashcat and r["product"]:
-                        hashcat_candidates = hashcat_all_modules(r["product"], detecting_module=r["detecting_module"])
-                        if hashcat_candidates:
-                            r["hashcat"] = hashcat_candidates
-                    report = ReportIdentify(r)
-                report.report()
         else:
-            print_status("No secrets found :(", color="red")
+            print_status(f"Target: {args.url}", color="yellow")
+
+            client = httpx.Client(**client_kwargs)
+
+            result_list = send_requests(args.url, args.timeout, allow_auto_redirects, max_redirect_depth, custom_resource, client, args)
+            report_results(result_list, args)
 
     else:
-        x = check_all_modules(*args.product, custom_resource=custom_resource)
+        if args.daemon:
+            x = check_tokens([args.product], None, custom_resource, args)[0]
+            # Modules returning several results (e.g. ASPNET_Viewstate) come back as a list
+            if isinstance(x, list):
+                x = next((r for r in x if r), None)
+        else:
+            x = check_all_modules(
+                *args.product,
+                custom_resource=custom_resource,
+                num_threads=args.num_threads,
+                use_processes=args.use_processes,
+                shard=args.shard,
+                checkpoint=args.checkpoint,
+            )
         if x:
             report = ReportSecret(x)
             report.report()
@@ -453,6 +633,162 @@ def main():
                 if hashcat_candidates:
                     print_hashcat_results(hashcat_candidates)
 
+    if args.checkpoint:
+        args.checkpoint.save()
+        for signum, handler in previous_handlers.items():
+            signal.signal(signum, handler)
+
+    if args.shard:
+        print(json.dumps(shard_record(args)))
+
+# Interrupted runs (Ctrl-C, or SIGTERM for pre-empted workers) save the progress made since the last checkpoint
+# before exiting; returns the handlers to restore
+def save_checkpoint_on_signals(args):
+    def save_and_exit(signum, frame):
+        args.checkpoint.save()
+        with contextlib.redirect_stdout(sys.stderr):
+            print_status(f"Interrupted, progress saved to [{args.checkpoint_file}]: rerun with --resume to continue", color="yellow")
+        sys.exit(128 + signum)
+
+    return {signum: signal.signal(signum, save_and_exit) for signum in (signal.SIGINT, signal.SIGTERM)}
+
+# The arguments defining a job: every node working on a shard of the same job reports the same job id
+shard_job_arguments = ["product", "url", "url_file", "stream", "custom_secrets", "machinekeyfile", "allviewstatekeys", "enable_viewstate_decryption", "findviewstatepage"]
+
+# Printed (as JSON) by a --shard run once it has tried every key of its shard: a coordinator knows the keyspace
+# of a job is exhausted when it holds the records of shards 1 to N with the same job id
+def shard_record(args):
+    index, count = args.shard
+    job = json.dumps({k: getattr(args, k, None) for k in shard_job_arguments}, sort_keys=True, default=str)
+    return {
+        "type": "shard_complete",
+        "shard": f"{index}/{count}",
+        "index": index,
+        "count": count,
+        "job": hashlib.sha1(job.encode()).hexdigest(),
+        "completed_at": int(time.time()),
+    }
+
+def report_results(result_list, args):
+    if result_list:
+        for r in result_list:
+            if r["type"] == "SecretFound":
+                report = ReportSecret(r)
+            else:
+                if not args.no_hashcat and r["product"]:
+                    hashcat_candidates = hashcat_all_modules(r["product"], detecting_module=r["detecting_module"])
+                    if hashcat_candidates:
+                        r["hashcat"] = hashcat_candidates
+                report = ReportIdentify(r)
+            report.report()
+    else:
+        print_status("No secrets found :(", color="red")
+
+# Parses one --stream input line: a bare token, or a JSON object {"token": ..., "args": [...], "module": ..., "id": ...}
+# where args are the extra check_secret arguments (e.g. the ViewState generator) and module a module name hint
+def parse_stream_record(line_number, line):
+    record = {"id": line_number, "token": line, "args": [], "module": None}
+    if line.startswith("{"):
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            return {"id": line_number, "error": f"Invalid JSON: {e}"}
+        if not isinstance(data, dict) or not isinstance(data.get("token"), str):
+            return {"id": data.get("id", line_number) if isinstance(data, dict) else line_number, "error": "Missing token"}
+        record.update({k: data[k] for k in ("id", "token", "args", "module") if data.get(k) is not None})
+        if not isinstance(record["args"], list):
+            record["args"] = [record["args"]]
+        if record["module"] and record["module"] not in stream_module_names():
+            return {"id": record["id"], "error": f"Unknown module [{record['module']}]"}
+    return record
+
+def stream_module_names():
+    return {m.__name__ for m in CrapsecretsBase.__subclasses__()}
+
+# --stream mode: tokens are read args.batch_size lines at a time and checked with check_secrets_batch (one call per
+# module hint), and the results of a batch are written as NDJSON, in input order, before the next batch is read
+def stream_tokens(args, custom_resource=None, infile=None, outfile=None):
+    infile = infile or sys.stdin
+    outfile = outfile or sys.stdout
+    lines = ((n, line.strip()) for n, line in enumerate(infile, 1))
+    lines = ((n, line) for n, line in lines if line)
+    while True:
+        batch = list(itertools.islice(lines, max(1, args.batch_size)))
+        if not batch:
+            break
+        records = [parse_stream_record(n, line) for n, line in batch]
+        results = [None] * len(records)
+        by_module = {}
+        for i, record in enumerate(records):
+            if "error" not in record:
+                by_module.setdefault(record["module"], []).append(i)
+        # Module diagnostics go to stderr so that outfile only carries the results
+        with contextlib.redirect_stdout(sys.stderr):
+            for module, indices in by_module.items():
+                found = check_tokens(
+                    [[records[i]["token"], *records[i]["args"]] for i in indices],
+                    [module] if module else None,
+                    custom_resource,
+                    args,
+                )
+                for i, r in zip(indices, found):
+                    results[i] = r
+        for record, r in zip(records, results):
+            if "error" in record:
+                out = record
+            else:
+                out = {"id": record["id"], "token": record["token"], "found": bool(r), "result": r or None}
+                if not r and not args.no_hashcat:
+                    with contextlib.redirect_stdout(sys.stderr):
+                        hashcat_candidates = hashcat_all_modules(record["token"], detecting_module=record["module"])
+                    if hashcat_candidates:
+                        out["hashcat"] = hashcat_candidates
+            outfile.write(json.dumps(out, default=str) + "\n")
+        outfile.flush()
+
+# Runs check_secrets_batch in this process, or on the daemon given with --daemon
+def check_tokens(tokens, modules, custom_resource, args):
+    if args.daemon:
+        payload = {
+            "tokens": tokens,
+            "modules": modules,
+            "custom_resource": os.path.abspath(custom_resource) if custom_resource else None,
+            "shard": args.shard,
+        }
+        return daemon_request(args.daemon, "/check", payload)["results"]
+    return check_secrets_batch(
+        tokens,
+        modules=modules,
+        custom_resource=custom_resource,
+        num_threads=args.num_threads,
+        use_processes=args.use_processes,
+        shard=args.shard,
+        checkpoint=args.checkpoint,
+    )
+
+# Runs carve_all_modules on a fetched response in this process, or on the daemon given with --daemon
+def carve_response(response, custom_resource=None, url=None, client=None, commandargs=None):
+    if getattr(commandargs, "daemon", None):
+        payload = response_payload(response, url)
+        payload.update(
+            {
+                "custom_resource": os.path.abspath(custom_resource) if custom_resource else None,
+                "shard": getattr(commandargs, "shard", None),
+                "request_headers": dict(client.headers) if client else {},
+                "request_cookies": {c.name: c.value for c in client.cookies.jar} if client else {},
+                "options": {k: getattr(commandargs, k, v) for k, v in carve_option_defaults.items()},
+            }
+        )
+        return daemon_request(commandargs.daemon, "/carve", payload)["results"] or None
+    return carve_all_modules(
+        requests_response=response,
+        custom_resource=custom_resource,
+        url=url,
+        client=client,
+        commandargs=commandargs,
+        carve_workers=getattr(commandargs, "carve_workers", None),
+    )
+
 def parse_headers(header_list):
     headers = {}
     for header in header_list:
@@ -489,7 +825,7 @@ def send_requests(url, timeout, allow_auto_redirects, max_redirect_depth=0, cust
                         follow_redirects=allow_auto_redirects,
                         timeout=timeout
                     )
-                    result = carve_all_modules(requests_response=response, custom_resource=custom_resource, url=url, client=client, commandargs=commandargs)
+                    result = carve_response(response, custom_resource, url, client, commandargs)
                     if result:
                         result_list += result
                     break  # Success - exit retry loop
@@ -501,30 +837,8 @@ def send_requests(url, timeout, allow_auto_redirects, max_redirect_depth=0, cust
                         print(f"Connection attempt {retry_count} failed, retrying in 2s... ({str(e)})")
                     time.sleep(2)
   
-            # If the status code is a redirect (3xx)
-            if 300 <= response.status_code < 400 and 'Location' in response.headers:
-                # Get the Location header with the redirect URL
-                location = response.headers['Location']
-                
-                # Check if the Location is an absolute URL or relative
-                parsed_location = urlparse(location)
-                if parsed_location.scheme in ['http', 'https']:
-                    # Absolute URL, use it as is
-                    new_url = location
-                else:
-                    # Relative URL, resolve it against the current URL
-                    new_url = urljoin(url, location)
-                
-                # Track the number of visits for the new URL
-                if new_url in visited_counts:
-                    if visited_counts[new_url] >= max_visits_per_url:
-                        # Stop following this redirect if we've already visited this URL enough times
-                        break
-                    else:
-                        visited_counts[new_url] += 1
-                else:
-                    visited_counts[new_url] = 1
-
+            new_url = redirect_target(url, response, visited_counts, max_visits_per_url)
+            if new_url:
                 # Update the URL and increase the depth
                 url = new_url
                 depth += 1
@@ -536,7 +850,7 @@ def send_requests(url, timeout, allow_auto_redirects, max_redirect_depth=0, cust
                 client.cookies.update(response.cookies)
                 #print(f"Redirecting to: {url} (Depth: {depth})")
             else:
-                # If it's not a redirect, break the loop
+                # If it's not a redirect (or one we have followed enough times), break the loop
                 #print(f"Final URL: {url} (Depth: {depth})")
                 break
         except (httpx.RequestError, httpx.TimeoutException, ssl.SSLError) as e:
@@ -547,6 +861,156 @@ def send_requests(url, timeout, allow_auto_redirects, max_redirect_depth=0, cust
     
     return result_list
 
+# Returns the URL a 3xx response redirects to, or None when it is not a redirect or that URL was visited enough times
+def redirect_target(url, response, visited_counts, max_visits_per_url=3):
+    if not (300 <= response.status_code < 400 and 'Location' in response.headers):
+        return None
+    # Get the Location header with the redirect URL
+    location = response.headers['Location']
+
+    # Check if the Location is an absolute URL or relative
+    parsed_location = urlparse(location)
+    if parsed_location.scheme in ['http', 'https']:
+        # Absolute URL, use it as is
+        new_url = location
+    else:
+        # Relative URL, resolve it against the current URL
+        new_url = urljoin(url, location)
+
+    # Track the number of visits for the new URL
+    if visited_counts.get(new_url, 0) >= max_visits_per_url:
+        # Stop following this redirect if we've already visited this URL enough times
+        return None
+    visited_counts[new_url] = visited_counts.get(new_url, 0) + 1
+    return new_url
+
+# Yields the URLs of a --url-file (or stdin), skipping blank lines, comments and malformed URLs
+def url_file_targets(url_file):
+    f = sys.stdin if url_file == "-" else open(url_file, encoding="utf-8")
+    try:
+        for line in f:
+            url = line.strip()
+            if not url or url.startswith("#"):
+                continue
+            try:
+                validate_url(url)
+            except argparse.ArgumentTypeError:
+                print_status(f"Skipping [{url}]", color="red")
+                continue
+            yield url
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+# --url-file mode: targets are fetched concurrently by an AsyncClient (at most args.concurrency at once, and
+# args.per_host_concurrency per host) while a separate thread pool carves the responses, so a slow host only
+# holds its own slot. Each target's results are reported as soon as it is done.
+async def scan_url_file(url_file, async_client_kwargs, allow_auto_redirects, max_redirect_depth=0, custom_resource=None, commandargs=None):
+    loop = asyncio.get_running_loop()
+    targets = url_file_targets(url_file)
+    queue = asyncio.Queue(maxsize=commandargs.concurrency * 2)
+    host_limits = {}
+    carve_pool = concurrent.futures.ThreadPoolExecutor(max_workers=max(1, commandargs.carve_workers))
+    # Modules sending follow-up requests while carving (e.g. ASPNET_Viewstate) get a blocking client per carve thread
+    carve_clients = []
+    carve_local = threading.local()
+    counts = {"targets": 0, "found": 0}
+
+    def carve(response, url):
+        client = getattr(carve_local, "client", None)
+        if client is None:
+            client = carve_local.client = httpx.Client(**client_kwargs)
+            carve_clients.append(client)
+        return carve_response(response, custom_resource, url, client, commandargs)
+
+    def host_limit(url):
+        host = urlsplit(url).netloc.lower()
+        if host not in host_limits:
+            host_limits[host] = asyncio.Semaphore(max(1, commandargs.per_host_concurrency))
+        return host_limits[host]
+
+    async def fetch(client, url, headers, cookies):
+        max_retries = 3
+        for retry_count in range(max_retries):
+            try:
+                async with host_limit(url):
+                    request = client.build_request("GET", url, headers=headers, cookies=cookies)
+                    return await client.send(request, follow_redirects=allow_auto_redirects)
+            except Exception as e:
+                if retry_count == max_retries - 1:
+                    raise
+                if is_debug:
+                    print(f"Connection attempt {retry_count + 1} to [{url}] failed, retrying in 2s... ({str(e)})")
+                await asyncio.sleep(2)
+
+    async def scan_target(client, url):
+        target = url
+        result_list = []
+        depth = 0
+        headers = {}
+        # The cookies set along the redirects of this target are sent with the next request, as in send_requests
+        cookies = httpx.Cookies()
+        visited_counts = {}
+        while depth <= max_redirect_depth:
+            try:
+                response = await fetch(client, url, headers, cookies)
+            except (httpx.RequestError, httpx.TimeoutException, ssl.SSLError) as e:
+                print_status(f"Error connecting to URL: [{url}] , redirect-depth: [{max_redirect_depth}] - {str(e)}", color="red")
+                if is_debug:
+                    traceback.print_exc()
+                break
+            result = await loop.run_in_executor(carve_pool, carve, response, url)
+            if result:
+                result_list += result
+            new_url = redirect_target(url, response, visited_counts)
+            if not new_url:
+                break
+            url = new_url
+            depth += 1
+            headers["Referer"] = url
+            cookies.update(response.cookies)
+
+        counts["targets"] += 1
+        print_status(f"Target: {target}", color="yellow")
+        if result_list:
+            counts["found"] += 1
+            report_results(result_list, commandargs)
+        else:
+            print_status("No secrets found :(", color="red")
+
+    async def worker(client):
+        while True:
+            url = await queue.get()
+            try:
+                if url is None:
+                    return
+                await scan_target(client, url)
+            except Exception as e:
+                print_status(f"Error scanning URL: [{url}] - {str(e)}", color="red")
+                if is_debug:
+                    traceback.print_exc()
+            finally:
+                queue.task_done()
+
+    try:
+        async with httpx.AsyncClient(**async_client_kwargs) as client:
+            workers = [asyncio.create_task(worker(client)) for _ in range(max(1, commandargs.concurrency))]
+            # Reading stdin can block, so the URLs are read off the event loop
+            while True:
+                url = await loop.run_in_executor(None, next, targets, None)
+                if url is None:
+                    break
+                await queue.put(url)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+    finally:
+        carve_pool.shutdown(wait=True)
+        for client in carve_clients:
+            client.close()
+
+    print_status(f"Scanned {counts['targets']} target(s), {counts['found']} with results", color="yellow")
+
 if __name__ == "__main__":
     try:
         main()
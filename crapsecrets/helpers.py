@@ -2,14 +2,17 @@ import base64
 import binascii
 import json
 import re
-import sys
 import hmac
 import struct
 import hashlib
+import functools
+import threading
+from collections import OrderedDict
 from urllib.parse import urlparse
 from colorama import Fore, Style, init
 import httpx
 from crapsecrets.errors import BadsecretsException
+from crapsecrets.generator_index import load_generator_index, lists_signature
 from enum import Enum
 
 init(autoreset=True)  # Automatically reset the color to default after each print statement
@@ -101,6 +104,25 @@ def sp800_108_derivekey(key, label, context, keyLengthInBits):
     return res
 
 
+# The derived key only depends on (key, label, context, length): the ViewState checks derive the same one for every
+# candidate hash algorithm, for validation and decryption, and for every ViewState of a site sharing a purpose. The
+# derivations are memoized in a bounded LRU cache (about 200 bytes an entry) shared by all of them.
+SP800_108_CACHE_SIZE = 65536
+
+
+@functools.lru_cache(maxsize=SP800_108_CACHE_SIZE)
+def _sp800_108_derivekey_lru(key, label, context, keyLengthInBits):
+    return sp800_108_derivekey(key, label, context, keyLengthInBits)
+
+
+def sp800_108_derivekey_cached(key, label, context, keyLengthInBits):
+    return _sp800_108_derivekey_lru(bytes(key), bytes(label or b""), bytes(context or b""), keyLengthInBits)
+
+
+sp800_108_derivekey_cached.cache_info = _sp800_108_derivekey_lru.cache_info
+sp800_108_derivekey_cached.cache_clear = _sp800_108_derivekey_lru.cache_clear
+
+
 def write_vlq_string(string):
     encoded_string = string.encode("utf-8")
     length = len(encoded_string)
@@ -197,11 +219,12 @@ class Csharp_pbkdf1:
         return result
 
 
+# Signed value of every unsigned byte (Java's byte type)
+_signed_bytes = tuple(b - 256 if b > 127 else b for b in range(256))
+
+
 def twos_compliment(unsigned):
-    bs = bin(unsigned).replace("0b", "")
-    val = int(bs, 2)
-    b = val.to_bytes(1, byteorder=sys.byteorder, signed=False)
-    return int.from_bytes(b, byteorder=sys.byteorder, signed=True)
+    return _signed_bytes[unsigned]
 
 
 class Java_sha1prng:
@@ -225,7 +248,7 @@ class Java_sha1prng:
         newState = bytearray()
 
         for c, n in zip(self.state, outputBytesArray):
-            v = twos_compliment(c) + twos_compliment(n) + last
+            v = _signed_bytes[c] + _signed_bytes[n] + last
             finalv = v & 255
             newState.append(finalv)
             last = v >> 8
@@ -247,6 +270,8 @@ class Viewstate_Helpers:
     # JSON mapping DB to create hashcode when missing!
     # This is a hack of an undocumented Microsoft native function used in creating __VIEWSTATEGENERATOR
     JSON_DB = r'''{"\u0001":[1,1,1,1,255,255,3,18,0],"\u0002":[1,1,1,1,255,255,4,18,0],"\u0003":[1,1,1,1,255,255,5,18,0],"\u0004":[1,1,1,1,255,255,6,18,0],"\u0005":[1,1,1,1,255,255,7,18,0],"\u0006":[1,1,1,1,255,255,8,18,0],"\u0007":[1,1,1,1,255,255,9,18,0],"\b":[1,1,1,1,255,255,10,18,0],"\t":[7,5,1,1,1,1,0],"\n":[7,6,1,1,1,1,0],"\u000b":[7,7,1,1,1,1,0],"\f":[7,8,1,1,1,1,0],"\r":[7,9,1,1,1,1,0],"\u000e":[1,1,1,1,255,255,11,18,0],"\u000f":[1,1,1,1,255,255,12,18,0],"\u0010":[1,1,1,1,255,255,13,18,0],"\u0011":[1,1,1,1,255,255,14,18,0],"\u0012":[1,1,1,1,255,255,15,18,0],"\u0013":[1,1,1,1,255,255,16,18,0],"\u0014":[1,1,1,1,255,255,17,18,0],"\u0015":[1,1,1,1,255,255,18,18,0],"\u0016":[1,1,1,1,255,255,19,18,0],"\u0017":[1,1,1,1,255,255,20,18,0],"\u0018":[1,1,1,1,255,255,21,18,0],"\u0019":[1,1,1,1,255,255,22,18,0],"\u001a":[1,1,1,1,255,255,23,18,0],"\u001b":[1,1,1,1,255,255,24,18,0],"\u001c":[1,1,1,1,255,255,25,18,0],"\u001d":[1,1,1,1,255,255,26,18,0],"\u001e":[1,1,1,1,255,255,27,18,0],"\u001f":[1,1,1,1,255,255,28,18,0]," ":[7,2,1,1,1,1,0],"!":[7,28,1,1,1,1,0],"\"":[7,29,1,1,1,1,0],"#":[7,31,1,1,1,1,0],"$":[7,33,1,1,1,1,0],"%":[7,35,1,1,1,1,0],"&":[7,37,1,1,1,1,0],"'" :[1,1,1,1,255,255,128,18,0],"(":[7,39,1,1,1,1,0],")":[7,42,1,1,1,1,0],"*":[7,45,1,1,1,1,0],"+":[8,3,1,1,1,1,0],",":[7,47,1,1,1,1,0],"-":[1,1,1,1,255,255,130,18,0],".":[7,51,1,1,1,1,0],"/":[7,53,1,1,1,1,0],"0":[13,3,1,1,1,1,0],"1":[13,26,1,1,1,1,0],"2":[13,28,1,1,1,1,0],"3":[13,30,1,1,1,1,0],"4":[13,32,1,1,1,1,0],"5":[13,34,1,1,1,1,0],"6":[13,36,1,1,1,1,0],"7":[13,38,1,1,1,1,0],"8":[13,40,1,1,1,1,0],"9":[13,42,1,1,1,1,0],":":[7,55,1,1,1,1,0],";":[7,58,1,1,1,1,0],"<":[8,14,1,1,1,1,0],"=":[8,18,1,1,1,1,0],">":[8,20,1,1,1,1,0],"?":[7,60,1,1,1,1,0],"@":[7,62,1,1,1,1,0],"A":[14,2,1,1,1,1,0],"B":[14,9,1,1,1,1,0],"C":[14,10,1,1,1,1,0],"D":[14,26,1,1,1,1,0],"E":[14,33,1,1,1,1,0],"F":[14,35,1,1,1,1,0],"G":[14,37,1,1,1,1,0],"H":[14,44,1,1,1,1,0],"I":[14,50,1,1,1,1,0],"J":[14,53,1,1,1,1,0],"K":[14,54,1,1,1,1,0],"L":[14,72,1,1,1,1,0],"M":[14,81,1,1,1,1,0],"N":[14,112,1,1,1,1,0],"O":[14,124,1,1,1,1,0],"P":[14,126,1,1,1,1,0],"Q":[14,137,1,1,1,1,0],"R":[14,138,1,1,1,1,0],"S":[14,145,1,1,1,1,0],"T":[14,153,1,1,1,1,0],"U":[14,159,1,1,1,1,0],"V":[14,162,1,1,1,1,0],"W":[14,164,1,1,1,1,0],"X":[14,166,1,1,1,1,0],"Y":[14,167,1,1,1,1,0],"Z":[14,169,1,1,1,1,0],"[":[7,63,1,1,1,1,0],"\\":[7,65,1,1,1,1,0],"]":[7,66,1,1,1,1,0],"^":[7,67,1,1,1,1,0],"_":[7,68,1,1,1,1,0],"`":[7,72,1,1,1,1,0],"a":[14,2,1,1,1,1,0],"b":[14,9,1,1,1,1,0],"c":[14,10,1,1,1,1,0],"d":[14,26,1,1,1,1,0],"e":[14,33,1,1,1,1,0],"f":[14,35,1,1,1,1,0],"g":[14,37,1,1,1,1,0],"h":[14,44,1,1,1,1,0],"i":[14,50,1,1,1,1,0],"j":[14,53,1,1,1,1,0],"k":[14,54,1,1,1,1,0],"l":[14,72,1,1,1,1,0],"m":[14,81,1,1,1,1,0],"n":[14,112,1,1,1,1,0],"o":[14,124,1,1,1,1,0],"p":[14,126,1,1,1,1,0],"q":[14,137,1,1,1,1,0],"r":[14,138,1,1,1,1,0],"s":[14,145,1,1,1,1,0],"t":[14,153,1,1,1,1,0],"u":[14,159,1,1,1,1,0],"v":[14,162,1,1,1,1,0],"w":[14,164,1,1,1,1,0],"x":[14,166,1,1,1,1,0],"y":[14,167,1,1,1,1,0],"z":[14,169,1,1,1,1,0],"{":[7,74,1,1,1,1,0],"|":[7,76,1,1,1,1,0],"}":[7,78,1,1,1,1,0],"~":[7,80,1,1,1,1,0],"\u007f":[1,1,1,1,255,255,29,18,0],"\u0080":[12,250,1,29,1,1,1,0],"\u0081":[12,250,1,30,1,1,1,0],"\u0082":[12,250,1,31,1,1,1,0],"\u0083":[12,250,1,32,1,1,1,0],"\u0084":[12,250,1,33,1,1,1,0],"\u0085":[12,250,1,34,1,1,1,0],"\u0086":[12,250,1,35,1,1,1,0],"\u0087":[12,250,1,36,1,1,1,0],"\u0088":[12,250,1,37,1,1,1,0],"\u0089":[12,250,1,38,1,1,1,0],"\u008a":[12,250,1,39,1,1,1,0],"\u008b":[12,250,1,40,1,1,1,0],"\u008c":[12,250,1,41,1,1,1,0],"\u008d":[12,250,1,42,1,1,1,0],"\u008e":[12,250,1,43,1,1,1,0],"\u008f":[12,250,1,44,1,1,1,0],"\u0090":[12,250,1,45,1,1,1,0],"\u0091":[12,250,1,46,1,1,1,0],"\u0092":[12,250,1,47,1,1,1,0],"\u0093":[12,250,1,48,1,1,1,0],"\u0094":[12,250,1,49,1,1,1,0],"\u0095":[12,250,1,50,1,1,1,0],"\u0096":[12,250,1,51,1,1,1,0],"\u0097":[12,250,1,52,1,1,1,0],"\u0098":[12,250,1,53,1,1,1,0],"\u0099":[12,250,1,54,1,1,1,0],"\u009a":[12,250,1,55,1,1,1,0],"\u009b":[12,250,1,56,1,1,1,0],"\u009c":[12,250,1,57,1,1,1,0],"\u009d":[12,250,1,58,1,1,1,0],"\u009e":[12,250,1,59,1,1,1,0],"\u009f":[12,250,1,60,1,1,1,0],"\u00a0":[7,4,1,1,1,1,0],"\u00a1":[7,81,1,1,1,1,0],"\u00a2":[7,151,1,1,1,1,0],"\u00a3":[7,152,1,1,1,1,0],"\u00a4":[7,153,1,1,1,1,0],"\u00a5":[7,154,1,1,1,1,0],"\u00a6":[7,82,1,1,1,1,0],"\u00a7":[10,6,1,1,1,1,0],"\u00a8":[7,83,1,1,1,1,0],"\u00a9":[10,7,1,1,1,1,0],"\u00aa":[14,2,1,3,1,6,1,1,0],"\u00ab":[8,24,1,1,1,1,0],"\u00ac":[10,8,1,1,1,1,0],"\u00ad":[1,1,1,1,0],"\u00ae":[10,9,1,1,1,1,0],"\u00af":[7,84,1,1,1,1,0],"\u00b0":[10,10,1,1,1,1,0],"\u00b1":[8,23,1,1,1,1,0],"\u00b2":[13,28,1,1,6,1,1,0],"\u00b3":[13,30,1,1,6,1,1,0],"\u00b4":[7,85,1,1,1,1,0],"\u00b5":[10,11,1,1,1,1,0],"\u00b6":[10,12,1,1,1,1,0],"\u00b7":[10,13,1,1,1,1,0],"\u00b8":[7,86,1,1,1,1,0],"\u00b9":[13,26,1,1,6,1,1,0],"\u00ba":[14,124,1,3,1,6,1,1,0],"\u00bb":[8,26,1,1,1,1,0],"\u00bc":[13,13,1,1,1,1,0],"\u00bd":[13,17,1,1,1,1,0],"\u00be":[13,21,1,1,1,1,0],"\u00bf":[7,87,1,1,1,1,0],"\u00c0":[14,2,1,15,1,1,1,0],"\u00c1":[14,2,1,14,1,1,1,0],"\u00c2":[14,2,1,18,1,1,1,0],"\u00c3":[14,2,1,25,1,1,1,0],"\u00c4":[14,2,1,19,1,1,1,0],"\u00c5":[14,2,1,26,1,1,1,0],"\u00c6":[14,2,14,33,1,1,1,1,0],"\u00c7":[14,10,1,28,1,1,1,0],"\u00c8":[14,33,1,15,1,1,1,0],"\u00c9":[14,33,1,14,1,1,1,0],"\u00ca":[14,33,1,18,1,1,1,0],"\u00cb":[14,33,1,19,1,1,1,0],"\u00cc":[14,50,1,15,1,1,1,0],"\u00cd":[14,50,1,14,1,1,1,0],"\u00ce":[14,50,1,18,1,1,1,0],"\u00cf":[14,50,1,19,1,1,1,0],"\u00d0":[14,26,1,104,1,1,1,0],"\u00d1":[14,112,1,25,1,1,1,0],"\u00d2":[14,124,1,15,1,1,1,0],"\u00d3":[14,124,1,14,1,1,1,0],"\u00d4":[14,124,1,18,1,1,1,0],"\u00d5":[14,124,1,25,1,1,1,0],"\u00d6":[14,124,1,19,1,1,1,0],"\u00d7":[8,28,1,1,1,1,0],"\u00d8":[14,124,1,33,1,1,1,0],"\u00d9":[14,159,1,15,1,1,1,0],"\u00da":[14,159,1,14,1,1,1,0],"\u00db":[14,159,1,18,1,1,1,0],"\u00dc":[14,159,1,19,1,1,1,0],"\u00dd":[14,167,1,14,1,1,1,0],"\u00de":[14,153,14,44,1,1,1,1,0],"\u00df":[14,145,14,145,1,1,1,1,0],"\u00e0":[14,2,1,15,1,1,1,0],"\u00e1":[14,2,1,14,1,1,1,0],"\u00e2":[14,2,1,18,1,1,1,0],"\u00e3":[14,2,1,25,1,1,1,0],"\u00e4":[14,2,1,19,1,1,1,0],"\u00e5":[14,2,1,26,1,1,1,0],"\u00e6":[14,2,14,33,1,1,1,1,0],"\u00e7":[14,10,1,28,1,1,1,0],"\u00e8":[14,33,1,15,1,1,1,0],"\u00e9":[14,33,1,14,1,1,1,0],"\u00ea":[14,33,1,18,1,1,1,0],"\u00eb":[14,33,1,19,1,1,1,0],"\u00ec":[14,50,1,15,1,1,1,0],"\u00ed":[14,50,1,14,1,1,1,0],"\u00ee":[14,50,1,18,1,1,1,0],"\u00ef":[14,50,1,19,1,1,1,0],"\u00f0":[14,26,1,104,1,1,1,0],"\u00f1":[14,112,1,25,1,1,1,0],"\u00f2":[14,124,1,15,1,1,1,0],"\u00f3":[14,124,1,14,1,1,1,0],"\u00f4":[14,124,1,18,1,1,1,0],"\u00f5":[14,124,1,25,1,1,1,0],"\u00f6":[14,124,1,19,1,1,1,0],"\u00f7":[8,29,1,1,1,1,0],"\u00f8":[14,124,1,33,1,1,1,0],"\u00f9":[14,159,1,15,1,1,1,0],"\u00fa":[14,159,1,14,1,1,1,0],"\u00fb":[14,159,1,18,1,1,1,0],"\u00fc":[14,159,1,19,1,1,1,0],"\u00fd":[14,167,1,14,1,1,1,0],"\u00fe":[14,153,14,44,1,1,1,1,0],"\u00ff":[14,167,1,19,1,1,1,0]}'''
+    # Parsed once, shared by all the instances (see also the sort key table below the class)
+    db = json.loads(JSON_DB)
     
     # ChatGPT suggestion from highest to lowest top 20: Default.aspx, Index.aspx, Home.aspx, Default2.aspx, Default3.aspx, Start.aspx, Welcome.aspx, Main.aspx, DefaultPage.aspx, DefaultHome.aspx, Landing.aspx, MainPage.aspx, Portal.aspx, DefaultIndex.aspx, StartPage.aspx, Dashboard.aspx, Overview.aspx, Entry.aspx, Intro.aspx, DefaultView.aspx
 
@@ -264,21 +289,25 @@ class Viewstate_Helpers:
     verified_path = None
     verified_apppath = None
 
-    # verified_potential_apppaths can be useful when we have a way to verify which path is an application path (actively or passively)
-    verified_potential_apppaths = set()
     generators = []
 
-    def __init__(self, url, generator="00000000", findviewstatepage=False, calculate_generator=True, is_debug=False):
+    # site is the ViewstateSite of the URL's host (see viewstate_sites) when the results are shared with its other pages
+    def __init__(self, url, generator="00000000", findviewstatepage=False, calculate_generator=True, is_debug=False, site=None):
         self.is_debug = is_debug
         self.url = self.clean_aspx_path(self.normalize_path_in_url(self.remove_cookieless_if_needed(url)))
         self.findviewstatepage = findviewstatepage
-        self.db = json.loads(self.JSON_DB)
         self.calculate_generator = calculate_generator
+        self.site = site
+        # verified_potential_apppaths can be useful when we have a way to verify which path is an application path (actively or passively).
+        # They belong to this URL only: what its host shares goes through site
+        self.verified_potential_apppaths = set()
 
         if generator != "00000000":
             self.generators = [generator]
             #self.default_pages = self.default_pages_large_set
-            self.verified_path, self.verified_apppath = self.find_valid_path_params_by_generator(generator)
+            self.verified_path, self.verified_apppath = self.site_memoize(
+                ("path_params", generator.upper()), lambda: self.find_valid_path_params_by_generator(generator)
+            )
             if not (self.verified_path and self.verified_apppath):
                 # Generator does not match the path, we are not doing well here!
                 if self.is_debug:
@@ -286,6 +315,8 @@ class Viewstate_Helpers:
                 pass
             else:
                 self.verified_potential_apppaths.add(self.verified_apppath)
+                if self.site:
+                    self.site.set_apppath(self.verified_apppath, True)
                 if self.is_debug:
                     print("Verified path: ", self.verified_path)
                     print("Verified apppath: ", self.verified_apppath)
@@ -294,7 +325,15 @@ class Viewstate_Helpers:
             if self.is_debug:
                 print("Calculating possible generator values using a small set...")
             self.default_pages = self.default_pages_small_set
-            self.generators = self.calculate_potential_viewstate_generators()
+            self.generators = list(self.site_memoize(
+                ("generators", self.findviewstatepage, tuple(self.default_pages)), self.calculate_potential_viewstate_generators
+            ))
+
+    # compute() for this page, memoized in its site when there is one
+    def site_memoize(self, key, compute):
+        if not self.site:
+            return compute()
+        return self.site.memoize(urlparse(self.url).path, key, compute)
 
     def calculate_potential_viewstate_generators(self):
         str_path, iis_apps_in_path = self.extract_all_from_url(self.url)
@@ -477,6 +516,17 @@ class Viewstate_Helpers:
         return list(set(type_names))
     
     def get_all_specific_purposes(self):
+        key = (
+            "specific_purposes",
+            self.verified_path,
+            self.verified_apppath,
+            tuple(sorted(self.verified_potential_apppaths)),
+            self.findviewstatepage,
+            tuple(self.default_pages),
+        )
+        return [list(specific_purposes) for specific_purposes in self.site_memoize(key, self.build_all_specific_purposes)]
+
+    def build_all_specific_purposes(self):
         if not self.verified_path or not self.verified_apppath:
             str_path, potential_apps_in_path = self.extract_all_from_url(self.url)
             if len(self.verified_potential_apppaths) > 0:
@@ -515,6 +565,21 @@ class Viewstate_Helpers:
         return ch
     
     def get_sort_key(self, s):
+        parts = [sort_key_char_parts(ch) for ch in s]
+        if None not in parts:
+            # The same steps from the precomputed parts of each character
+            main_result = [byte for part in parts[:-1] for byte in part[0]]
+            if parts:
+                main_result.extend(parts[-1][1])
+            if not main_result or main_result[-1] != 1:
+                main_result.append(1)
+            main_result.extend(filter_sort_key_second_pass([part[2] for part in parts if part[2] is not None]))
+            main_result.extend([1,1,1,0])
+            return main_result
+        return self.build_sort_key(s)
+
+    # get_sort_key for any string, raising ValueError for the characters without a sort key
+    def build_sort_key(self, s):
         # --- Step 0. Validate and normalize ---
         for ch in s:
             # Reject control characters (code points 0x00-0x1F or 0x7F)
@@ -615,9 +680,12 @@ class Viewstate_Helpers:
         return hash_val & 0xFFFFFFFF  # ensure 32-bit result
 
     def simulate_GetNonRandomizedStringComparerHashCode(self, str):
-        sk = self.get_sort_key(str)
-        #print("Sort key stsd: ", sk)
-        h = self.legacy_hash_sort_key(sk)
+        h = legacy_string_hashcode(str)
+        if h is None:
+            # Raises the ValueError of the character without a sort key
+            sk = self.build_sort_key(str)
+            #print("Sort key stsd: ", sk)
+            h = self.legacy_hash_sort_key(sk)
         return h
 
     def get_apppaths_hashcodes(self):
@@ -702,22 +770,43 @@ class Viewstate_Helpers:
                         if generator.upper() == self.calculate_generator_value(default_path, temp_apppath):
                             return default_path, temp_apppath
 
+        # Now considering a transfer to error pages: these do not depend on the URL, so their generators are looked up
+        # in the shipped index when it is up to date with the lists (the combinations seen above did not match anyway)
+        if not re.fullmatch(r"[0-9A-Fa-f]{8}", generator):
+            return None, None
+        index = load_generator_index()
+        if index and index.signature == lists_signature(self):
+            for common_path, apppath in index.lookup(int(generator, 16)):
+                if generator.upper() == self.calculate_generator_value(common_path, apppath):
+                    return common_path, apppath
+            return None, None
+
+        for common_path, apppath in self.common_path_params():
+            combination = (common_path, apppath)
+            if combination in seen_combinations:
+                continue
+            seen_combinations.add(combination)
+
+            if generator.upper() == self.calculate_generator_value(common_path, apppath):
+                return common_path, apppath
+        
+        return None, None
+
+    # The common (path, apppath) combinations of error and default pages tried for any URL, in order (see
+    # crapsecrets.generator_index)
+    def common_path_params(self):
+        seen_combinations = set()
         combined_common_pages = self.common_pages + self.default_pages_large_set
-        # Now considering a transfer to error pages
         for common_dirs in self.common_directories:
             for common_page in combined_common_pages:
                 common_path = f"/{common_dirs}/{common_page}"
                 common_path, temp_app_paths = self.extract_all_from_path(common_path)
-                for apppath in temp_app_paths:
+                # Sorted, so that the order (and the index) does not depend on the hash seed
+                for apppath in sorted(temp_app_paths):
                     combination = (common_path, apppath)
-                    if combination in seen_combinations:
-                        continue
-                    seen_combinations.add(combination)
-                    
-                    if generator.upper() == self.calculate_generator_value(common_path, apppath):
-                        return common_path, apppath
-        
-        return None, None
+                    if combination not in seen_combinations:
+                        seen_combinations.add(combination)
+                        yield combination
     
     # based on https://soroush.me/blog/2019/07/iis-application-vs-folder-detection-during-blackbox-testing/
     def find_all_apppaths_actively(self, client):
@@ -732,11 +821,6 @@ class Viewstate_Helpers:
         # Get all possible paths from the URL
         str_path, unverified_apppaths = self.extract_all_from_url(self.url)
 
-        # Common ASP.NET endpoints that can reveal if a path is an application
-        test_suffixes = [
-            "/profile_json_appservice.axd/js"
-        ]
-
         verified_apppaths = set()
         try:
             # Test each potential path with each suffix
@@ -749,25 +833,14 @@ class Viewstate_Helpers:
                     verified_apppaths.add(path)
                     continue
 
-                for suffix in test_suffixes:
-                    test_url = urlbase + re.sub(r'/+', '/', path + suffix)
-                    try:
-                        res = client.get(test_url, follow_redirects=False, timeout=30)
-                        
-                        # Various indicators that this is an application path
-                        if any([
-                            # Profile service returns Type.registerNamespace
-                            (suffix == "/profile_json_appservice.axd/js" and res.status_code == 200
-                             and "Type.registerNamespace" in res.text)
-                        ]):
-                            verified_apppaths.add(path)
-                            if self.is_debug:
-                                print(f"Found application path: {path} using {suffix}")
-                            break   
-                    except (httpx.RequestError, httpx.TimeoutException) as e:
-                        if self.is_debug:
-                            print(f"Error testing {test_url}: {str(e)}")
-                        continue
+                # A directory is only probed once for all the pages of a site
+                is_apppath = self.site.apppath(path) if self.site else None
+                if is_apppath is None:
+                    is_apppath = self.probe_apppath(client, urlbase, path)
+                    if self.site and is_apppath is not None:
+                        self.site.set_apppath(path, is_apppath)
+                if is_apppath:
+                    verified_apppaths.add(path)
             if verified_apppaths:
                 return list(verified_apppaths)
                 
@@ -777,4 +850,233 @@ class Viewstate_Helpers:
             pass
             
         return None
-    
\ No newline at end of file
+
+    # Whether path is an application path, or None when no request got an answer
+    def probe_apppath(self, client, urlbase, path):
+        # Common ASP.NET endpoints that can reveal if a path is an application
+        test_suffixes = [
+            "/profile_json_appservice.axd/js"
+        ]
+
+        is_apppath = None
+        for suffix in test_suffixes:
+            test_url = urlbase + re.sub(r'/+', '/', path + suffix)
+            try:
+                res = client.get(test_url, follow_redirects=False, timeout=30)
+                
+                # Various indicators that this is an application path
+                if any([
+                    # Profile service returns Type.registerNamespace
+                    (suffix == "/profile_json_appservice.axd/js" and res.status_code == 200
+                     and "Type.registerNamespace" in res.text)
+                ]):
+                    if self.is_debug:
+                        print(f"Found application path: {path} using {suffix}")
+                    return True
+                is_apppath = False
+            except (httpx.RequestError, httpx.TimeoutException) as e:
+                if self.is_debug:
+                    print(f"Error testing {test_url}: {str(e)}")
+                continue
+        return is_apppath
+
+
+# The generator search hashes the same directories and page names over and over (and all the paths of a directory
+# share their start), so the sort key of each character is computed once, the hash codes are memoized in a bounded LRU
+# cache and the state of the hash over a directory is reused by the paths inside it.
+HASHCODE_CACHE_SIZE = 65536
+_HASH_MASK = 0xFFFFFFFF
+
+
+# (sort key bytes when not the last character, when the last character, second pass value or None) of a character
+# (see Viewstate_Helpers.get_sort_key), or None when it has no sort key
+def build_sort_key_char_parts(ch):
+    if (0 <= ord(ch) < 32) or (ord(ch) == 127):
+        return None
+    db = Viewstate_Helpers.db
+    if ch.isalpha():
+        ch = next((c for c in (ch.lower(), ch.upper()) if c in db), None)
+    if ch not in db:
+        return None
+    mapping = db[ch]
+    rem = mapping[2:]
+    first_one = rem.index(1) if 1 in rem else len(rem)
+    second = None
+    if first_one + 1 < len(rem):
+        second = 2 if rem[first_one + 1] == 1 else rem[first_one + 1]
+    return tuple(mapping[0:2] + rem[:first_one]), tuple(mapping[0:2] + rem[:first_one + 1]), second
+
+
+# Every character of the mapping (and the other case of its letters) up front, any other one on first use
+_sort_key_table = {
+    c: build_sort_key_char_parts(c) for ch in Viewstate_Helpers.db for c in (ch, ch.lower(), ch.upper()) if len(c) == 1
+}
+
+
+def sort_key_char_parts(ch):
+    parts = _sort_key_table.get(ch)
+    if parts is None and ch not in _sort_key_table:
+        parts = _sort_key_table[ch] = build_sort_key_char_parts(ch)
+    return parts
+
+
+# Step 3 of get_sort_key: drops the 2s after the last value greater than 2 (everything when there is none)
+def filter_sort_key_second_pass(values):
+    last_gt_index = None
+    for i, val in enumerate(values):
+        if val > 2:
+            last_gt_index = i
+    if last_gt_index is None:
+        return []
+    return values[:last_gt_index+1] + [val for val in values[last_gt_index+1:] if val != 2]
+
+
+# Viewstate_Helpers.legacy_hash_sort_key over the sort key bytes in steps: state is (acc1, acc2, index of the next
+# byte or None once a 0 ended the hash)
+def legacy_hash_update(state, sort_key):
+    acc1, acc2, i = state
+    if i is None:
+        return state
+    for byte in sort_key:
+        if byte == 0:
+            return acc1, acc2, None
+        if i & 1:
+            acc2 = ((acc2 * 33) ^ byte) & _HASH_MASK
+        else:
+            acc1 = ((acc1 * 33) ^ byte) & _HASH_MASK
+        i += 1
+    return acc1, acc2, i
+
+
+# The hash state and the second pass values of a directory (ending with /) as the start of a longer string, or None
+@functools.lru_cache(maxsize=HASHCODE_CACHE_SIZE)
+def _directory_hash_state(directory):
+    state = (0x1505, 0x1505, 0)
+    second_pass = []
+    for ch in directory:
+        parts = sort_key_char_parts(ch)
+        if parts is None:
+            return None
+        state = legacy_hash_update(state, parts[0])
+        if parts[2] is not None:
+            second_pass.append(parts[2])
+    return state, tuple(second_pass)
+
+
+# Viewstate_Helpers.simulate_GetNonRandomizedStringComparerHashCode, or None when a character has no sort key
+@functools.lru_cache(maxsize=HASHCODE_CACHE_SIZE)
+def legacy_string_hashcode(s):
+    directory_end = s.rfind("/", 0, len(s) - 1) + 1
+    directory = _directory_hash_state(s[:directory_end])
+    if directory is None:
+        return None
+    state, second_pass = directory
+    second_pass = list(second_pass)
+    last_byte = None
+    for position in range(directory_end, len(s)):
+        parts = sort_key_char_parts(s[position])
+        if parts is None:
+            return None
+        main_part = parts[0] if position < len(s) - 1 else parts[1]
+        state = legacy_hash_update(state, main_part)
+        if main_part:
+            last_byte = main_part[-1]
+        if parts[2] is not None:
+            second_pass.append(parts[2])
+    if last_byte != 1:
+        state = legacy_hash_update(state, (1,))
+    state = legacy_hash_update(state, filter_sort_key_second_pass(second_pass))
+    acc1, acc2, _ = legacy_hash_update(state, (1, 1, 1, 0))
+    return ((acc2 * 0x5d588b65) + acc1) & _HASH_MASK
+
+
+class SitePathNode:
+    __slots__ = ("children", "is_apppath", "results")
+
+    def __init__(self):
+        self.children = {}
+        # Whether this directory is an IIS application, None until a page found out
+        self.is_apppath = None
+        # (page path, key) -> result memoized by the Viewstate_Helpers of the pages at this path
+        self.results = {}
+
+
+class ViewstateSite:
+    """
+    What the pages of one host have in common, shared by their Viewstate_Helpers (see the site argument).
+
+    A trie of the paths seen holds which directories are IIS applications (probed once by
+    find_all_apppaths_actively, or proven by a matching __VIEWSTATEGENERATOR) and the generators, path parameters and
+    specific purposes already computed for each page. The hash codes behind them are memoized for all the sites (see
+    legacy_string_hashcode), so a new page of a crawl only computes what is specific to its own path.
+    """
+
+    def __init__(self, urlbase):
+        self.urlbase = urlbase
+        self.root = SitePathNode()
+        self._lock = threading.Lock()
+
+    def node(self, path):
+        node = self.root
+        with self._lock:
+            for segment in path.split("/"):
+                if segment:
+                    node = node.children.get(segment) or node.children.setdefault(segment, SitePathNode())
+        return node
+
+    # Whether the directory at path is an application (None when unknown)
+    def apppath(self, path):
+        return self.node(path).is_apppath
+
+    def set_apppath(self, path, is_apppath):
+        self.node(path).is_apppath = is_apppath
+
+    # The applications found so far, from the root
+    def apppaths(self):
+        found = []
+        stack = [("", self.root)]
+        while stack:
+            path, node = stack.pop()
+            if node.is_apppath:
+                found.append(path or "/")
+            stack.extend((f"{path}/{segment}", child) for segment, child in node.children.items())
+        return sorted(found)
+
+    # compute() for the page at path, computed once per key
+    def memoize(self, path, key, compute):
+        results = self.node(path).results
+        key = (path,) + key
+        result = results.get(key)
+        if result is None and key not in results:
+            result = results[key] = compute()
+        return result
+
+
+class ViewstateSites:
+    """Process-wide ViewstateSite of each host (scheme://host:port), the least recently used ones dropped past max_sites"""
+
+    def __init__(self, max_sites=256):
+        self.max_sites = max_sites
+        self._sites = OrderedDict()
+        self._lock = threading.Lock()
+
+    def site(self, url):
+        parsed_url = urlparse(url)
+        urlbase = f"{parsed_url.scheme}://{parsed_url.netloc}".lower()
+        with self._lock:
+            site = self._sites.get(urlbase)
+            if site is None:
+                site = self._sites[urlbase] = ViewstateSite(urlbase)
+                while len(self._sites) > self.max_sites:
+                    self._sites.popitem(last=False)
+            else:
+                self._sites.move_to_end(urlbase)
+            return site
+
+    def clear(self):
+        with self._lock:
+            self._sites.clear()
+
+
+# Shared by the ViewState and WebResource modules
+viewstate_sites = ViewstateSites()
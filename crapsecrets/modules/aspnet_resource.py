@@ -1,18 +1,17 @@
 import re
 import hmac
 import base64
-import hashlib
 import binascii
 import traceback
 from Crypto.Cipher import AES, DES, DES3
 from contextlib import suppress
 from urllib.parse import urljoin, urlsplit
-from crapsecrets.helpers import Viewstate_Helpers, isolate_app_process, unpad, sp800_108_derivekey, sp800_108_get_key_derivation_parameters, Purpose, aspnet_resource_b64_to_standard_b64, matchLooseBase64RegEx
+from crapsecrets.helpers import Viewstate_Helpers, viewstate_sites, isolate_app_process, unpad, sp800_108_derivekey_cached, Purpose, aspnet_resource_b64_to_standard_b64, matchLooseBase64RegEx
 from crapsecrets.base import CrapsecretsBase, Section, generic_base64_regex
 import concurrent.futures
 from threading import Event
 from enum import Enum
-from crapsecrets.modules.aspnet_viewstate import DotNetMode
+from crapsecrets.modules.aspnet_viewstate import DotNetMode, ViewstateJob
 
 class ASPNET_Resource(CrapsecretsBase):
     is_debug = False
@@ -21,6 +20,7 @@ class ASPNET_Resource(CrapsecretsBase):
     product_group_number_in_carve = [1,3] # This is probably wrong to use a RegEx in this - we will have some unknown products!
     identify_regex = generic_base64_regex
     description = {"product": "ASP.NET Resource", "secret": "ASP.NET MachineKey", "severity": "HIGH"}
+    carve_on_caller = True
     requests_response = None
     client = None
     all_viewstate_keys = False
@@ -30,10 +30,7 @@ class ASPNET_Resource(CrapsecretsBase):
     test_IsolateApps = True
     continue_without_valid_path = False
     is_from_body = False
-    thread_number = 1
     machinekeyfile = ["./crapsecrets/resources/aspnet_machinekeys.txt"]
-    validation_keys = []
-    decryption_keys = []
 
     def carve_regex(self):
         # Using RegEx is bad here as the viewstate can be split into multiple fields
@@ -85,7 +82,6 @@ class ASPNET_Resource(CrapsecretsBase):
             if commandargs.enable_viewstate_decryption:
                 self.find_decryption_key_without_validation_key = True
 
-        self.thread_number = 1
         if commandargs:
             if commandargs.num_threads and commandargs.num_threads > 0:
                 self.thread_number = commandargs.num_threads
@@ -206,7 +202,8 @@ class ASPNET_Resource(CrapsecretsBase):
         apppaths_hashcodes = [None]
         if self.test_IsolateApps and generatorHex and generatorHex != "00000000":
             # we don't need to do this in a loop to increase performance
-            viewstate_helpers = Viewstate_Helpers(url, generatorHex, findviewstatepage=self.find_viewstate_page, calculate_generator=True, is_debug=self.is_debug)
+            # The pages of a host share their application paths and what was already computed for them
+            viewstate_helpers = Viewstate_Helpers(url, generatorHex, findviewstatepage=self.find_viewstate_page, calculate_generator=True, is_debug=self.is_debug, site=viewstate_sites.site(url))
             # Shall we send some requests to the server to find the application paths?
             if self.find_app_path_proactively and not viewstate_helpers.verified_apppath and viewstate_helpers.any_directory_in_url():
                 # We now have permission to send requests to the target URL to see whether we can find all paths which are application paths
@@ -241,46 +238,14 @@ class ASPNET_Resource(CrapsecretsBase):
         
         results = []      
 
-        # Get lines from the file(s) using your load_resources function
-        lines = self.load_resources(self.machinekeyfile, True)
-
-        # Use a set to store unique lines after stripping and filtering
-        unique_lines = set()
-        for line in lines:
-            stripped_line = line.strip()
-            if not stripped_line or stripped_line.startswith("#"):
-                continue
-            unique_lines.add(stripped_line)
-
-        if(len(self.validation_keys) == 0 or len(self.decryption_keys) == 0):
-            # Initialize lists for validation and decryption keys
-            validation_keys = []
-            decryption_keys = []
-
-            # Process each unique line
-            for line in unique_lines:
-                try:
-                    # Split only at the first comma in case keys contain commas
-                    validation, decryption = line.split(",", 1)
-                    validation_keys.append(validation.strip())
-                    decryption_keys.append(decryption.strip())
-                except ValueError:
-                    #print(f"Skipping malformed line: {line}")
-                    pass
-            
-            
-            if self.all_viewstate_keys:
-                # Combine both lists and remove duplicate keys
-                validation_keys = list(set(validation_keys + decryption_keys))
-                # Make sure it does not contain empty or white space strings
-                validation_keys = [key for key in validation_keys if key.strip()]
-                decryption_keys = validation_keys
-                
-            self.validation_keys = validation_keys
-            self.decryption_keys = decryption_keys
-        else:
-            validation_keys = self.validation_keys
-            decryption_keys = self.decryption_keys  
+        # The machine keys are parsed and unhexlified once per process (see MachineKeyStore)
+        machine_keys = self.load_machine_keys(self.machinekeyfile, True)
+        if self.all_viewstate_keys:
+            # Every key is tried both as validation and decryption key
+            machine_keys = machine_keys.merged()
+        # (key, key bytes) pairs, the key bytes being None when the key is not hex (e.g. AutoGenerate)
+        validation_keys = machine_keys.validation_keys()
+        decryption_keys = machine_keys.decryption_keys()
 
         if len(validation_keys) == 0:
             print("No keys found in the resource file(s) for the ViewState module! Checks will be incomplete.")
@@ -300,6 +265,9 @@ class ASPNET_Resource(CrapsecretsBase):
         chunk_size = max(10, len(validation_keys) // self.thread_number)
         chunked_validation_keys = list(chunks(validation_keys, chunk_size))
 
+        # What the checks of every key share is prepared once (see ViewstateJob)
+        job = ViewstateJob(signed_encrypted_B64, True, main_purpose=main_purpose, all_specific_purposes=[[]])
+
         def check_validation_key_chunk(chunk):
             # Each chunk gets its own local tested set
             local_tested = set()
@@ -309,14 +277,15 @@ class ASPNET_Resource(CrapsecretsBase):
             if validation_stop_event.is_set():
                 return None
                     
-            for vkey in chunk:
+            for vkey, vkey_bytes in chunk:
                 try:
                     # Skip keys which have been tested before to increase performance
                     if vkey in local_tested:
                         continue
                     local_tested.add(vkey)
 
-                    if vkey.lower() == "autogenerate":
+                    # Not hex (e.g. AutoGenerate)
+                    if vkey_bytes is None:
                         continue
 
                     # Each thread gets its own local variables
@@ -331,12 +300,13 @@ class ASPNET_Resource(CrapsecretsBase):
                                 vkey = isolate_app_process(vkey, apppath_hashcode)
                                 if not vkey:
                                     continue
+                                vkey_bytes = binascii.unhexlify(vkey)
                             elif apppath_hashcode and mode == DotNetMode.DOTNET45:
                                 # IsolateApps won't work with DOTNET45
                                 continue
-                            
+
                             local_validation_algo, process_validationkey_result = self.process_validationkey(
-                                vkey, mode, signed_encrypted_B64, main_purpose, original_key
+                                vkey, vkey_bytes, mode, job, original_key
                             )
                             
                             if local_validation_algo:
@@ -382,7 +352,7 @@ class ASPNET_Resource(CrapsecretsBase):
                                     # Narrow down the keys to the one that has been confirmed
                                     selected_decryption_keys = [
                                         decryption_keys[j] for j in range(len(validation_keys))
-                                        if validation_keys[j] == vkey
+                                        if validation_keys[j][0] == vkey
                                     ]
                             
                                 # We have found the decryption key
@@ -416,13 +386,14 @@ class ASPNET_Resource(CrapsecretsBase):
                 if decryption_stop_event.is_set():
                     return None
 
-                for dkey in chunk:
+                for dkey, dkey_bytes in chunk:
                     # Skip keys which have been tested before
                     if dkey in local_tested:
                         continue
                     local_tested.add(dkey)
-                    
-                    if dkey.lower() == "autogenerate":
+
+                    # Not hex (e.g. AutoGenerate)
+                    if dkey_bytes is None:
                         continue
                     
                     original_key = dkey
@@ -436,13 +407,13 @@ class ASPNET_Resource(CrapsecretsBase):
                                     dkey = isolate_app_process(dkey, apppath_hashcode)
                                     if not dkey:
                                         continue
+                                    dkey_bytes = binascii.unhexlify(dkey)
                                 elif apppath_hashcode and mode == DotNetMode.DOTNET45:
                                     # IsolateApps won't work with DOTNET45
                                     continue
                         
                                 result = self.process_decryption_keys(
-                                    confirmed_validation_algo, dkey, mode, signed_encrypted_B64,
-                                    main_purpose, original_key
+                                    confirmed_validation_algo, dkey, dkey_bytes, mode, job, original_key
                                 )
                                 
                                 if result:
@@ -534,21 +505,15 @@ class ASPNET_Resource(CrapsecretsBase):
 
     
     # Returns validation_algo, specific_purpose, viewstate_userkey, result in string
-    def process_validationkey(self, vkey, mode, signed_encrypted_B64, main_purpose=Purpose.AssemblyResourceLoader_WebResourceUrl.value, original_key=None):
+    # vkey_bytes is the unhexlified vkey
+    def process_validationkey(self, vkey, vkey_bytes, mode, job, original_key=None):
         validation_algo = None
         result = ""
 
         if not original_key:
             original_key = vkey
-        
-        try:
-            validation_algo = self.resource_validate_check(
-                binascii.unhexlify(vkey), signed_encrypted_B64, mode, main_purpose
-            )
-        except binascii.Error as e:
-            # This is to see invalid keys in the file
-            #print("Invalid key in the resource file: " + vkey)
-            pass
+
+        validation_algo = self.resource_validate_check(vkey_bytes, job, mode)
             
         if not validation_algo:
             return None, None
@@ -570,30 +535,25 @@ class ASPNET_Resource(CrapsecretsBase):
 
         return validation_algo, result
     
-    def process_decryption_keys(self, validation_algo, dkey, mode, signed_encrypted_B64, main_purpose=Purpose.AssemblyResourceLoader_WebResourceUrl.value, original_key=None):
+    # dkey_bytes is the unhexlified dkey
+    def process_decryption_keys(self, validation_algo, dkey, dkey_bytes, mode, job, original_key=None):
         # Simplified to handle single key check
         result = ""
         if not original_key:
             original_key = dkey
 
-        try:
-            candidate_bytes = binascii.unhexlify(dkey)
-            decryption_algo = self.resource_decrypt_check(
-                candidate_bytes, validation_algo, signed_encrypted_B64, mode, main_purpose
-            )
-            if decryption_algo:
-                if self.all_viewstate_keys or validation_algo == "guess":
-                    if original_key != dkey:
-                        result = f" (Potential EncryptionKey: [{original_key},IsolateApps] with DecryptionAlgo: [{decryption_algo}])"
-                    else:
-                        result = f" (Potential DecryptionKey: [{original_key}] DecryptionAlgo: [{decryption_algo}])"
+        decryption_algo = self.resource_decrypt_check(dkey_bytes, validation_algo, job, mode)
+        if decryption_algo:
+            if self.all_viewstate_keys or validation_algo == "guess":
+                if original_key != dkey:
+                    result = f" (Potential EncryptionKey: [{original_key},IsolateApps] with DecryptionAlgo: [{decryption_algo}])"
                 else:
-                    if original_key != dkey:
-                        result = f" EncryptionKey: [{original_key},IsolateApps] with DecryptionAlgo: [{decryption_algo}]"
-                    else:
-                        result = f" EncryptionKey: [{original_key}] EncryptionAlgo: [{decryption_algo}]"
-        except binascii.Error:
-            pass
+                    result = f" (Potential DecryptionKey: [{original_key}] DecryptionAlgo: [{decryption_algo}])"
+            else:
+                if original_key != dkey:
+                    result = f" EncryptionKey: [{original_key},IsolateApps] with DecryptionAlgo: [{decryption_algo}]"
+                else:
+                    result = f" EncryptionKey: [{original_key}] EncryptionAlgo: [{decryption_algo}]"
 
         if result != "":
             return result
@@ -601,163 +561,132 @@ class ASPNET_Resource(CrapsecretsBase):
 
     # Return hash algorithm, specific purpose, and ViewStateUserKey if successful
     # In case MAC validation is not enabled, it will return "MAC is not enabled!"
-    def resource_validate_check(self, vkey_bytes, signed_encrypted_B64, mode, main_specific_purpose=Purpose.AssemblyResourceLoader_WebResourceUrl.value):
+    # job is the ViewstateJob of the search
+    def resource_validate_check(self, vkey_bytes, job, mode):
         shortest_encrypted = 8
-        is_valid = True
 
-        if signed_encrypted_B64 == None or len(signed_encrypted_B64) < shortest_encrypted:
-            is_valid = False
-    
-        if is_valid:
-            original_vkey_bytes = vkey_bytes
-            signed_encrypted_bytes = base64.b64decode(signed_encrypted_B64)
-            candidate_hash_algs = list(self.hash_sizes.keys())
+        if job.viewstate_bytes is None or len(job.viewstate_B64) < shortest_encrypted:
+            return None
+
+        # The only derivation of the resources: the main purpose without specific purposes
+        _, label, context = job.derivation_parameters[None][0]
+
+        for hash_alg in job.candidate_hash_algs:
+            signed_encrypted_data, signature = job.signed_parts[hash_alg]
+            if mode == DotNetMode.DOTNET45:
+                derived_vkey_bytes = sp800_108_derivekey_cached(vkey_bytes, label, context, (len(vkey_bytes) * 8))
+                h = hmac.new(
+                    derived_vkey_bytes,
+                    signed_encrypted_data,
+                    self.hash_algs[hash_alg],
+                ).digest()
+            elif hash_alg == "MD5" and mode == DotNetMode.DOTNET40_LEGACY:
+                # The HashDataUsingNonKeyedAlgorithm function in ASP.NET has a bug overwriting the modifier if shorter than validation key! 
+                # So having just 0s will do!
+                # No modifier is used in encrypted mode in the legacy mode
+                md5 = job.md5_midstate().copy()
+                md5.update(vkey_bytes)
+                h = md5.digest()
+            else:
+                h = hmac.new(
+                    vkey_bytes,
+                    signed_encrypted_data,
+                    self.hash_algs[hash_alg],
+                ).digest()
+
+            if h == signature:
+                return hash_alg
 
-            for hash_alg in candidate_hash_algs:
-                
-                vkey_bytes = original_vkey_bytes
-                signed_encrypted_data = signed_encrypted_bytes[: -self.hash_sizes[hash_alg]]
-                signed_encrypted_data_copy = signed_encrypted_data
-
-                signature = signed_encrypted_bytes[-self.hash_sizes[hash_alg] :]
-                if mode == DotNetMode.DOTNET45:                   
-                    label, context = sp800_108_get_key_derivation_parameters(
-                        main_specific_purpose, []
-                    )
-                    derived_vkey_bytes = sp800_108_derivekey(vkey_bytes, label, context, (len(vkey_bytes) * 8))
-                    h = hmac.new(
-                        derived_vkey_bytes,
-                        signed_encrypted_data_copy,
-                        self.hash_algs[hash_alg],
-                    ).digest()
-                    # This is dirty to have this check here but we are in a loop for the paths (all_specific_purposes) so we need to speed up!
-                    if h == signature:
-                        return hash_alg
-                elif hash_alg == "MD5" and mode == DotNetMode.DOTNET40_LEGACY:
-                    # The HashDataUsingNonKeyedAlgorithm function in ASP.NET has a bug overwriting the modifier if shorter than validation key! 
-                    # So having just 0s will do!
-                    vs_length = len(signed_encrypted_data)
-                    
-                    # No modifier is used in encrypted mode in the legacy mode
-                    totalLength = vs_length + len(vkey_bytes)
-                    b_all = bytearray(totalLength)
-                    b_all[0:vs_length] = signed_encrypted_data
-                    b_all[vs_length:vs_length+len(vkey_bytes)] = vkey_bytes
-                    
-                    h = hashlib.md5(b_all).digest()
-                else:
-                    
-                    h = hmac.new(
-                        vkey_bytes,
-                        signed_encrypted_data_copy,
-                        self.hash_algs[hash_alg],
-                    ).digest()
-
-                if h == signature:
-                    return hash_alg
-        
         return None
 
     # Return the decryption algorithm if successful
-    def resource_decrypt_check(self, ekey_bytes, hash_alg, signed_encrypted_B64, mode, main_specific_purpose=Purpose.AssemblyResourceLoader_WebResourceUrl.value):
+    def resource_decrypt_check(self, ekey_bytes, hash_alg, job, mode):
         # 8 is just a good small number, and 16 is the shortest hash size which will increae 4/3 in base64
         shortest_encrypted = int((8 + 16 * 4/3) + 0.5)
-        is_valid = True
-        if signed_encrypted_B64 == None or len(signed_encrypted_B64) < shortest_encrypted:
-            is_valid = False
-
-        if is_valid:
-            signed_encrypted_bytes = base64.b64decode(signed_encrypted_B64)
-            vs_size = len(signed_encrypted_bytes)
-            block_size = None
-            cipher = None
-            if hash_alg.lower() == "guess":
-                hash_algs = self.hash_sizes.keys()
-            else:
-                hash_algs = [hash_alg]
-
-            for hash_alg in hash_algs:
-                dec_algos = set()
-                hash_size = self.hash_sizes[hash_alg]
-
-                if (vs_size - hash_size) % AES.block_size == 0:
-                    dec_algos.add("AES")
-                if (vs_size - hash_size) % DES.block_size == 0:
-                    dec_algos.add("DES")
-                    dec_algos.add("3DES")
-                for dec_algo in list(dec_algos):
-                    with suppress(ValueError):
-                        if mode == DotNetMode.DOTNET45:
-                            label, context = sp800_108_get_key_derivation_parameters(
-                                main_specific_purpose, []
-                            )
-                            derived_ekey_bytes = sp800_108_derivekey(ekey_bytes, label, context, (len(ekey_bytes) * 8))
-                            if dec_algo == "AES":
-                                block_size = AES.block_size
-                                iv = signed_encrypted_bytes[0:block_size]
-                                cipher = AES.new(derived_ekey_bytes, AES.MODE_CBC, iv)
-                                blockpadlen_raw = len(derived_ekey_bytes) % AES.block_size
-                                if blockpadlen_raw == 0:
-                                    blockpadlen = block_size
-                                else:
-                                    blockpadlen = blockpadlen_raw
-                            elif dec_algo == "3DES":
-                                block_size = DES3.block_size
-                                iv = signed_encrypted_bytes[0:block_size]
-                                cipher = DES3.new(derived_ekey_bytes, DES3.MODE_CBC, iv)
-                                # blockpadlen_raw = len(derived_ekey_bytes) % DES3.block_size
-                                # if blockpadlen_raw == 0:
-                                #     blockpadlen = block_size
-                                # else:
-                                #     blockpadlen = blockpadlen_raw
-                                blockpadlen = 16
+        if job.viewstate_bytes is None or len(job.viewstate_B64) < shortest_encrypted:
+            return None
+
+        signed_encrypted_bytes = job.viewstate_bytes
+        _, label, context = job.derivation_parameters[None][0]
+        block_size = None
+        cipher = None
+        if hash_alg.lower() == "guess":
+            hash_algs = self.hash_sizes.keys()
+        else:
+            hash_algs = [hash_alg]
+
+        for hash_alg in hash_algs:
+            hash_size = self.hash_sizes[hash_alg]
+            for dec_algo in job.decryption_algos[hash_alg]:
+                with suppress(ValueError):
+                    if mode == DotNetMode.DOTNET45:
+                        derived_ekey_bytes = sp800_108_derivekey_cached(ekey_bytes, label, context, (len(ekey_bytes) * 8))
+                        if dec_algo == "AES":
+                            block_size = AES.block_size
+                            iv = signed_encrypted_bytes[0:block_size]
+                            cipher = AES.new(derived_ekey_bytes, AES.MODE_CBC, iv)
+                            blockpadlen_raw = len(derived_ekey_bytes) % AES.block_size
+                            if blockpadlen_raw == 0:
+                                blockpadlen = block_size
                             else:
-                                # we don't use DES in DOTNET45
-                                continue
+                                blockpadlen = blockpadlen_raw
+                        elif dec_algo == "3DES":
+                            block_size = DES3.block_size
+                            iv = signed_encrypted_bytes[0:block_size]
+                            cipher = DES3.new(derived_ekey_bytes, DES3.MODE_CBC, iv)
+                            # blockpadlen_raw = len(derived_ekey_bytes) % DES3.block_size
+                            # if blockpadlen_raw == 0:
+                            #     blockpadlen = block_size
+                            # else:
+                            #     blockpadlen = blockpadlen_raw
+                            blockpadlen = 16
                         else:
-                            # This for DOTNET40 and legacy mode
-                            if dec_algo == "AES":
-                                block_size = AES.block_size
-                                iv = signed_encrypted_bytes[0:block_size]
-                                cipher = AES.new(ekey_bytes, AES.MODE_CBC, iv)
-                                blockpadlen_raw = len(ekey_bytes) % block_size
-                                if blockpadlen_raw == 0:
-                                    blockpadlen = block_size
-                                else:
-                                    blockpadlen = blockpadlen_raw
-                            elif dec_algo == "3DES":
-                                block_size = DES3.block_size
-                                iv = signed_encrypted_bytes[0:block_size]
-                                cipher = DES3.new(ekey_bytes[:24], DES3.MODE_CBC, iv)
-                                blockpadlen = 16
-                            elif dec_algo == "DES":
-                                block_size = DES.block_size
-                                iv = signed_encrypted_bytes[0:block_size]
-                                cipher = DES.new(ekey_bytes[:8], DES.MODE_CBC, iv)
-                                # Not sure why we are not fixing the padding here!
-                                blockpadlen = 0
-
-                        if block_size and cipher:
-                            encrypted_raw = signed_encrypted_bytes[block_size:-hash_size]
-                            decrypted_raw = cipher.decrypt(encrypted_raw)
-
-                            with suppress(TypeError):
-                                if mode == DotNetMode.DOTNET45:
-                                    decrypt = unpad(decrypted_raw)
-                                else:
-                                    decrypt = unpad(decrypted_raw[blockpadlen:])
-
-                                try:
-                                    if len(decrypt) > 8 and all(32 <= ord(char) <= 126 for char in decrypt.decode('utf-8')):
-                                        # This might not be the best way to check if the decrypted data is valid
-                                        # We will nee the formula here to check if the decrypted data is valid
-                                        if self.is_debug:
-                                            print(f"Decrypted data: {decrypt}")
-                                        return dec_algo
-                                except Exception:
-                                    continue
+                            # we don't use DES in DOTNET45
+                            continue
+                    else:
+                        # This for DOTNET40 and legacy mode
+                        if dec_algo == "AES":
+                            block_size = AES.block_size
+                            iv = signed_encrypted_bytes[0:block_size]
+                            cipher = AES.new(ekey_bytes, AES.MODE_CBC, iv)
+                            blockpadlen_raw = len(ekey_bytes) % block_size
+                            if blockpadlen_raw == 0:
+                                blockpadlen = block_size
+                            else:
+                                blockpadlen = blockpadlen_raw
+                        elif dec_algo == "3DES":
+                            block_size = DES3.block_size
+                            iv = signed_encrypted_bytes[0:block_size]
+                            cipher = DES3.new(ekey_bytes[:24], DES3.MODE_CBC, iv)
+                            blockpadlen = 16
+                        elif dec_algo == "DES":
+                            block_size = DES.block_size
+                            iv = signed_encrypted_bytes[0:block_size]
+                            cipher = DES.new(ekey_bytes[:8], DES.MODE_CBC, iv)
+                            # Not sure why we are not fixing the padding here!
+                            blockpadlen = 0
+
+                    if block_size and cipher:
+                        encrypted_raw = job.ciphertext(block_size, hash_size)
+                        decrypted_raw = cipher.decrypt(encrypted_raw)
+
+                        with suppress(TypeError):
+                            if mode == DotNetMode.DOTNET45:
+                                decrypt = unpad(decrypted_raw)
+                            else:
+                                decrypt = unpad(decrypted_raw[blockpadlen:])
 
-                                else:
-                                    continue
+                            try:
+                                if len(decrypt) > 8 and all(32 <= ord(char) <= 126 for char in decrypt.decode('utf-8')):
+                                    # This might not be the best way to check if the decrypted data is valid
+                                    # We will nee the formula here to check if the decrypted data is valid
+                                    if self.is_debug:
+                                        print(f"Decrypted data: {decrypt}")
+                                    return dec_algo
+                            except Exception:
+                                continue
+
+                            else:
+                                continue
         
         return None
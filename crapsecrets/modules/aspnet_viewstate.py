@@ -11,16 +11,154 @@ from Crypto.Cipher import AES, DES, DES3
 from libs.viewstate.viewstate import ViewState
 from contextlib import suppress
 from urllib.parse import urlsplit, urljoin
-from crapsecrets.helpers import Viewstate_Helpers, unpad, sp800_108_derivekey, sp800_108_get_key_derivation_parameters, Purpose, matchLooseBase64RegEx, isolate_app_process
+from crapsecrets.helpers import Viewstate_Helpers, viewstate_sites, unpad, sp800_108_derivekey_cached, sp800_108_get_key_derivation_parameters, Purpose, matchLooseBase64RegEx, isolate_app_process
 from crapsecrets.base import CrapsecretsBase, Section, generic_base64_regex
 import concurrent.futures
+import multiprocessing
 from threading import Event
+from contextlib import contextmanager
 from enum import Enum
 
 class DotNetMode(Enum):
     DOTNET45 = "DOTNET45"
     DOTNET40_LEGACY = "DOTNET40 (legacy)"
 
+
+# threading.Event look-alike over a byte of shared memory, so worker processes see when a key has been found
+class ProcessStopEvent:
+    def __init__(self, flag=None, context=multiprocessing):
+        self.flag = flag if flag is not None else context.Value("b", 0, lock=False)
+
+    def is_set(self):
+        return bool(self.flag.value)
+
+    def set(self):
+        self.flag.value = 1
+
+
+# Stop event of the current worker process, inherited from the pool that started it
+key_worker_stop_event = None
+
+
+def init_key_worker(flag):
+    global key_worker_stop_event
+    key_worker_stop_event = ProcessStopEvent(flag)
+
+
+def run_key_worker(check, chunk, *args):
+    return check(chunk, key_worker_stop_event, *args)
+
+
+# Key chunk worker processes are started by a fork server (spawned where there is none) rather than forked from the
+# scanning process: that is safe from any thread (carve_all_modules, the daemon and --url-file run the checks in
+# threads), the module and its ViewstateJob being pickled to the workers (see __getstate__)
+def key_worker_context():
+    with suppress(ValueError):
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+# Everything a ViewState check needs that does not depend on the machine key being tested, prepared once per key
+# search: the decoded bytes and their data/signature split for each hash algorithm, the packed generators, the
+# UTF-16LE ViewStateUserKeys and the SP800-108 label/context of each specific purpose. The key loops are left with
+# the MAC (or decryption) of each key. ASPNET_Resource tokens use it too (encrypted, without generators or user keys).
+class ViewstateJob:
+    def __init__(self, viewstate_B64, encrypted, generatorHexList=None, all_viewstate_userkeys=[None], main_purpose=Purpose.WebForms_HiddenFieldPageStatePersister_ClientState.value, all_specific_purposes=None, signature_by_parser=None):
+        self.viewstate_B64 = viewstate_B64
+        self.encrypted = encrypted
+        self.main_purpose = main_purpose
+        self.all_specific_purposes = all_specific_purposes
+        self.signature_by_parser = signature_by_parser
+        try:
+            self.viewstate_bytes = base64.b64decode(viewstate_B64) if viewstate_B64 else None
+        except (binascii.Error, ValueError):
+            self.viewstate_bytes = None
+        viewstate_bytes = self.viewstate_bytes or b""
+        hash_sizes = CrapsecretsBase.hash_sizes
+
+        if encrypted:
+            self.candidate_hash_algs = list(hash_sizes.keys())
+        elif signature_by_parser:
+            self.candidate_hash_algs = CrapsecretsBase.search_dict(hash_sizes, len(signature_by_parser)) or []
+        else:
+            self.candidate_hash_algs = []
+
+        # hash algorithm -> (signed data, signature)
+        self.signed_parts = {}
+        # hash algorithm -> the decryption algorithms allowed by the size of the encrypted data
+        self.decryption_algos = {}
+        for hash_alg, hash_size in hash_sizes.items():
+            self.signed_parts[hash_alg] = (viewstate_bytes[:-hash_size], viewstate_bytes[-hash_size:])
+            dec_algos = set()
+            if (len(viewstate_bytes) - hash_size) % AES.block_size == 0:
+                dec_algos.add("AES")
+            if (len(viewstate_bytes) - hash_size) % DES.block_size == 0:
+                dec_algos.add("DES")
+                dec_algos.add("3DES")
+            self.decryption_algos[hash_alg] = list(dec_algos)
+
+        # [(generatorHex, packed generator)]
+        self.generators = [(g, struct.pack("<I", int(g, 16))) for g in generatorHexList or []]
+        # [(ViewStateUserKey, UTF-16LE bytes)], (None, None) standing for no ViewStateUserKey
+        self.userkeys = [(u, None if u is None else u.encode("utf-16-le")) for u in all_viewstate_userkeys]
+
+        # ViewStateUserKey -> [(specific purpose, label, context)] of the DOTNET45 key derivations
+        self.derivation_parameters = {}
+        if all_specific_purposes is not None:
+            for viewstate_userkey, _ in self.userkeys:
+                parameters = []
+                for specific_purpose in all_specific_purposes:
+                    tempSpecific_purpose = specific_purpose.copy()
+                    if viewstate_userkey is not None:
+                        # Adding potential ViewStateUserKey
+                        tempSpecific_purpose.append(f"ViewStateUserKey: {viewstate_userkey}")
+                    label, context = sp800_108_get_key_derivation_parameters(main_purpose, tempSpecific_purpose)
+                    parameters.append((specific_purpose, label, context))
+                self.derivation_parameters[viewstate_userkey] = parameters
+
+        # Built on first use, as only some of them are needed by a search
+        self.messages = {}
+        self.ciphertexts = {}
+        self.md5_state = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["messages"] = {}
+        state["ciphertexts"] = {}
+        state["md5_state"] = None
+        return state
+
+    # The MACed bytes for a hash algorithm, a generator index (unsigned when encrypted) and an encoded ViewStateUserKey
+    def message(self, hash_alg, generator=None, userkey_bytes=None):
+        key = (hash_alg, generator, userkey_bytes)
+        message = self.messages.get(key)
+        if message is None:
+            message = self.signed_parts[hash_alg][0]
+            if not self.encrypted and generator is not None:
+                message += self.generators[generator][1]
+            if userkey_bytes:
+                message += userkey_bytes
+            self.messages[key] = message
+        return message
+
+    # The encrypted bytes between the IV and the signature
+    def ciphertext(self, block_size, hash_size):
+        key = (block_size, hash_size)
+        ciphertext = self.ciphertexts.get(key)
+        if ciphertext is None:
+            ciphertext = self.ciphertexts[key] = self.viewstate_bytes[block_size:-hash_size]
+        return ciphertext
+
+    # The MD5 state after the MD5-signed bytes, copied by the DOTNET40 legacy checks so that each key only hashes
+    # what follows them
+    def md5_midstate(self):
+        if self.md5_state is None:
+            self.md5_state = hashlib.md5(self.signed_parts["MD5"][0])
+        return self.md5_state
+
+
 class ASPNET_Viewstate(CrapsecretsBase):
     is_debug = False
     supported_sections = frozenset({Section.BODY})
@@ -28,6 +166,7 @@ class ASPNET_Viewstate(CrapsecretsBase):
     product_group_number_in_carve = [9,13,15] # This is probably wrong to use a RegEx in this - we will have some unknown products!
     identify_regex = generic_base64_regex
     description = {"product": "ASP.NET Viewstate", "secret": "ASP.NET MachineKey", "severity": "CRITICAL"}
+    carve_on_caller = True
     requests_response = None
     client = None
     all_viewstate_keys = False
@@ -37,10 +176,9 @@ class ASPNET_Viewstate(CrapsecretsBase):
     test_IsolateApps = True
     continue_without_valid_path = False
     is_from_body = False
-    thread_number = 1
     machinekeyfile = ["./crapsecrets/resources/aspnet_machinekeys.txt"]
-    validation_keys = []
-    decryption_keys = []
+    # Checkpoint progress of the key search phase running (see process_keys)
+    key_progress = None
 
     def carve_regex(self):
         # Using RegEx is bad here as the viewstate can be split into multiple fields
@@ -101,11 +239,14 @@ class ASPNET_Viewstate(CrapsecretsBase):
             if commandargs.enable_viewstate_decryption:
                 self.find_decryption_key_without_validation_key = True
 
-        self.thread_number = 1
         if commandargs:
             if commandargs.num_threads and commandargs.num_threads > 0:
                 self.thread_number = commandargs.num_threads
 
+        if commandargs:
+            if commandargs.use_processes:
+                self.use_processes = True
+
         self.find_app_path_proactively = True
         if commandargs:
             if commandargs.disable_active_path_check:
@@ -266,7 +407,8 @@ class ASPNET_Viewstate(CrapsecretsBase):
                 encrypted = True
 
             # we don't need to do this in a loop to increase performance
-            viewstate_helpers = Viewstate_Helpers(url, generatorHex, findviewstatepage=self.find_viewstate_page, calculate_generator=True, is_debug=self.is_debug)
+            # The pages of a host share their application paths and what was already computed for them
+            viewstate_helpers = Viewstate_Helpers(url, generatorHex, findviewstatepage=self.find_viewstate_page, calculate_generator=True, is_debug=self.is_debug, site=viewstate_sites.site(url))
             
             # Shall we send some requests to the server to find the application paths?
             if self.find_app_path_proactively and not viewstate_helpers.verified_apppath and viewstate_helpers.any_directory_in_url():
@@ -395,51 +537,78 @@ class ASPNET_Viewstate(CrapsecretsBase):
             print(f"Error fetching public IP: {e}")
             return None
         
+    # Worker processes get a copy of the module without the HTTP client/response and the checkpoint
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ("client", "requests_response", "cookies", "body", "checkpoint", "key_progress"):
+            state.pop(name, None)
+        return state
+
+    # A ProcessStopEvent when the keys are checked by worker processes, an Event otherwise
+    def key_chunk_stop_event(self):
+        if self.use_processes:
+            return ProcessStopEvent(context=key_worker_context())
+        return Event()
+
+    # Yields submit(check, chunk, *args), which runs check(chunk, stop_event, *args) in a pool of thread_number
+    # worker threads, or worker processes (see key_worker_context) when use_processes is set (the GIL otherwise keeps
+    # the checks on one core)
+    @contextmanager
+    def key_chunk_executor(self, stop_event):
+        if self.use_processes:
+            executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.thread_number, mp_context=key_worker_context(),
+                initializer=init_key_worker, initargs=(stop_event.flag,)
+            )
+
+            def submit(check, chunk, *args):
+                return executor.submit(run_key_worker, check, chunk, *args)
+
+        else:
+            executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.thread_number)
+
+            def submit(check, chunk, *args):
+                return executor.submit(check, chunk, stop_event, *args)
+
+        try:
+            yield submit
+        finally:
+            # Chunks which have not started yet are no longer needed once the loop is done, and the running ones stop
+            # at their next check (the loop may have been interrupted)
+            stop_event.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    # (index, key, key bytes) of the (key, key bytes) pairs to test: all of them, or the ones not done yet in a resumed
+    # search (none once it is complete, its stored hits being the results)
+    @staticmethod
+    def remaining_keys(keys, progress):
+        if not progress:
+            return [(n, *key) for n, key in enumerate(keys)]
+        if progress.complete:
+            return []
+        return [(n, *keys[n]) for start, stop in progress.remaining(len(keys)) for n in range(start, stop)]
+
+    # A finished future holding the hits a resumed search had already found, handled like those of a chunk
+    @staticmethod
+    def resumed_hits_future(hits):
+        future = concurrent.futures.Future()
+        future.set_result(hits or None)
+        return future
+
     # Returns list of results
     def process_keys(self, encrypted, signed_maybe_encrypted_B64, generatorHexList, url, modes, all_viewstate_userkeys=[None], main_purpose=Purpose.WebForms_HiddenFieldPageStatePersister_ClientState.value, all_specific_purposes=None, signature_by_parser=None, apppaths_hashcodes=[None]):
         
         results = []      
 
-        # Get lines from the file(s) using your load_resources function
-        lines = self.load_resources(self.machinekeyfile, True)
-
-        # Use a set to store unique lines after stripping and filtering
-        unique_lines = set()
-        for line in lines:
-            stripped_line = line.strip()
-            if not stripped_line or stripped_line.startswith("#"):
-                continue
-            unique_lines.add(stripped_line)
-
-        if(len(self.validation_keys) == 0 or len(self.decryption_keys) == 0):
-            # Initialize lists for validation and decryption keys
-            validation_keys = []
-            decryption_keys = []
-
-            # Process each unique line
-            for line in unique_lines:
-                try:
-                    # Split only at the first comma in case keys contain commas
-                    validation, decryption = line.split(",", 1)
-                    validation_keys.append(validation.strip())
-                    decryption_keys.append(decryption.strip())
-                except ValueError:
-                    #print(f"Skipping malformed line: {line}")
-                    pass
-            
-            
-            if self.all_viewstate_keys:
-                # Combine both lists and remove duplicate keys
-                validation_keys = list(set(validation_keys + decryption_keys))
-                # Make sure it does not contain empty or white space strings
-                validation_keys = [key for key in validation_keys if key.strip()]
-                decryption_keys = validation_keys
-                
-            self.validation_keys = validation_keys
-            self.decryption_keys = decryption_keys
-        else:
-            validation_keys = self.validation_keys
-            decryption_keys = self.decryption_keys  
+        # The machine keys are parsed and unhexlified once per process and kept in file order, so that the keys keep
+        # the same indices in every run (see checkpoint)
+        machine_keys = self.load_machine_keys(self.machinekeyfile, True)
+        if self.all_viewstate_keys:
+            # Every key is tried both as validation and decryption key
+            machine_keys = machine_keys.merged()
+        # (key, key bytes) pairs, the key bytes being None when the key is not hex (e.g. AutoGenerate)
+        validation_keys = machine_keys.validation_keys()
+        decryption_keys = machine_keys.decryption_keys()
 
         if len(validation_keys) == 0:
             print("No keys found in the resource file(s) for the ViewState module! Checks will be incomplete.")
@@ -452,73 +621,27 @@ class ASPNET_Viewstate(CrapsecretsBase):
         generator = "00000000"
         
         # Event to signal when a valid key is found to stop other threads
-        validation_stop_event = Event()
+        validation_stop_event = self.key_chunk_stop_event()
+
+        # With a checkpoint, the keys done, the position reached in the keys being tested and the hits are saved, and a
+        # resumed search starts from there
+        validation_progress = None
+        if self.checkpoint:
+            validation_progress = self.checkpoint.search(
+                "ASPNET_Viewstate.validation", signed_maybe_encrypted_B64, generatorHexList, [m.name for m in modes],
+                apppaths_hashcodes, encrypted, main_purpose, all_specific_purposes, all_viewstate_userkeys,
+                signature_by_parser, self.all_viewstate_keys, len(validation_keys),
+                self.resources_identity(self.machinekeyfile, True), self.shard,
+            )
+        remaining_validation_keys = self.remaining_keys(validation_keys, validation_progress)
 
         # Split candidates into chunks to reduce thread contention
         def chunks(lst, n):
             for i in range(0, len(lst), n):
                 yield lst[i:i + n]
                     
-        chunk_size = max(10, len(validation_keys) // self.thread_number)
-        chunked_validation_keys = list(chunks(validation_keys, chunk_size))
-
-        def check_validation_key_chunk(chunk):
-            # Each chunk gets its own local tested set
-            local_tested = set()
-            local_results = []
-            
-            # Check stop event first
-            if validation_stop_event.is_set():
-                return None
-                    
-            for vkey in chunk:
-                try:
-                    # Skip keys which have been tested before to increase performance
-                    if vkey in local_tested:
-                        continue
-                    local_tested.add(vkey)
-
-                    if vkey.lower() == "autogenerate":
-                        continue
-
-                    # Each thread gets its own local variables
-                    local_validation_algo = None
-                    local_specific_purpose = None 
-                    local_viewstate_userkey = None
-
-                    original_key = vkey
-                    for apppath_hashcode in apppaths_hashcodes:
-                        for mode in modes:
-                            if validation_stop_event.is_set():
-                                return None
-  
-                            if apppath_hashcode and mode == DotNetMode.DOTNET40_LEGACY:
-                                vkey = isolate_app_process(vkey, apppath_hashcode)
-                                if not vkey:
-                                    continue
-                            elif apppath_hashcode and mode == DotNetMode.DOTNET45:
-                                # IsolateApps won't work with DOTNET45
-                                continue
-                            
-                            for generatorHex in generatorHexList:
-                                generator = struct.pack("<I", int(generatorHex, 16))
-                                local_validation_algo, local_specific_purpose, local_viewstate_userkey, process_validationkey_result = self.process_validationkey(
-                                    vkey, mode, encrypted, signed_maybe_encrypted_B64, generator, all_viewstate_userkeys, main_purpose, all_specific_purposes, signature_by_parser,original_key
-                                )
-                                
-                                if local_validation_algo:
-                                    # Return tuple with all relevant data
-                                    local_results.append((original_key, mode, local_validation_algo, local_specific_purpose, 
-                                                    local_viewstate_userkey, process_validationkey_result, generatorHex))
-                                    
-                                    # Early exit if not in guess mode
-                                    if local_validation_algo != "guess":
-                                        return local_results                          
-                except Exception as e:
-                    if self.is_debug:
-                        print(f"Error processing key {vkey}: {str(e)}")
-                    continue
-            return local_results if local_results else None
+        chunk_size = max(10, len(remaining_validation_keys) // self.thread_number)
+        chunked_validation_keys = list(chunks(remaining_validation_keys, chunk_size))
 
         # Process completed futures
         confirmed_validation_algo = None
@@ -528,15 +651,29 @@ class ASPNET_Viewstate(CrapsecretsBase):
         interim_result = ""
         interim_result_additional_info = ""
         selected_decryption_keys = decryption_keys
-        # Use ThreadPoolExecutor to process chunks in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=self.thread_number) as executor:
+        # What the checks of every key share is prepared once
+        validation_job = ViewstateJob(
+            signed_maybe_encrypted_B64, encrypted, generatorHexList, all_viewstate_userkeys, main_purpose, all_specific_purposes, signature_by_parser
+        )
+        # Use worker threads (or processes with --use-processes) to process chunks in parallel
+        self.key_progress = validation_progress
+        with self.key_chunk_executor(validation_stop_event) as submit:
             # Submit all chunk checking tasks
-            futures = [executor.submit(check_validation_key_chunk, chunk) 
-                      for chunk in chunked_validation_keys]
+            futures = {submit(self.check_validation_key_chunk, chunk, apppaths_hashcodes, modes, validation_job): chunk
+                      for chunk in chunked_validation_keys}
+            if validation_progress:
+                hits = [(h[0], DotNetMode[h[1]], *h[2:]) for h in validation_progress.found().values()]
+                futures[self.resumed_hits_future(hits)] = []
             
             for future in concurrent.futures.as_completed(futures):
                 try:
                     chunk_results = future.result()
+                    if validation_progress:
+                        for hit in chunk_results or []:
+                            validation_progress.add_found(f"{hit[0]}|{hit[1].name}|{hit[6]}", [hit[0], hit[1].name, *hit[2:]])
+                        if not validation_stop_event.is_set():
+                            for n, _, _ in futures[future]:
+                                validation_progress.done(n)
                     if chunk_results:
                         for vkey, mode, validation_algo, specific_purpose, viewstate_userkey, process_validationkey_result, generatorHex in chunk_results:
                             # Set stop event to halt other threads if we have a successful validation
@@ -555,7 +692,7 @@ class ASPNET_Viewstate(CrapsecretsBase):
                                     # Narrow down the keys to the one that has been confirmed
                                     selected_decryption_keys = [
                                         decryption_keys[j] for j in range(len(validation_keys))
-                                        if validation_keys[j] == vkey
+                                        if validation_keys[j][0] == vkey
                                     ]
                             
                                 if not encrypted or mode == DotNetMode.DOTNET40_LEGACY:
@@ -574,6 +711,8 @@ class ASPNET_Viewstate(CrapsecretsBase):
                         print(f"Error processing validation chunk: {str(e)}")
                         traceback.print_exc()
                     continue
+        if validation_progress:
+            validation_progress.finish()
         
         if confirmed_validation_algo == None and encrypted and self.find_decryption_key_without_validation_key:
             # We are here because we couldn't find the validation key
@@ -587,71 +726,45 @@ class ASPNET_Viewstate(CrapsecretsBase):
             if confirmed_specific_purpose:
                 all_specific_purposes = [confirmed_specific_purpose]
 
-            # Split decryption keys into chunks
-            chunk_size = max(10, len(selected_decryption_keys) // self.thread_number)
-            chunked_decryption_keys = list(chunks(selected_decryption_keys, chunk_size))
-            decryption_stop_event = Event()
-
-            def check_decryption_key_chunk(chunk):
-                # Each chunk gets its own local tested set
-                local_tested = set()
-                local_results = []
-                # Check stop event first
-                if decryption_stop_event.is_set():
-                    return None
-
-                for dkey in chunk:
-                    # Skip keys which have been tested before
-                    if dkey in local_tested:
-                        continue
-                    local_tested.add(dkey)
-                    
-                    if dkey.lower() == "autogenerate":
-                        continue
-                    
-                    original_key = dkey
-                    for apppath_hashcode in apppaths_hashcodes:
-                        for mode in modes:
-                            if decryption_stop_event.is_set():
-                                return None
-                        
-                            try:
-                                if apppath_hashcode and mode == DotNetMode.DOTNET40_LEGACY:
-                                    dkey = isolate_app_process(dkey, apppath_hashcode)
-                                    if not dkey:
-                                        continue
-                                elif apppath_hashcode and mode == DotNetMode.DOTNET45:
-                                    # IsolateApps won't work with DOTNET45
-                                    continue
-                                
-                                result = self.process_decryption_keys(
-                                    confirmed_validation_algo, dkey, mode, encrypted, signed_maybe_encrypted_B64,
-                                    all_viewstate_userkeys, main_purpose, all_specific_purposes, original_key
-                                )
-                                
-                                if result:
-                                    local_results.append((mode, result))
-                                    
-                                    # Early exit if not in guess mode
-                                    if not (self.all_viewstate_keys or validation_algo == "guess"):
-                                        return local_results
-                            except Exception as e:
-                                if self.is_debug:
-                                    print(f"Error processing decryption key {dkey}: {str(e)}")
-                                continue
+            decryption_progress = None
+            if self.checkpoint:
+                decryption_progress = self.checkpoint.search(
+                    "ASPNET_Viewstate.decryption", signed_maybe_encrypted_B64, [m.name for m in modes], apppaths_hashcodes,
+                    confirmed_validation_algo, validation_algo, encrypted, main_purpose, all_specific_purposes,
+                    all_viewstate_userkeys, self.all_viewstate_keys, len(selected_decryption_keys),
+                    [key for key, _ in selected_decryption_keys[:1]], self.resources_identity(self.machinekeyfile, True),
+                    self.shard,
+                )
+            remaining_decryption_keys = self.remaining_keys(selected_decryption_keys, decryption_progress)
 
-                return local_results if local_results else None
+            # Split decryption keys into chunks
+            chunk_size = max(10, len(remaining_decryption_keys) // self.thread_number)
+            chunked_decryption_keys = list(chunks(remaining_decryption_keys, chunk_size))
+            decryption_stop_event = self.key_chunk_stop_event()
+            decryption_job = ViewstateJob(
+                signed_maybe_encrypted_B64, encrypted, generatorHexList, all_viewstate_userkeys, main_purpose, all_specific_purposes
+            )
 
             # Process decryption keys in parallel
-            with concurrent.futures.ThreadPoolExecutor(max_workers=self.thread_number) as executor:
+            self.key_progress = decryption_progress
+            with self.key_chunk_executor(decryption_stop_event) as submit:
                 # Submit all chunk checking tasks 
-                futures = [executor.submit(check_decryption_key_chunk, chunk)
-                          for chunk in chunked_decryption_keys]
+                futures = {submit(self.check_decryption_key_chunk, chunk, apppaths_hashcodes, modes, confirmed_validation_algo, validation_algo, decryption_job): chunk
+                          for chunk in chunked_decryption_keys}
+                if decryption_progress:
+                    hits = [(DotNetMode[h[0]], h[1]) for h in decryption_progress.found().values()]
+                    futures[self.resumed_hits_future(hits)] = []
                 
                 # Process completed futures
                 for future in concurrent.futures.as_completed(futures):
                     try:
                         chunk_results = future.result()
+                        if decryption_progress:
+                            for mode, result in chunk_results or []:
+                                decryption_progress.add_found(f"{mode.name}|{result}", [mode.name, result])
+                            if not decryption_stop_event.is_set():
+                                for n, _, _ in futures[future]:
+                                    decryption_progress.done(n)
                         if chunk_results:
                             for mode, result in chunk_results:
                                 if len(results) == 1:
@@ -678,6 +791,9 @@ class ASPNET_Viewstate(CrapsecretsBase):
                             print(f"Error processing decryption chunk: {str(e)}")
                             traceback.print_exc()
                         continue
+            if decryption_progress:
+                decryption_progress.finish()
+        self.key_progress = None
 
         temp_product = signed_maybe_encrypted_B64
         if len(temp_product) > 200:
@@ -720,23 +836,148 @@ class ASPNET_Viewstate(CrapsecretsBase):
         return unique_results #unique_results
 
     
+    # Checks a chunk of validation keys; runs in a worker thread or process (see key_chunk_executor)
+    def check_validation_key_chunk(self, chunk, stop_event, apppaths_hashcodes, modes, job):
+        # Each chunk gets its own local tested set
+        local_tested = set()
+        local_results = []
+        
+        # Check stop event first
+        if stop_event.is_set():
+            return None
+
+        # Worker processes do not get the checkpoint, their chunks are marked done when they return
+        progress = self.key_progress
+        for n, vkey, vkey_bytes in chunk:
+            try:
+                # Skip keys which have been tested before to increase performance
+                if vkey in local_tested:
+                    continue
+                local_tested.add(vkey)
+
+                # Not hex (e.g. AutoGenerate)
+                if vkey_bytes is None:
+                    continue
+
+                # Each thread gets its own local variables
+                local_validation_algo = None
+                local_specific_purpose = None 
+                local_viewstate_userkey = None
+
+                original_key = vkey
+                # The (apppath, mode, generator) indices already tested before a resume
+                resume_cursor = progress.cursor(n) if progress else None
+                for a, apppath_hashcode in enumerate(apppaths_hashcodes):
+                    for m, mode in enumerate(modes):
+                        if stop_event.is_set():
+                            return None
+
+                        if apppath_hashcode and mode == DotNetMode.DOTNET40_LEGACY:
+                            vkey = isolate_app_process(vkey, apppath_hashcode)
+                            if not vkey:
+                                continue
+                            vkey_bytes = binascii.unhexlify(vkey)
+                        elif apppath_hashcode and mode == DotNetMode.DOTNET45:
+                            # IsolateApps won't work with DOTNET45
+                            continue
+
+                        for g, (generatorHex, _) in enumerate(job.generators):
+                            if resume_cursor and (a, m, g) <= resume_cursor:
+                                continue
+                            local_validation_algo, local_specific_purpose, local_viewstate_userkey, process_validationkey_result = self.process_validationkey(
+                                vkey, vkey_bytes, mode, job, g, original_key
+                            )
+                            
+                            if local_validation_algo:
+                                # Return tuple with all relevant data
+                                local_results.append((original_key, mode, local_validation_algo, local_specific_purpose, 
+                                                local_viewstate_userkey, process_validationkey_result, generatorHex))
+                                
+                                # Early exit if not in guess mode
+                                if local_validation_algo != "guess":
+                                    return local_results                          
+                            if progress:
+                                progress.advance(n, (a, m, g))
+                if progress:
+                    progress.done(n)
+            except Exception as e:
+                if self.is_debug:
+                    print(f"Error processing key {vkey}: {str(e)}")
+                continue
+        return local_results if local_results else None
+
+    # Checks a chunk of decryption keys; runs in a worker thread or process (see key_chunk_executor)
+    def check_decryption_key_chunk(self, chunk, stop_event, apppaths_hashcodes, modes, confirmed_validation_algo, validation_algo, job):
+        # Each chunk gets its own local tested set
+        local_tested = set()
+        local_results = []
+        # Check stop event first
+        if stop_event.is_set():
+            return None
+
+        progress = self.key_progress
+        for n, dkey, dkey_bytes in chunk:
+            # Skip keys which have been tested before
+            if dkey in local_tested:
+                continue
+            local_tested.add(dkey)
+
+            # Not hex (e.g. AutoGenerate)
+            if dkey_bytes is None:
+                continue
+            
+            original_key = dkey
+            # The (apppath, mode) indices already tested before a resume
+            resume_cursor = progress.cursor(n) if progress else None
+            for a, apppath_hashcode in enumerate(apppaths_hashcodes):
+                for m, mode in enumerate(modes):
+                    if stop_event.is_set():
+                        return None
+                    if resume_cursor and (a, m) <= resume_cursor:
+                        continue
+                
+                    try:
+                        if apppath_hashcode and mode == DotNetMode.DOTNET40_LEGACY:
+                            dkey = isolate_app_process(dkey, apppath_hashcode)
+                            if not dkey:
+                                continue
+                            dkey_bytes = binascii.unhexlify(dkey)
+                        elif apppath_hashcode and mode == DotNetMode.DOTNET45:
+                            # IsolateApps won't work with DOTNET45
+                            continue
+                        
+                        result = self.process_decryption_keys(
+                            confirmed_validation_algo, dkey, dkey_bytes, mode, job, original_key
+                        )
+                        
+                        if result:
+                            local_results.append((mode, result))
+                            
+                            # Early exit if not in guess mode
+                            if not (self.all_viewstate_keys or validation_algo == "guess"):
+                                return local_results
+                    except Exception as e:
+                        if self.is_debug:
+                            print(f"Error processing decryption key {dkey}: {str(e)}")
+                        continue
+                    if progress:
+                        progress.advance(n, (a, m))
+            if progress:
+                progress.done(n)
+
+        return local_results if local_results else None
+
     # Returns validation_algo, specific_purpose, viewstate_userkey, result in string
-    def process_validationkey(self, vkey, mode, encrypted, viewstate_B64, generator, all_viewstate_userkeys=[None], main_purpose=Purpose.WebForms_HiddenFieldPageStatePersister_ClientState.value, all_specific_purposes=None, signature_by_parser=None,original_key=None):
+    # vkey_bytes is the unhexlified vkey, generator the index of the generator in the ViewstateJob
+    def process_validationkey(self, vkey, vkey_bytes, mode, job, generator, original_key=None):
         specific_purpose = None
         validation_algo = None
         viewstate_userkey = None
         result = ""
         if not original_key:
             original_key = vkey
-        
-        try:
-            validation_algo, specific_purpose, viewstate_userkey = self.viewstate_validate_check(
-                binascii.unhexlify(vkey), encrypted, viewstate_B64, generator, mode, all_viewstate_userkeys, main_purpose, all_specific_purposes, signature_by_parser
-            )
-        except binascii.Error as e:
-            # This is to see invalid keys in the file
-            #print("Invalid key in the resource file: " + vkey)
-            pass
+
+        validation_algo, specific_purpose, viewstate_userkey = self.viewstate_validate_check(vkey_bytes, job, generator, mode)
             
         if not validation_algo:
             return None, None, None, None
@@ -747,7 +988,7 @@ class ASPNET_Viewstate(CrapsecretsBase):
             
             # Build the result string
             algo_display = ( "SHA1 or 3DES or AES" 
-                            if validation_algo == "SHA1" and mode == DotNetMode.DOTNET40_LEGACY and encrypted 
+                            if validation_algo == "SHA1" and mode == DotNetMode.DOTNET40_LEGACY and job.encrypted 
                             else validation_algo )
 
             if original_key != vkey:
@@ -768,31 +1009,26 @@ class ASPNET_Viewstate(CrapsecretsBase):
                 
         return validation_algo, specific_purpose, viewstate_userkey, result
     
-    def process_decryption_keys(self, validation_algo, dkey, mode, encrypted, viewstate_B64, all_viewstate_userkeys=[None], main_purpose=Purpose.WebForms_HiddenFieldPageStatePersister_ClientState.value, all_specific_purposes=None, original_key=None):
+    # dkey_bytes is the unhexlified dkey
+    def process_decryption_keys(self, validation_algo, dkey, dkey_bytes, mode, job, original_key=None):
         # Simplified to handle single key check
         result = ""
         if not original_key:
             original_key = dkey
 
-        if encrypted:
-            try:
-                candidate_bytes = binascii.unhexlify(dkey)
-                decryption_algo = self.viewstate_decrypt_check(
-                    candidate_bytes, validation_algo, viewstate_B64, mode, all_viewstate_userkeys, main_purpose, all_specific_purposes
-                )
-                if decryption_algo:
-                    if self.all_viewstate_keys or validation_algo == "guess":
-                        if original_key != dkey:
-                            result = f" (Potential EncryptionKey: [{original_key},IsolateApps] with DecryptionAlgo: [{decryption_algo}])"
-                        else:
-                            result = f" (Potential DecryptionKey: [{original_key}] DecryptionAlgo: [{decryption_algo}])"
+        if job.encrypted:
+            decryption_algo = self.viewstate_decrypt_check(dkey_bytes, validation_algo, job, mode)
+            if decryption_algo:
+                if self.all_viewstate_keys or validation_algo == "guess":
+                    if original_key != dkey:
+                        result = f" (Potential EncryptionKey: [{original_key},IsolateApps] with DecryptionAlgo: [{decryption_algo}])"
                     else:
-                        if original_key != dkey:
-                            result = f" EncryptionKey: [{original_key},IsolateApps] with DecryptionAlgo: [{decryption_algo}]"
-                        else:
-                            result = f" EncryptionKey: [{original_key}] EncryptionAlgo: [{decryption_algo}]"
-            except binascii.Error:
-                pass
+                        result = f" (Potential DecryptionKey: [{original_key}] DecryptionAlgo: [{decryption_algo}])"
+                else:
+                    if original_key != dkey:
+                        result = f" EncryptionKey: [{original_key},IsolateApps] with DecryptionAlgo: [{decryption_algo}]"
+                    else:
+                        result = f" EncryptionKey: [{original_key}] EncryptionAlgo: [{decryption_algo}]"
 
         if result != "":
             return result
@@ -806,181 +1042,108 @@ class ASPNET_Viewstate(CrapsecretsBase):
 
     # Return hash algorithm, specific purpose, and ViewStateUserKey if successful
     # In case MAC validation is not enabled, it will return "MAC is not enabled!"
-    def viewstate_validate_check(self, vkey_bytes, encrypted, viewstate_B64, generator, mode, all_viewstate_userkeys=[None], main_specific_purpose=Purpose.WebForms_HiddenFieldPageStatePersister_ClientState.value, all_specific_purposes=None, signature_by_parser=None):
+    # job is the ViewstateJob of the search and generator the index of the generator in it
+    def viewstate_validate_check(self, vkey_bytes, job, generator, mode):
         shortest_encrypted = 8
-        is_valid = True
 
-        if viewstate_B64 == None or len(viewstate_B64) < shortest_encrypted:
-            is_valid = False
-        
-        if all_specific_purposes == None and mode == DotNetMode.DOTNET45:
-            is_valid = False
-        
-        if encrypted and mode == DotNetMode.DOTNET40_LEGACY:
-            # ASP.NET ignores "modifier" if it is encrypted in the legacy mode!
-            # So Viewstatekey is ineffective to prevent anti-xsrf attacks in DOTNET40 when encrypted!!
-            all_viewstate_userkeys = [None]
+        if job.viewstate_bytes is None or len(job.viewstate_B64) < shortest_encrypted:
+            return None, None, None
 
-        if is_valid:
-            original_vkey_bytes = vkey_bytes
-            viewstate_bytes = base64.b64decode(viewstate_B64)
+        if job.all_specific_purposes == None and mode == DotNetMode.DOTNET45:
+            return None, None, None
 
-            if encrypted:
-                candidate_hash_algs = list(self.hash_sizes.keys())
-            else:               
-                # We are doing this again just in case this function is called directly
-                if signature_by_parser == None or signature_by_parser == b"":
-                    return "MAC_DISABLED", None, None
-                
-                signature_len = len(signature_by_parser)
-                candidate_hash_algs = self.search_dict(self.hash_sizes, signature_len)
-            
-            for hash_alg in candidate_hash_algs:
-                for viewstate_userkey in all_viewstate_userkeys:
-                    vkey_bytes = original_vkey_bytes
-                    viewstate_data = viewstate_bytes[: -self.hash_sizes[hash_alg]]
-                    vs_data_bytes = viewstate_data
-                    if not encrypted and generator:
-                        vs_data_bytes += generator
-                    signature = viewstate_bytes[-self.hash_sizes[hash_alg] :]
-                    if mode == DotNetMode.DOTNET45:
-                        for specific_purpose in all_specific_purposes:
-                            tempSpecific_purpose = specific_purpose.copy()
-                            if viewstate_userkey is not None:
-                                # Adding potential ViewStateUserKey
-                                tempSpecific_purpose.append(f"ViewStateUserKey: {viewstate_userkey}")
-                            
-                            label, context = sp800_108_get_key_derivation_parameters(
-                                main_specific_purpose, tempSpecific_purpose
-                            )
-                            derived_vkey_bytes = sp800_108_derivekey(vkey_bytes, label, context, (len(vkey_bytes) * 8))
-                            h = hmac.new(
-                                derived_vkey_bytes,
-                                vs_data_bytes,
-                                self.hash_algs[hash_alg],
-                            ).digest()
-                            # This is dirty to have this check here but we are in a loop for the paths (all_specific_purposes) so we need to speed up!
-                            if h == signature:
-                                return hash_alg, specific_purpose, viewstate_userkey
-                    elif hash_alg == "MD5" and mode == DotNetMode.DOTNET40_LEGACY:
-                        # The HashDataUsingNonKeyedAlgorithm function in ASP.NET has a bug overwriting the modifier if shorter than validation key! 
-                        # So having just 0s will do!
-                        vs_length = len(viewstate_data)
-                        
-                        if viewstate_userkey is not None:
-                            modifier = generator + viewstate_userkey.encode("utf-16-le")
-                        else:
-                            modifier = generator
-
-                        if encrypted:
-                            # No modifier is used in encrypted mode in the legacy mode
-                            totalLength = vs_length + len(vkey_bytes)
-                            b_all = bytearray(totalLength)
-                            b_all[0:vs_length] = viewstate_data
-                            b_all[vs_length:vs_length+len(vkey_bytes)] = vkey_bytes
-                        else:
-                            totalLength = vs_length + len(vkey_bytes) + len(modifier)
-                            b_all = bytearray(totalLength)
-                            b_all[0:vs_length] = viewstate_data
-                            b_all[vs_length:vs_length+len(modifier)] = modifier
-                            b_all[vs_length:vs_length+len(vkey_bytes)] = vkey_bytes
-        
-                        h = hashlib.md5(b_all).digest()
-                    else:
-                        if viewstate_userkey is not None:
-                            vs_data_bytes += viewstate_userkey.encode("utf-16-le")
-                        
+        all_viewstate_userkeys = job.userkeys
+        if job.encrypted and mode == DotNetMode.DOTNET40_LEGACY:
+            # ASP.NET ignores "modifier" if it is encrypted in the legacy mode!
+            # So Viewstatekey is ineffective to prevent anti-xsrf attacks in DOTNET40 when encrypted!!
+            all_viewstate_userkeys = [(None, None)]
+
+        if not job.encrypted:
+            # We are doing this again just in case this function is called directly
+            if job.signature_by_parser == None or job.signature_by_parser == b"":
+                return "MAC_DISABLED", None, None
+
+        for hash_alg in job.candidate_hash_algs:
+            signature = job.signed_parts[hash_alg][1]
+            for viewstate_userkey, userkey_bytes in all_viewstate_userkeys:
+                if mode == DotNetMode.DOTNET45:
+                    vs_data_bytes = job.message(hash_alg, generator)
+                    for specific_purpose, label, context in job.derivation_parameters[viewstate_userkey]:
+                        derived_vkey_bytes = sp800_108_derivekey_cached(vkey_bytes, label, context, (len(vkey_bytes) * 8))
                         h = hmac.new(
-                            vkey_bytes,
+                            derived_vkey_bytes,
                             vs_data_bytes,
                             self.hash_algs[hash_alg],
                         ).digest()
+                        # This is dirty to have this check here but we are in a loop for the paths (all_specific_purposes) so we need to speed up!
+                        if h == signature:
+                            return hash_alg, specific_purpose, viewstate_userkey
+                    continue
+                elif hash_alg == "MD5" and mode == DotNetMode.DOTNET40_LEGACY:
+                    # The HashDataUsingNonKeyedAlgorithm function in ASP.NET has a bug overwriting the modifier if shorter than validation key! 
+                    # So having just 0s will do!
+                    # The hashed bytes are the ViewState (hashed once per job), the key written over the start of the
+                    # modifier, the rest of the modifier and as many 0s as the key overwrote
+                    md5 = job.md5_midstate().copy()
+                    md5.update(vkey_bytes)
+                    # No modifier is used in encrypted mode in the legacy mode
+                    if not job.encrypted:
+                        modifier = job.generators[generator][1] + (userkey_bytes or b"")
+                        md5.update(modifier[len(vkey_bytes):])
+                        md5.update(bytes(min(len(vkey_bytes), len(modifier))))
+                    h = md5.digest()
+                else:
+                    h = hmac.new(
+                        vkey_bytes,
+                        job.message(hash_alg, generator, userkey_bytes),
+                        self.hash_algs[hash_alg],
+                    ).digest()
+
+                if h == signature:
+                    return hash_alg, None, viewstate_userkey
 
-                    if h == signature:
-                        return hash_alg, None, viewstate_userkey
-        
         return None, None, None
 
     # Return the decryption algorithm if successful
-    def viewstate_decrypt_check(self, ekey_bytes, hash_alg, viewstate_B64, mode, all_viewstate_userkeys=[None], main_specific_purpose=Purpose.WebForms_HiddenFieldPageStatePersister_ClientState.value, all_specific_purposes=None):
+    def viewstate_decrypt_check(self, ekey_bytes, hash_alg, job, mode):
         # 8 is the shortest ViewState I have found and 16 is the shortest hash size which will increae 4/3 in base64
         shortest_encrypted = int((8 + 16 * 4/3) + 0.5)
-        is_valid = True
-        if viewstate_B64 == None or len(viewstate_B64) < shortest_encrypted:
-            is_valid = False
-        
-        if all_specific_purposes == None and mode == DotNetMode.DOTNET45:
-            is_valid = False
-        
+        if job.viewstate_bytes is None or len(job.viewstate_B64) < shortest_encrypted:
+            return None
+
+        if job.all_specific_purposes == None and mode == DotNetMode.DOTNET45:
+            return None
+
+        all_viewstate_userkeys = job.userkeys
         if mode == DotNetMode.DOTNET40_LEGACY:
             # We are here as we know the parameter has been encrypted
             # ASP.NET ignores "modifier" if it is encrypted in the legacy mode!
             # So Viewstatekey is ineffective to prevent anti-xsrf attacks in DOTNET40 when encrypted!!
-            all_viewstate_userkeys = [None]
+            all_viewstate_userkeys = [(None, None)]
 
-        if is_valid:
-            viewstate_bytes = base64.b64decode(viewstate_B64)
-            vs_size = len(viewstate_bytes)
-            block_size = None
-            cipher = None
+        viewstate_bytes = job.viewstate_bytes
+        block_size = None
+        cipher = None
 
-            if hash_alg.lower() == "guess":
-                hash_algs = self.hash_sizes.keys()
-            else:
-                hash_algs = [hash_alg]
-
-            for hash_alg in hash_algs:
-                for viewstate_userkey in all_viewstate_userkeys:
-                    dec_algos = set()
-                    hash_size = self.hash_sizes[hash_alg]
-
-                    if (vs_size - hash_size) % AES.block_size == 0:
-                        dec_algos.add("AES")
-                    if (vs_size - hash_size) % DES.block_size == 0:
-                        dec_algos.add("DES")
-                        dec_algos.add("3DES")
-                    for dec_algo in list(dec_algos):
-                        with suppress(ValueError):
-                            if mode == DotNetMode.DOTNET45:
-                                for specific_purpose in all_specific_purposes:
-                                    # this is for AES and 3DES
-                                    tempSpecific_purpose = specific_purpose.copy()
-                                    if viewstate_userkey is not None:
-                                        # Adding potential ViewStateUserKey
-                                        tempSpecific_purpose.append(f"ViewStateUserKey: {viewstate_userkey}")
-                                    
-                                    label, context = sp800_108_get_key_derivation_parameters(
-                                        main_specific_purpose, tempSpecific_purpose
-                                    )
-                                    derived_ekey_bytes = sp800_108_derivekey(ekey_bytes, label, context, (len(ekey_bytes) * 8))
-                                    if dec_algo == "AES":
-                                        block_size = AES.block_size
-                                        iv = viewstate_bytes[0:block_size]
-                                        cipher = AES.new(derived_ekey_bytes, AES.MODE_CBC, iv)
-                                        blockpadlen_raw = len(derived_ekey_bytes) % AES.block_size
-                                        if blockpadlen_raw == 0:
-                                            blockpadlen = block_size
-                                        else:
-                                            blockpadlen = blockpadlen_raw
-                                    elif dec_algo == "3DES":
-                                        block_size = DES3.block_size
-                                        iv = viewstate_bytes[0:block_size]
-                                        cipher = DES3.new(derived_ekey_bytes, DES3.MODE_CBC, iv)
-                                        blockpadlen_raw = len(derived_ekey_bytes) % DES3.block_size
-                                        if blockpadlen_raw == 0:
-                                            blockpadlen = block_size
-                                        else:
-                                            blockpadlen = blockpadlen_raw
-                                    else:
-                                        # we don't use DES in DOTNET45
-                                        continue
-                            else:
-                                # This for DOTNET40 and legacy mode
+        if hash_alg.lower() == "guess":
+            hash_algs = self.hash_sizes.keys()
+        else:
+            hash_algs = [hash_alg]
+
+        for hash_alg in hash_algs:
+            for viewstate_userkey, _ in all_viewstate_userkeys:
+                hash_size = self.hash_sizes[hash_alg]
+                for dec_algo in job.decryption_algos[hash_alg]:
+                    with suppress(ValueError):
+                        if mode == DotNetMode.DOTNET45:
+                            for specific_purpose, label, context in job.derivation_parameters[viewstate_userkey]:
+                                # this is for AES and 3DES
+                                derived_ekey_bytes = sp800_108_derivekey_cached(ekey_bytes, label, context, (len(ekey_bytes) * 8))
                                 if dec_algo == "AES":
                                     block_size = AES.block_size
                                     iv = viewstate_bytes[0:block_size]
-                                    cipher = AES.new(ekey_bytes, AES.MODE_CBC, iv)
-                                    blockpadlen_raw = len(ekey_bytes) % block_size
+                                    cipher = AES.new(derived_ekey_bytes, AES.MODE_CBC, iv)
+                                    blockpadlen_raw = len(derived_ekey_bytes) % AES.block_size
                                     if blockpadlen_raw == 0:
                                         blockpadlen = block_size
                                     else:
@@ -988,34 +1151,57 @@ class ASPNET_Viewstate(CrapsecretsBase):
                                 elif dec_algo == "3DES":
                                     block_size = DES3.block_size
                                     iv = viewstate_bytes[0:block_size]
-                                    cipher = DES3.new(ekey_bytes[:24], DES3.MODE_CBC, iv)
-                                    blockpadlen_raw = len(ekey_bytes) % block_size
+                                    cipher = DES3.new(derived_ekey_bytes, DES3.MODE_CBC, iv)
+                                    blockpadlen_raw = len(derived_ekey_bytes) % DES3.block_size
                                     if blockpadlen_raw == 0:
                                         blockpadlen = block_size
                                     else:
                                         blockpadlen = blockpadlen_raw
-                                elif dec_algo == "DES":
-                                    block_size = DES.block_size
-                                    iv = viewstate_bytes[0:block_size]
-                                    cipher = DES.new(ekey_bytes[:8], DES.MODE_CBC, iv)
-                                    # Not sure why we are not fixing the padding here!
-                                    blockpadlen = 0
-
-                            if block_size and cipher:
-                                encrypted_raw = viewstate_bytes[block_size:-hash_size]
-                                decrypted_raw = cipher.decrypt(encrypted_raw)
-
-                                with suppress(TypeError):
-                                    if mode == DotNetMode.DOTNET45:
-                                        decrypt = unpad(decrypted_raw)
-                                    else:
-                                        decrypt = unpad(decrypted_raw[blockpadlen:])
-
-                                    if self.valid_preamble(decrypt):
-                                        # This is not the best way as a badly decrypted viewstate can still have a valid preamble
-                                        return dec_algo
-                                    else:
-                                        continue
+                                else:
+                                    # we don't use DES in DOTNET45
+                                    continue
+                        else:
+                            # This for DOTNET40 and legacy mode
+                            if dec_algo == "AES":
+                                block_size = AES.block_size
+                                iv = viewstate_bytes[0:block_size]
+                                cipher = AES.new(ekey_bytes, AES.MODE_CBC, iv)
+                                blockpadlen_raw = len(ekey_bytes) % block_size
+                                if blockpadlen_raw == 0:
+                                    blockpadlen = block_size
+                                else:
+                                    blockpadlen = blockpadlen_raw
+                            elif dec_algo == "3DES":
+                                block_size = DES3.block_size
+                                iv = viewstate_bytes[0:block_size]
+                                cipher = DES3.new(ekey_bytes[:24], DES3.MODE_CBC, iv)
+                                blockpadlen_raw = len(ekey_bytes) % block_size
+                                if blockpadlen_raw == 0:
+                                    blockpadlen = block_size
+                                else:
+                                    blockpadlen = blockpadlen_raw
+                            elif dec_algo == "DES":
+                                block_size = DES.block_size
+                                iv = viewstate_bytes[0:block_size]
+                                cipher = DES.new(ekey_bytes[:8], DES.MODE_CBC, iv)
+                                # Not sure why we are not fixing the padding here!
+                                blockpadlen = 0
+
+                        if block_size and cipher:
+                            encrypted_raw = job.ciphertext(block_size, hash_size)
+                            decrypted_raw = cipher.decrypt(encrypted_raw)
+
+                            with suppress(TypeError):
+                                if mode == DotNetMode.DOTNET45:
+                                    decrypt = unpad(decrypted_raw)
+                                else:
+                                    decrypt = unpad(decrypted_raw[blockpadlen:])
+
+                                if self.valid_preamble(decrypt):
+                                    # This is not the best way as a badly decrypted viewstate can still have a valid preamble
+                                    return dec_algo
+                                else:
+                                    continue
         return None
 
     def get_paths_from_specific_purpose(self, template_source_directory: str, type_str: str):
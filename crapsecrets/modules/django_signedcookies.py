@@ -1,4 +1,8 @@
 import re
+import hmac
+import base64
+import hashlib
+import binascii
 from django.core.signing import loads as djangoLoads, BadSignature
 from crapsecrets.base import CrapsecretsBase
 
@@ -7,19 +11,66 @@ class DjangoSignedCookies(CrapsecretsBase):
     identify_regex = re.compile(r"^[\.a-zA-z-0-9]+:[\.a-zA-z-0-9:]+$")
     description = {"product": "Djangno Signed Cookie", "secret": "Django secret_key", "severity": "HIGH"}
 
+    django_salt = "django.contrib.sessions.backends.signed_cookies"
+
+    # Django's Signer uses HMAC-SHA256 keyed with sha256(salt + "signer" + secret_key) (django.utils.crypto.salted_hmac)
+    def django_derivekey(self, secret_key):
+        return hashlib.sha256(f"{self.django_salt}signer{secret_key}".encode()).digest()
+
+    # Splits the cookie and decodes its signature once: returns (signed value, signature bytes)
+    def django_load(self, django_signed_cookie):
+        if ":" not in django_signed_cookie:
+            return None
+        value, signature = django_signed_cookie.rsplit(":", 1)
+        try:
+            signature_bytes = base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4))
+        except (binascii.Error, ValueError):
+            return None
+        if len(signature_bytes) != hashlib.sha256().digest_size:
+            return None
+        return value.encode(), signature_bytes
+
     def check_secret(self, django_signed_cookie):
         if not self.identify(django_signed_cookie):
             return False
-        for l in set(list(self.load_resources(["django_secret_keys.txt", "top_100000_passwords.txt"]))):
-            secret_key = l.rstrip()
+        return self.check_secrets([django_signed_cookie])[0]
+
+    def check_secrets(self, django_signed_cookies):
+        results = [None] * len(django_signed_cookies)
+        indices = []
+        loaded_cookies = []
+        for i, django_signed_cookie in enumerate(django_signed_cookies):
+            if self.identify(django_signed_cookie):
+                loaded_cookie = self.django_load(django_signed_cookie)
+                if loaded_cookie:
+                    indices.append(i)
+                    loaded_cookies.append((django_signed_cookie, *loaded_cookie))
+        if not loaded_cookies:
+            return results
+
+        def verify(loaded_cookie, derived_key, secret_key):
+            django_signed_cookie, value, signature_bytes = loaded_cookie
+            if not hmac.compare_digest(hmac.new(derived_key, value, hashlib.sha256).digest(), signature_bytes):
+                return None
+            # Only a matching signature goes through Django, which also decodes the session for the details
             try:
                 r = djangoLoads(
                     django_signed_cookie,
                     key=secret_key,
                     fallback_keys="",
-                    salt="django.contrib.sessions.backends.signed_cookies",
+                    salt=self.django_salt,
                 )
             except BadSignature:
-                continue
+                return None
             if r:
                 return {"secret": secret_key, "details": r}
+
+        found = self.key_major_search(
+            loaded_cookies,
+            self.load_resources(["django_secret_keys.txt", "top_100000_passwords.txt"]),
+            verify,
+            self.django_derivekey,
+        )
+        for j, r in found.items():
+            results[indices[j]] = r
+        return results
@@ -62,8 +62,7 @@ class ExpressSignedCookies_CS(CrapsecretsBase):
         if not sig:
             return False
 
-        for l in set(list(self.load_resources(["express_session_secrets.txt", "top_100000_passwords.txt"]))):
-            secret = l.rstrip()
+        def verify(express_signed_cookie_data, secret, _):
             r = self.expressVerify_cs(express_signed_cookie_data, sig, secret)
             if r:
                 return {
@@ -72,6 +71,14 @@ class ExpressSignedCookies_CS(CrapsecretsBase):
                     "product": f"Data Cookie: [{express_signed_cookie_data}] Signature Cookie: [{sig}]",
                 }
 
+        found = self.key_major_search(
+            [express_signed_cookie_data],
+            self.load_resources(["express_session_secrets.txt", "top_100000_passwords.txt"]),
+            verify,
+            lambda l: l.rstrip(),
+        )
+        return found.get(0)
+
     def resolve_args(self, args):
         if len(args) != 1:
             return None
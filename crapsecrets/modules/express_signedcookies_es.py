@@ -52,10 +52,15 @@ class ExpressSignedCookies_ES(CrapsecretsBase):
         if not self.identify(express_signed_cookie):
             return False
 
-        for l in set(list(self.load_resources(["express_session_secrets.txt", "top_100000_passwords.txt"]))):
-            session_secret = l.rstrip()
-
+        def verify(express_signed_cookie, session_secret, _):
             r = self.expressVerify_es(express_signed_cookie, session_secret)
-
             if r:
                 return {"secret": session_secret, "details": r}
+
+        found = self.key_major_search(
+            [express_signed_cookie],
+            self.load_resources(["express_session_secrets.txt", "top_100000_passwords.txt"]),
+            verify,
+            lambda l: l.rstrip(),
+        )
+        return found.get(0)
@@ -1,6 +1,10 @@
 # flask_secret_keys wordlist shamelessly copied from https://github.com/Paradoxis/Flask-Unsign <3 <3 <3
 
 import re
+import hmac
+import base64
+import hashlib
+import binascii
 from flask_unsign import verify as flaskVerify
 from crapsecrets.base import CrapsecretsBase
 
@@ -9,15 +13,63 @@ class Flask_SignedCookies(CrapsecretsBase):
     identify_regex = re.compile(r"\.?e[Jy](?:[\w-]*\.)(?:[\w-]*\.)[\w-]*")
     description = {"product": "Flask Signed Cookie", "secret": "Flask Password", "severity": "HIGH"}
 
-    def check_secret(self, flask_cookie):
-        if not self.identify(flask_cookie):
+    flask_salt = b"cookie-session"
+
+    # Flask's session serializer signs with itsdangerous' "hmac" key derivation: HMAC-SHA1(secret_key, salt)
+    @classmethod
+    def flask_derivekey(cls, secret_key):
+        return hmac.new(secret_key.encode(), cls.flask_salt, hashlib.sha1).digest()
+
+    # Splits the cookie and decodes its signature once: returns (signed "payload.timestamp", signature bytes)
+    @staticmethod
+    def flask_load(flask_cookie):
+        if "." not in flask_cookie:
+            return None
+        value, signature = flask_cookie.rsplit(".", 1)
+        try:
+            signature_bytes = base64.urlsafe_b64decode(signature + "=" * (-len(signature) % 4))
+        except (binascii.Error, ValueError):
+            return None
+        if len(signature_bytes) != hashlib.sha1().digest_size:
             return None
-        for l in set(list(self.load_resources(["flask_secret_keys.txt", "top_100000_passwords.txt"]))):
-            password = l.rstrip()
+        return value.encode(), signature_bytes
+
+    def check_secret(self, flask_cookie):
+        return self.check_secrets([flask_cookie])[0]
+
+    def check_secrets(self, flask_cookies):
+        results = [None] * len(flask_cookies)
+        indices = []
+        loaded_cookies = []
+        for i, flask_cookie in enumerate(flask_cookies):
+            if self.identify(flask_cookie):
+                loaded_cookie = self.flask_load(flask_cookie)
+                if loaded_cookie:
+                    indices.append(i)
+                    loaded_cookies.append((flask_cookie, *loaded_cookie))
+        if not loaded_cookies:
+            return results
+
+        def verify(loaded_cookie, derived_key, key):
+            flask_cookie, value, signature_bytes = loaded_cookie
+            password = key[0]
+            if not hmac.compare_digest(hmac.new(derived_key, value, hashlib.sha1).digest(), signature_bytes):
+                return None
+            # Only a matching signature goes through flask_unsign, which also checks the payload decodes
             r = flaskVerify(value=flask_cookie, secret=password)
             if r:
                 return {"secret": password, "details": r}
-        return None
+
+        keys, derived_keys = self.load_derived_resources(
+            ["flask_secret_keys.txt", "top_100000_passwords.txt"],
+            "flask-cookie-session",
+            self.flask_derivekey,
+            20,
+        )
+        found = self.key_major_search(loaded_cookies, zip(keys, derived_keys), verify, lambda key: key[1])
+        for j, r in found.items():
+            results[indices[j]] = r
+        return results
 
     def get_hashcat_commands(self, flask_cookie, *args):
         return [
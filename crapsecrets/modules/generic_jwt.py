@@ -1,7 +1,10 @@
 import re
+import hmac
 import jwt as j
 import json
 import base64
+import hashlib
+import binascii
 from crapsecrets.base import CrapsecretsBase
 
 # XMLDSIG Translation Table
@@ -21,6 +24,13 @@ XMLDSIG_table = {
     "http://www.w3.org/2007/05/xmldsig-more#sha512-rsa-MGF1": "PS512",
 }
 
+# HMAC algorithms verified without going through PyJWT
+HMAC_digests = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
 
 class Generic_JWT(CrapsecretsBase):
     identify_regex = re.compile(r"eyJ(?:[\w-]*\.)(?:[\w-]*\.)[\w-]*")
@@ -66,6 +76,19 @@ class Generic_JWT(CrapsecretsBase):
 
         return jwt_headers, algorithm, JWT
 
+    # Splits the token and decodes its signature once: returns (signing input, signature bytes, digest) or None
+    # when the token has to be verified by PyJWT
+    @staticmethod
+    def jwtHMACLoad(jwt_headers, algorithm, JWT):
+        if algorithm not in HMAC_digests or jwt_headers.get("b64", True) is False:
+            return None
+        signing_input, _, signature = JWT.encode().rpartition(b".")
+        try:
+            signature = j.utils.base64url_decode(signature)
+        except (binascii.Error, ValueError):
+            return None
+        return signing_input, signature, HMAC_digests[algorithm]
+
     def get_hashcat_commands(self, JWT, *args):
         jwt_headers, algorithm, JWT = self.jwtLoad(JWT)
         if jwt_headers and algorithm and JWT:
@@ -80,29 +103,64 @@ class Generic_JWT(CrapsecretsBase):
             ]
 
     def check_secret(self, JWT):
-        if not self.identify(JWT):
-            return None
-
-        jwt_headers, algorithm, JWT = self.jwtLoad(JWT)
-        if not jwt_headers or not algorithm or not JWT:
-            return None
-
-        if algorithm[0].lower() == "h":
-            for l in self.load_resources(["jwt_secrets.txt", "top_100000_passwords.txt"]):
-                key = l.strip()
-
+        return self.check_secrets([JWT])[0]
+
+    def check_secrets(self, JWTs):
+        results = [None] * len(JWTs)
+        hmac_targets = []
+        rsa_targets = []
+        for i, JWT in enumerate(JWTs):
+            if not self.identify(JWT):
+                continue
+
+            jwt_headers, algorithm, JWT = self.jwtLoad(JWT)
+            if not jwt_headers or not algorithm or not JWT:
+                continue
+
+            if algorithm[0].lower() == "h":
+                hmac_targets.append((i, jwt_headers, algorithm, JWT, self.jwtHMACLoad(jwt_headers, algorithm, JWT)))
+            elif algorithm[0].lower() == "r":
+                rsa_targets.append((i, jwt_headers, algorithm, JWT, None))
+
+        if hmac_targets:
+
+            def verify_hmac(target, key, l):
+                _, jwt_headers, algorithm, JWT, loaded = target
+                if loaded:
+                    signing_input, signature, digest = loaded
+                    if not hmac.compare_digest(hmac.new(key, signing_input, digest).digest(), signature):
+                        return None
+                # PyJWT only decodes the claims once the signature matched
                 r = self.jwtVerify(JWT, key, algorithm)
                 if r:
                     r["jwt_headers"] = jwt_headers
-                    return {"secret": key, "details": r}
+                    return {"secret": l.strip(), "details": r}
+
+            found = self.key_major_search(
+                hmac_targets,
+                self.load_resources(["jwt_secrets.txt", "top_100000_passwords.txt"]),
+                verify_hmac,
+                lambda l: l.strip().encode(),
+            )
+            for n, r in found.items():
+                results[hmac_targets[n][0]] = r
 
-        elif algorithm[0].lower() == "r":
-            for l in self.load_resources(["jwt_rsakeys_public.txt"]):
-                private_key_name = l.split(":")[0]
-                public_key = f"{l.split(':')[1]}".rstrip().encode().replace(b"\\n", b"\n")
+        if rsa_targets:
+
+            def verify_rsa(target, public_key, l):
+                _, jwt_headers, algorithm, JWT, _ = target
                 r = self.jwtVerify(JWT, public_key, algorithm)
                 if r:
                     r["jwt_headers"] = jwt_headers
-                    return {"secret": f"Private key Name: {private_key_name}", "details": r}
-
-        return None
+                    return {"secret": f"Private key Name: {l.split(':')[0]}", "details": r}
+
+            found = self.key_major_search(
+                rsa_targets,
+                self.load_resources(["jwt_rsakeys_public.txt"]),
+                verify_rsa,
+                lambda l: f"{l.split(':')[1]}".rstrip().encode().replace(b"\\n", b"\n"),
+            )
+            for n, r in found.items():
+                results[rsa_targets[n][0]] = r
+
+        return results
@@ -29,20 +29,40 @@ class Jsf_viewstate(CrapsecretsBase):
         return re.compile(r"<input.+?name=\"javax\.faces\.ViewState\".+?value=\"([^\"]*)\"")
 
     # Mojarra 1.2.x - 2.0.3
-    def DES3_decrypt(self, ct, password):
+    @staticmethod
+    def DES3_derivekey(password):
         x = Java_sha1prng(password)
-        derivedKey = x.get_sha1prng_key(24)
+        return x.get_sha1prng_key(24)
+
+    def DES3_decrypt(self, ct, password):
+        try:
+            return self.DES3_decrypt_derived(base64.b64decode(ct), self.DES3_derivekey(password))
+        except binascii.Error:
+            return False
+
+    def DES3_decrypt_derived(self, ct_bytes, derivedKey):
         cipher = DES3.new(
             derivedKey, DES3.MODE_CBC, iv=b"AAAAAAAA"
         )  # Theres no way to determine the IV, as it lives in server memory. So, we can pass anything in - we can still decrypt all except for block #1
         try:
-            decrypted = cipher.decrypt(base64.b64decode(ct))
+            decrypted = cipher.decrypt(ct_bytes)
             if b"java." in decrypted:
                 return True
-        except (ValueError, binascii.Error):
+        except ValueError:
             return False
         return False
 
+    # Mojarra pads with PKCS5, so only the last block has to be decrypted (with the previous block as its IV) to rule
+    # out almost every wrong key. ecb_cipher is a DES3 ECB cipher of the derived key, reusable across viewstates.
+    @staticmethod
+    def DES3_padding_valid(ct_bytes, ecb_cipher):
+        if len(ct_bytes) < 8 or len(ct_bytes) % 8:
+            return False
+        previous_block = ct_bytes[-16:-8] if len(ct_bytes) >= 16 else b"AAAAAAAA"
+        last_block = bytes(a ^ b for a, b in zip(ecb_cipher.decrypt(ct_bytes[-8:]), previous_block))
+        padding = last_block[-1]
+        return 0 < padding <= 8 and last_block[-padding:] == bytes([padding]) * padding
+
     # Mojarra 2.2.6 - 2.3.x
     def AES_decrypt(self, ct, password_bytes):
         try:
@@ -203,14 +223,12 @@ class Jsf_viewstate(CrapsecretsBase):
 
         return commands
 
-    def check_secret(self, jsf_viewstate_value):
-        if not self.identify(jsf_viewstate_value):
-            return None
-
+    # Returns (result, jsf_viewstate_value, uncompressed); result is only set for unprotected viewstates
+    def jsf_load(self, jsf_viewstate_value):
         jsf_viewstate_value = urllib.parse.unquote(jsf_viewstate_value)
 
         if jsf_viewstate_value.startswith("rO0"):
-            return {
+            result = {
                 "secret": "UNPROTECTED",
                 "details": {
                     "source": jsf_viewstate_value,
@@ -218,11 +236,12 @@ class Jsf_viewstate(CrapsecretsBase):
                     "compression": False,
                 },
             }
+            return result, jsf_viewstate_value, None
 
         uncompressed = self.attempt_decompress(jsf_viewstate_value)
         if uncompressed:
             if b"java." in uncompressed:
-                return {
+                result = {
                     "secret": "UNPROTECTED (COMPRESSED)",
                     "details": {
                         "source": jsf_viewstate_value,
@@ -230,22 +249,65 @@ class Jsf_viewstate(CrapsecretsBase):
                         "compression": True,
                     },
                 }
+                return result, jsf_viewstate_value, uncompressed
             else:
                 jsf_viewstate_value = base64.b64encode(uncompressed)
+        return None, jsf_viewstate_value, uncompressed
+
+    def check_secret(self, jsf_viewstate_value):
+        return self.check_secrets([jsf_viewstate_value])[0]
+
+    def check_secrets(self, jsf_viewstate_values):
+        results = [None] * len(jsf_viewstate_values)
+        loaded_viewstates = []
+        for i, jsf_viewstate_value in enumerate(jsf_viewstate_values):
+            if not self.identify(jsf_viewstate_value):
+                continue
+            result, jsf_viewstate_value, uncompressed = self.jsf_load(jsf_viewstate_value)
+            if result:
+                results[i] = result
+                continue
+            loaded_viewstates.append((i, jsf_viewstate_value, uncompressed))
 
-        for l in set(list(self.load_resources(["jsf_viewstate_passwords.txt", "top_100000_passwords.txt"]))):
+        # The SHA1PRNG 3DES key of each password comes from the persistent derived key cache, so each password
+        # only costs a single block decryption per viewstate (plus a full decryption on the rare valid padding)
+        des3_targets = []
+        for loaded_viewstate in loaded_viewstates:
+            with suppress(binascii.Error, ValueError):
+                des3_targets.append((loaded_viewstate, base64.b64decode(loaded_viewstate[1])))
+
+        def prepare_des3(key):
             with suppress(ValueError):
-                password = l.rstrip()
-                if self.DES3_decrypt(jsf_viewstate_value, password):
-                    return {
-                        "secret": password,
-                        "details": {
-                            "source": jsf_viewstate_value,
-                            "info": "JSF Viewstate (Mojarra 1.2.x - 2.0.3) 3DES Encrypted",
-                            "compression": True if uncompressed else False,
-                        },
-                    }
+                return key[1], DES3.new(key[1], DES3.MODE_ECB)
+
+        def verify_des3(target, prepared_key, key):
+            (_, jsf_viewstate_value, uncompressed), ct_bytes = target
+            derivedKey, ecb_cipher = prepared_key
+            if self.DES3_padding_valid(ct_bytes, ecb_cipher) and self.DES3_decrypt_derived(ct_bytes, derivedKey):
+                return {
+                    "secret": key[0],
+                    "details": {
+                        "source": jsf_viewstate_value,
+                        "info": "JSF Viewstate (Mojarra 1.2.x - 2.0.3) 3DES Encrypted",
+                        "compression": True if uncompressed else False,
+                    },
+                }
+
+        found = {}
+        if des3_targets:
+            keys, derived_keys = self.load_derived_resources(
+                ["jsf_viewstate_passwords.txt", "top_100000_passwords.txt"], "jsf-des3", self.DES3_derivekey, 24
+            )
+            found = self.key_major_search(des3_targets, zip(keys, derived_keys), verify_des3, prepare_des3)
+        for j, r in found.items():
+            results[des3_targets[j][0][0]] = r
+
+        for i, jsf_viewstate_value, uncompressed in loaded_viewstates:
+            if not results[i]:
+                results[i] = self.check_secret_mojarra_myfaces(jsf_viewstate_value, uncompressed)
+        return results
 
+    def check_secret_mojarra_myfaces(self, jsf_viewstate_value, uncompressed):
         # Mojarra decryption
         for l in self.load_resources(["jsf_viewstate_passwords_b64.txt"]):
             with suppress(ValueError):
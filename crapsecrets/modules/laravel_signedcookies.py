@@ -50,9 +50,12 @@ class LaravelSignedCookies(CrapsecretsBase):
         if not self.identify(laravel_signed_cookie):
             return None
 
-        for l in self.load_resources(["laravel_app_keys.txt"]):
-            app_key = l.rstrip()
+        def verify(laravel_signed_cookie, app_key, _):
             r = self.laravelVerify(value=laravel_signed_cookie, secret=app_key)
             if r:
                 return {"secret": app_key, "details": r}
-        return None
+
+        found = self.key_major_search(
+            [laravel_signed_cookie], self.load_resources(["laravel_app_keys.txt"]), verify, lambda l: l.rstrip()
+        )
+        return found.get(0)
@@ -18,28 +18,51 @@ class Peoplesoft_PSToken(CrapsecretsBase):
         return PS_TOKEN_DATA, SHA1_mac
 
     def check_secret(self, PS_TOKEN_B64):
-        if not self.identify(PS_TOKEN_B64):
-            return None
+        return self.check_secrets([PS_TOKEN_B64])[0]
 
-        PS_TOKEN_DATA, SHA1_mac = self.peoplesoft_load(PS_TOKEN_B64)
-        if not PS_TOKEN_DATA or not SHA1_mac:
-            return None
+    def check_secrets(self, PS_TOKEN_B64_list):
+        results = [None] * len(PS_TOKEN_B64_list)
+        indices = []
+        loaded_tokens = []
+        # SHA1 state after each token's data, copied for every password instead of hashing the data again
+        midstates = {}
+        for i, PS_TOKEN_B64 in enumerate(PS_TOKEN_B64_list):
+            if not self.identify(PS_TOKEN_B64):
+                continue
 
-        username = PS_TOKEN_DATA[21 : 21 + PS_TOKEN_DATA[20]].replace(b"\x00", b"").decode()
+            PS_TOKEN_DATA, SHA1_mac = self.peoplesoft_load(PS_TOKEN_B64)
+            if not PS_TOKEN_DATA or not SHA1_mac:
+                continue
 
-        # try no password
-        h = hashlib.sha1(PS_TOKEN_DATA)
-        if h.digest() == SHA1_mac:
-            return {"secret": f"Username: {username} Password: BLANK PASSWORD!", "details": None}
+            username = PS_TOKEN_DATA[21 : 21 + PS_TOKEN_DATA[20]].replace(b"\x00", b"").decode()
 
-        for l in set(list(self.load_resources(["peoplesoft_passwords.txt", "top_100000_passwords.txt"]))):
-            password = l.strip()
+            # try no password
+            h = hashlib.sha1(PS_TOKEN_DATA)
+            if h.digest() == SHA1_mac:
+                results[i] = {"secret": f"Username: {username} Password: BLANK PASSWORD!", "details": None}
+                continue
+            midstates[PS_TOKEN_DATA] = h
+            indices.append(i)
+            loaded_tokens.append((PS_TOKEN_DATA, SHA1_mac, username))
+        if not loaded_tokens:
+            return results
 
-            h = hashlib.sha1(PS_TOKEN_DATA + password.encode("utf_16_le", errors="ignore"))
+        def verify(loaded_token, password_bytes, _):
+            PS_TOKEN_DATA, SHA1_mac, username = loaded_token
+            h = midstates[PS_TOKEN_DATA].copy()
+            h.update(password_bytes)
             if h.digest() == SHA1_mac:
-                return {"secret": f"Username: {username} Password: {password}", "details": None}
+                return {"secret": f"Username: {username} Password: {password_bytes.decode('utf_16_le')}", "details": None}
 
-        return None
+        # The UTF-16LE encoded passwords are cached for the whole process and shared by all the tokens
+        found = self.key_major_search(
+            loaded_tokens,
+            self.load_encoded_resources(["peoplesoft_passwords.txt", "top_100000_passwords.txt"], "utf_16_le"),
+            verify,
+        )
+        for j, r in found.items():
+            results[indices[j]] = r
+        return results
 
     def get_hashcat_commands(self, PS_TOKEN_B64, *args):
         PS_TOKEN_DATA, SHA1_mac = self.peoplesoft_load(PS_TOKEN_B64)
@@ -37,15 +37,19 @@ class Rack2_SignedCookies(CrapsecretsBase):
     def check_secret(self, rack_cookie):
         if not self.identify(rack_cookie):
             return None
-        for l in self.load_resources(
-            ["rails_secret_key_base.txt", "top_100000_passwords.txt", "rack_secret_keys.txt"]
-        ):
-            secret_key_base = l.rstrip()
+
+        def verify(rack_cookie, secret_key_base, _):
             r = self.rack2(rack_cookie, secret_key_base)
             if r:
                 return {"secret": secret_key_base, "details": r}
 
-        return None
+        found = self.key_major_search(
+            [rack_cookie],
+            self.load_resources(["rails_secret_key_base.txt", "top_100000_passwords.txt", "rack_secret_keys.txt"]),
+            verify,
+            lambda l: l.rstrip(),
+        )
+        return found.get(0)
 
     def get_hashcat_commands(self, rack_cookie, *args):
         rack_cookie_split = rack_cookie.rsplit("--", 1)
@@ -14,7 +14,19 @@ class Rails_SecretKeyBase(CrapsecretsBase):
     identify_regex = re.compile(r"^[\.a-zA-z-0-9\%=]{32,}--[\.a-zA-z-0-9%=]{16,}$")
     description = {"product": "Rails Signed Cookie", "secret": "Rails secret_key_base", "severity": "HIGH"}
 
-    def rails(self, rails_cookie, secret_key_base):
+    # The PBKDF2 salt used for each kind of cookie
+    rails_salts = {
+        "signed": "signed cookie",
+        "cbc": "encrypted cookie",
+        "gcm": "authenticated encrypted cookie",
+    }
+
+    @staticmethod
+    def rails_derivekey(secret_key_base, salt):
+        return PBKDF2(secret_key_base, salt, 64, 1000)
+
+    # Everything that does not depend on the secret_key_base, parsed once per cookie
+    def rails_load(self, rails_cookie):
         split_rails_cookie = urllib.parse.unquote(rails_cookie).split("--")
         data = split_rails_cookie[0]
 
@@ -22,53 +34,102 @@ class Rails_SecretKeyBase(CrapsecretsBase):
         if split_rails_cookie[0].startswith("eyJ"):
             signature = split_rails_cookie[1]
             try:
-                hash_alg = self.search_dict(self.hash_sizes, len(binascii.unhexlify(signature)))[0]
+                hash_alg = self.search_dict(self.hash_sizes, len(binascii.unhexlify(signature)))
             except binascii.Error:
                 return None
-            hmac_secret = PBKDF2(secret_key_base, "signed cookie", 64, 1000)
-            h = hmac.new(hmac_secret, data.encode(), hash_alg)
-            if h.hexdigest() == signature:
-                return {"json_data": base64.b64decode(data), "hash_algorithm": hash_alg}
+            if not hash_alg:
+                return None
+            return ("signed", data, signature, hash_alg[0])
 
         # Cookie is likely Rails 4/5/6 AES-CBC Cookie
         elif len(split_rails_cookie) == 2:
             try:
                 encrypted_data = base64.b64decode(data).decode()
-                iv = encrypted_data.split("--")[1]
-                data = encrypted_data.split("--")[0]
+                iv = base64.b64decode(encrypted_data.split("--")[1])
+                ct = base64.b64decode(encrypted_data.split("--")[0])
             except (UnicodeDecodeError, IndexError, binascii.Error):
-                return
-
-            if len(base64.b64decode(iv)) == 16:
-                try:
-                    aes_secret = PBKDF2(secret_key_base, "encrypted cookie", 64, 1000)
-                    cipher = AES.new(aes_secret[:32], AES.MODE_CBC, base64.b64decode(iv)) 
-                              
-                    dec = unpad(cipher.decrypt(base64.b64decode(data)), 16)
-                    json_data = json.loads(dec.decode())
-                    return {"json_data": json_data, "encryption_algorithm": "AES_CBC"}
-                except ValueError:
-                    pass
+                return None
+            if len(iv) == 16:
+                return ("cbc", ct, iv)
 
         # Cookie is likey Rails 6 AES-GCM
         elif len(split_rails_cookie) == 3:
             try:
-                iv = split_rails_cookie[1]
-                aes_secret = PBKDF2(secret_key_base, "authenticated encrypted cookie", 64, 1000)
-                cipher = AES.new(aes_secret[:32], AES.MODE_GCM, nonce=base64.b64decode(iv))
+                return ("gcm", base64.b64decode(data), base64.b64decode(split_rails_cookie[1]))
+            except binascii.Error:
+                return None
+        return None
+
+    # derived_key is the PBKDF2 key of the secret_key_base being tried, for the salt of this kind of cookie
+    def rails_verify(self, loaded_cookie, derived_key):
+        if loaded_cookie[0] == "signed":
+            _, data, signature, hash_alg = loaded_cookie
+            h = hmac.new(derived_key, data.encode(), hash_alg)
+            if h.hexdigest() == signature:
+                return {"json_data": base64.b64decode(data), "hash_algorithm": hash_alg}
+
+        elif loaded_cookie[0] == "cbc":
+            _, ct, iv = loaded_cookie
+            try:
+                cipher = AES.new(derived_key[:32], AES.MODE_CBC, iv)
+                dec = unpad(cipher.decrypt(ct), 16)
+                json_data = json.loads(dec.decode())
+                return {"json_data": json_data, "encryption_algorithm": "AES_CBC"}
+            except ValueError:
+                pass
 
-                dec = cipher.decrypt(base64.b64decode(data))
+        elif loaded_cookie[0] == "gcm":
+            _, ct, iv = loaded_cookie
+            try:
+                cipher = AES.new(derived_key[:32], AES.MODE_GCM, nonce=iv)
+                dec = cipher.decrypt(ct)
                 json_data = json.loads(dec.decode())
                 return {"json_data": json_data, "encryption_algorithm": "AES_GCM"}
             except ValueError:
                 return None
 
+    def rails(self, rails_cookie, secret_key_base):
+        loaded_cookie = self.rails_load(rails_cookie)
+        if loaded_cookie:
+            derived_key = self.rails_derivekey(secret_key_base, self.rails_salts[loaded_cookie[0]])
+            return self.rails_verify(loaded_cookie, derived_key)
+
     def check_secret(self, rails_cookie):
-        if not self.identify(rails_cookie):
-            return None
-        for l in self.load_resources(["rails_secret_key_base.txt"]):
-            secret_key_base = l.rstrip()
-            r = self.rails(rails_cookie, secret_key_base)
+        return self.check_secrets([rails_cookie])[0]
+
+    def check_secrets(self, rails_cookies):
+        results = [None] * len(rails_cookies)
+        indices = []
+        loaded_cookies = []
+        for i, rails_cookie in enumerate(rails_cookies):
+            if self.identify(rails_cookie):
+                loaded_cookie = self.rails_load(rails_cookie)
+                if loaded_cookie:
+                    indices.append(i)
+                    loaded_cookies.append(loaded_cookie)
+        if not loaded_cookies:
+            return results
+
+        def verify(loaded_cookie, derived_key, key):
+            r = self.rails_verify(loaded_cookie, derived_key)
             if r:
-                return {"secret": secret_key_base, "details": r}
-        return None
+                return {"secret": key[0], "details": r}
+
+        # The salts are fixed, so each (secret_key_base, salt) key comes from the persistent derived key cache and
+        # checking a cookie costs a single HMAC or AES operation per secret_key_base
+        for kind, salt in self.rails_salts.items():
+            group = [j for j, loaded_cookie in enumerate(loaded_cookies) if loaded_cookie[0] == kind]
+            if not group:
+                continue
+            keys, derived_keys = self.load_derived_resources(
+                ["rails_secret_key_base.txt"],
+                f"rails-{salt}",
+                lambda secret_key_base: self.rails_derivekey(secret_key_base, salt),
+                64,
+            )
+            found = self.key_major_search(
+                [loaded_cookies[j] for j in group], zip(keys, derived_keys), verify, lambda key: key[1]
+            )
+            for k, r in found.items():
+                results[indices[group[k]]] = r
+        return results
@@ -65,9 +65,12 @@ class Symfony_SignedURL(CrapsecretsBase):
     def check_secret(self, signed_url):
         if not self.identify(signed_url):
             return None
-        for l in self.load_resources(["symfony_appsecret.txt"]):
-            password = l.rstrip()
+        def verify(signed_url, password, _):
             r = self.symfonyVerify(value=signed_url, secret=password)
             if r:
                 return {"secret": password, "details": r}
-        return None
+
+        found = self.key_major_search(
+            [signed_url], self.load_resources(["symfony_appsecret.txt"]), verify, lambda l: l.rstrip()
+        )
+        return found.get(0)
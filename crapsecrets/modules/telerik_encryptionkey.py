@@ -23,16 +23,30 @@ class Telerik_EncryptionKey(CrapsecretsBase):
         "severity": "MEDIUM",
     }
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # derived_keylist of each (key_derive_mode, include_machinekeys)
+        self._derived_keylists = {}
+
     def carve_regex(self):
         return re.compile(r"{\"SerializedParameters\":\"([^\"]*)\"")
 
+    key_derive_modes = ["PBKDF1_MS", "PBKDF2"]
+
+    @staticmethod
+    def machinekey_ekey(l):
+        with suppress(ValueError):
+            vkey, ekey = l.rstrip().split(",")
+            if ekey:
+                return ekey
+        return None
+
     def prepare_keylist(self, include_machinekeys=False):
         if include_machinekeys:
             for l in self.load_resources(["aspnet_machinekeys.txt"]):
-                with suppress(ValueError):
-                    vkey, ekey = l.rstrip().split(",")
-                    if ekey:
-                        yield ekey
+                ekey = self.machinekey_ekey(l)
+                if ekey:
+                    yield ekey
         for l in self.load_resources(["telerik_encryption_keys.txt"]):
             ekey = l.strip()
             yield ekey
@@ -45,6 +59,56 @@ class Telerik_EncryptionKey(CrapsecretsBase):
         else:
             raise Telerik_EncryptionKey_Exception("Invalid key_derive_mode")
 
+    # {ekey: (derivedKey, derivedIV)} for every key of the wordlists, read from the persistent derived key cache.
+    # The salt is hardcoded, so each key only ever has to be derived once per mode.
+    def derived_keylist(self, key_derive_mode, include_machinekeys=False):
+        if key_derive_mode not in self.key_derive_modes:
+            raise Telerik_EncryptionKey_Exception("Invalid key_derive_mode")
+        derived_keylist = self._derived_keylists.get((key_derive_mode, include_machinekeys))
+        if derived_keylist is not None:
+            return derived_keylist
+
+        def derive(ekey):
+            derivedKey, derivedIV = self.telerik_derivekeys(ekey, key_derive_mode)
+            return derivedKey + derivedIV
+
+        def derive_machinekey(l):
+            ekey = self.machinekey_ekey(l)
+            return derive(ekey) if ekey else None
+
+        derived_keylist = {}
+        if include_machinekeys:
+            keys, derived_keys = self.load_derived_resources(
+                ["aspnet_machinekeys.txt"],
+                f"telerik-machinekeys-{key_derive_mode}",
+                derive_machinekey,
+                48,
+            )
+            for l, derived in zip(keys, derived_keys):
+                if derived:
+                    derived_keylist.setdefault(self.machinekey_ekey(l), (derived[:32], derived[32:]))
+        keys, derived_keys = self.load_derived_resources(
+            ["telerik_encryption_keys.txt"], f"telerik-{key_derive_mode}", lambda l: derive(l.strip()), 48
+        )
+        for l, derived in zip(keys, derived_keys):
+            derived_keylist.setdefault(l.strip(), (derived[:32], derived[32:]))
+
+        self._derived_keylists[(key_derive_mode, include_machinekeys)] = derived_keylist
+        return derived_keylist
+
+    # Same as telerik_derivekeys, served from derived_keylist when the key is one of the wordlist keys. The table is
+    # only built with build (callers walking the whole wordlist); otherwise a table not built yet is not used, since
+    # deriving one key is cheaper than deriving them all
+    def telerik_derivekeys_cached(self, ekey, key_derive_mode, include_machinekeys=False, build=False):
+        if build:
+            derived_keylist = self.derived_keylist(key_derive_mode, include_machinekeys)
+        else:
+            derived_keylist = self._derived_keylists.get((key_derive_mode, include_machinekeys), {})
+        derived = derived_keylist.get(ekey)
+        if derived:
+            return derived
+        return self.telerik_derivekeys(ekey, key_derive_mode)
+
     def telerik_derivekeys_PBKDF1_MS(self, ekey):
         csharp_pbkdf1 = Csharp_pbkdf1(ekey.encode(), bytes(telerik_hardcoded_salt), 100)
         derivedKey = csharp_pbkdf1.GetBytes(32)
@@ -89,7 +153,7 @@ class Telerik_EncryptionKey(CrapsecretsBase):
 
     def check_secret(self, dialogParameters_raw, key_derive_mode=None, include_machinekeys=False):
         if not key_derive_mode:
-            key_derive_modes = ["PBKDF1_MS", "PBKDF2"]
+            key_derive_modes = self.key_derive_modes
         else:
             key_derive_modes = [key_derive_mode]
 
@@ -103,7 +167,7 @@ class Telerik_EncryptionKey(CrapsecretsBase):
             return None
         for key_derive_mode in key_derive_modes:
             for ekey in self.prepare_keylist(include_machinekeys=include_machinekeys):
-                derivedKey, derivedIV = self.telerik_derivekeys(ekey, key_derive_mode)
+                derivedKey, derivedIV = self.telerik_derivekeys_cached(ekey, key_derive_mode, include_machinekeys, build=True)
                 dialog_parameters = self.telerik_decrypt(derivedKey, derivedIV, dp_enc)
                 if not dialog_parameters:
                     continue
@@ -119,7 +183,7 @@ class Telerik_EncryptionKey(CrapsecretsBase):
         dp_enc = base64.b64encode(test_string).decode()
 
         for ekey in self.prepare_keylist(include_machinekeys=include_machinekeys):
-            derivedKey, derivedIV = self.telerik_derivekeys(ekey, key_derive_mode)
+            derivedKey, derivedIV = self.telerik_derivekeys_cached(ekey, key_derive_mode, include_machinekeys, build=True)
             ct = self.telerik_encrypt(derivedKey, derivedIV, dp_enc)
             h = hmac.new(hash_key.encode(), ct.encode(), self.hash_algs["SHA256"])
             yield (f"{ct}{base64.b64encode(h.digest()).decode()}", ekey)
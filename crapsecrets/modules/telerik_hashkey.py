@@ -20,12 +20,11 @@ class Telerik_HashKey(CrapsecretsBase):
 
     def prepare_keylist(self, include_machinekeys=True):
         if include_machinekeys:
-            for l in self.load_resources(["aspnet_machinekeys.txt"]):
-                try:
-                    vkey, ekey = l.rstrip().split(",")
+            # The validation keys of the shared machine key store; the hash key is their text, so only AutoGenerate is
+            # left out
+            for vkey in self.load_machine_keys(["aspnet_machinekeys.txt"]).validation:
+                if vkey and vkey.lower() != "autogenerate":
                     yield vkey
-                except ValueError:
-                    continue
         for l in self.load_resources(["telerik_hash_keys.txt"]):
             vkey = l.strip()
             yield vkey
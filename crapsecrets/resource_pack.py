@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# Compiles crapsecrets/resources/*.txt into a single memory-mapped wordlist pack
+#
+# Layout (little-endian):
+#   header:  magic, version, number of lists, number of entries
+#   lists:   per list - name, source size, source mtime_ns, number of entries
+#   offsets: (entries + 1) uint32 offsets into the blob
+#   indices: per list, the uint32 indices of its entries in file order (first occurrences only)
+#   blob:    de-duplicated utf-8 entries, back to back
+#
+# Every process mapping the same pack shares it through the page cache and nothing is parsed at runtime.
+
+import os
+import sys
+import mmap
+import struct
+import argparse
+from array import array
+from itertools import chain
+
+PACK_MAGIC = b"CSPACK\x00\x01"
+PACK_VERSION = 2
+PACK_FILENAME = "wordlists.pack"
+RESOURCES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resources")
+DEFAULT_PACK_PATH = os.path.join(RESOURCES_DIR, PACK_FILENAME)
+
+_header = struct.Struct("<8sIII")
+_list_header = struct.Struct("<HQQI")
+
+
+def build_pack(resources_dir=RESOURCES_DIR, pack_path=None):
+    if pack_path is None:
+        pack_path = os.path.join(resources_dir, PACK_FILENAME)
+
+    names = sorted(f for f in os.listdir(resources_dir) if f.endswith(".txt"))
+
+    entries = {}
+    lists = []
+    for name in names:
+        path = os.path.join(resources_dir, name)
+        st = os.stat(path)
+        with open(path, encoding="utf-8") as r:
+            indices = array("I", dict.fromkeys(entries.setdefault(l.rstrip(), len(entries)) for l in r))
+        if sys.byteorder != "little":
+            indices.byteswap()
+        lists.append((name.encode("utf-8"), st.st_size, st.st_mtime_ns, indices))
+
+    blob = bytearray()
+    offsets = array("I", [0])
+    for entry in entries:
+        blob += entry.encode("utf-8")
+        offsets.append(len(blob))
+    if sys.byteorder != "little":
+        offsets.byteswap()
+
+    with open(pack_path + ".tmp", "wb") as f:
+        f.write(_header.pack(PACK_MAGIC, PACK_VERSION, len(lists), len(entries)))
+        for name, size, mtime_ns, indices in lists:
+            f.write(_list_header.pack(len(name), size, mtime_ns, len(indices)))
+            f.write(name)
+        f.write(offsets.tobytes())
+        for _, _, _, indices in lists:
+            f.write(indices.tobytes())
+        f.write(blob)
+    os.replace(pack_path + ".tmp", pack_path)
+    return pack_path, len(lists), len(entries)
+
+
+class PackedWordlist:
+    """Read-only sequence over a subset of the pack entries, decoded from the mapping only when accessed"""
+
+    def __init__(self, pack, indices):
+        self.pack = pack
+        self.indices = indices
+        # Membership bitmap over the pack entries, only built when membership is queried
+        self._members = None
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        return self.pack.entry(self.indices[i])
+
+    def __iter__(self):
+        blob = self.pack.blob
+        offsets = self.pack.offsets
+        for i in self.indices:
+            yield str(blob[offsets[i] : offsets[i + 1]], "utf-8")
+
+    def __contains__(self, value):
+        i = self.pack.index_of(value)
+        if i is None:
+            return False
+        if self._members is None:
+            members = bytearray((self.pack.entry_count + 7) // 8)
+            for n in self.indices:
+                members[n >> 3] |= 1 << (n & 7)
+            self._members = members
+        return bool(self._members[i >> 3] >> (i & 7) & 1)
+
+
+class ResourcePack:
+    def __init__(self, pack_path=DEFAULT_PACK_PATH):
+        self.pack_path = pack_path
+        with open(pack_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, version, list_count, entry_count = _header.unpack_from(view, 0)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"[{pack_path}] is not a supported wordlist pack")
+        pos = _header.size
+
+        list_headers = []
+        for _ in range(list_count):
+            name_len, size, mtime_ns, count = _list_header.unpack_from(view, pos)
+            pos += _list_header.size
+            list_headers.append((str(view[pos : pos + name_len], "utf-8"), size, mtime_ns, count))
+            pos += name_len
+
+        self.entry_count = entry_count
+        self.offsets, pos = self.uint32_array(view, pos, entry_count + 1)
+        # name: (indices of its entries in file order, source size, source mtime_ns)
+        self.lists = {}
+        for name, size, mtime_ns, count in list_headers:
+            indices, pos = self.uint32_array(view, pos, count)
+            self.lists[name] = (indices, size, mtime_ns)
+        self.blob = view[pos:]
+        self._index = None
+
+    @staticmethod
+    def uint32_array(view, pos, count):
+        values = view[pos : pos + count * 4]
+        if len(values) != count * 4:
+            raise ValueError("Truncated wordlist pack")
+        return (values.cast("I") if sys.byteorder == "little" else array("I", values)), pos + count * 4
+
+    def entry(self, i):
+        return str(self.blob[self.offsets[i] : self.offsets[i + 1]], "utf-8")
+
+    def index_of(self, value):
+        # Only built when membership is queried directly
+        if self._index is None:
+            self._index = {self.entry(i): i for i in range(self.entry_count)}
+        return self._index.get(value)
+
+    def is_fresh(self, filepath, st=None):
+        entry = self.lists.get(os.path.basename(filepath))
+        if not entry or os.path.dirname(os.path.abspath(filepath)) != os.path.dirname(os.path.abspath(self.pack_path)):
+            return False
+        st = st or os.stat(filepath)
+        return entry[1] == st.st_size and entry[2] == st.st_mtime_ns
+
+    # The entries of the files in the order the text files give them (see ResourceCache.load_files): file by file,
+    # each entry where it first appears
+    def wordlist(self, filepaths):
+        lists = [self.lists[os.path.basename(filepath)][0] for filepath in filepaths]
+        if len(lists) == 1:
+            return PackedWordlist(self, lists[0])
+        return PackedWordlist(self, array("I", dict.fromkeys(chain.from_iterable(lists))))
+
+
+def load_pack(pack_path=DEFAULT_PACK_PATH):
+    if not os.path.isfile(pack_path):
+        return None
+    try:
+        return ResourcePack(pack_path)
+    except (ValueError, struct.error, OSError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the crapsecrets wordlists into a memory-mapped pack")
+    parser.add_argument("-r", "--resources-dir", default=RESOURCES_DIR, help="Directory holding the .txt wordlists")
+    parser.add_argument("-o", "--output", default=None, help=f"Pack file to write (default: <resources-dir>/{PACK_FILENAME})")
+    args = parser.parse_args()
+    pack_path, list_count, entry_count = build_pack(args.resources_dir, args.output)
+    print(f"Wrote {entry_count} unique entries from {list_count} wordlists to [{pack_path}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,14 @@
 import os
+import base64
+import hashlib
+import pickle
+import concurrent.futures
 from crapsecrets import modules_loaded
+from crapsecrets.base import carve_all_modules
+from crapsecrets.helpers import sp800_108_get_key_derivation_parameters
+from crapsecrets.modules.aspnet_viewstate import DotNetMode, ViewstateJob
+
+from tests.carve_test import aspnet_viewstate_sample
 
 ASPNETViewstate = modules_loaded["aspnet_viewstate"]
 
@@ -279,4 +288,71 @@ def test_viewstate_exception_handling():
     malformed_viewstate = "/wGZmZmZmZmZmZmZmZmZmZmZmZmZmZmZmZmZmZmZmZmZmZk="
 
     result = x.check_secret(malformed_viewstate, "00000000")
-    assert result is None
\ No newline at end of file
+    assert result is None
+
+def test_viewstate_process_pool():
+    viewstate = "eljkFjgquXvKTwyz1wKBc7YUhgWuFCwrYNoNIoY/XudiY7i8/ejpHFaLMbHcXr8JRuwoFVHfWHlXo3LXIHLWazicVbeAxOb4l3utHSCjBzO920I2LOLJ/5fnBJkpdnT6nJTTfyx55aa1Dt//GpQeEA=="
+    bad_viewstate = "AAAA" + viewstate[4:]
+    x = ASPNETViewstate()
+    expected = x.check_secret(viewstate, "http://172.16.25.128/form.aspx")
+    expected_bad = x.check_secret(bad_viewstate, "http://172.16.25.128/form.aspx")
+    assert expected
+
+    x = ASPNETViewstate()
+    x.use_processes = True
+    x.thread_number = 2
+    assert x.check_secret(viewstate, "http://172.16.25.128/form.aspx") == expected
+    assert x.check_secret(bad_viewstate, "http://172.16.25.128/form.aspx") == expected_bad
+
+
+def test_viewstate_process_pool_in_carve(monkeypatch):
+    # carve_all_modules runs the ViewState check in a thread: the keys must still be checked by worker processes
+    worker_pids = []
+
+    class RecordingProcessPoolExecutor(concurrent.futures.ProcessPoolExecutor):
+        def shutdown(self, *args, **kwargs):
+            worker_pids.extend(self._processes or {})
+            return super().shutdown(*args, **kwargs)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", RecordingProcessPoolExecutor)
+    expected = [r["secret"] for r in carve_all_modules(body=aspnet_viewstate_sample) if r["detecting_module"] == "ASPNET_Viewstate"]
+    results = carve_all_modules(body=aspnet_viewstate_sample, use_processes=True, num_threads=2)
+    assert [r["secret"] for r in results if r["detecting_module"] == "ASPNET_Viewstate"] == expected
+    assert expected
+    assert worker_pids and os.getpid() not in worker_pids
+
+
+def test_viewstate_job():
+    viewstate = "/wEPDwUJODExMDE5NzY5ZGSglOSr1rG6xN5rzh/4C9UEuwa64w=="
+    raw = base64.b64decode(viewstate)
+    purposes = [["TemplateSourceDirectory: /", "Type: FORM_ASPX"]]
+    job = ViewstateJob(viewstate, False, ["CA0B0334"], [None, "user"], all_specific_purposes=purposes, signature_by_parser=raw[-20:])
+    assert job.candidate_hash_algs == ["SHA1"]
+    assert job.signed_parts["SHA1"] == (raw[:-20], raw[-20:])
+    assert job.message("SHA1", 0, "user".encode("utf-16-le")) == raw[:-20] + bytes.fromhex("34030BCA") + "user".encode("utf-16-le")
+    label, context = sp800_108_get_key_derivation_parameters(
+        job.main_purpose, purposes[0] + ["ViewStateUserKey: user"]
+    )
+    assert job.derivation_parameters["user"] == [(purposes[0], label, context)]
+    # The lazily built parts are not sent to worker processes
+    assert pickle.loads(pickle.dumps(job)).messages == {}
+
+    assert ViewstateJob("AAAAA", True).viewstate_bytes is None
+
+
+def test_viewstate_md5_legacy():
+    x = ASPNETViewstate()
+    data = b"\xff\x01" + os.urandom(300)
+    modifier = bytes.fromhex("34030BCA") + "user".encode("utf-16-le")
+    for vkey_bytes in (os.urandom(8), os.urandom(32)):
+        # What ASP.NET hashes: the key written over the start of the modifier, padded to the length of both
+        buffer = bytearray(len(data) + len(vkey_bytes) + len(modifier))
+        buffer[: len(data)] = data
+        buffer[len(data) : len(data) + len(modifier)] = modifier
+        buffer[len(data) : len(data) + len(vkey_bytes)] = vkey_bytes
+        signed = base64.b64encode(data + hashlib.md5(buffer).digest()).decode()
+        job = ViewstateJob(signed, False, ["CA0B0334"], [None, "user"], signature_by_parser=hashlib.md5(buffer).digest())
+        assert x.viewstate_validate_check(vkey_bytes, job, 0, DotNetMode.DOTNET40_LEGACY) == ("MD5", None, "user")
+        assert x.viewstate_validate_check(os.urandom(32), job, 0, DotNetMode.DOTNET40_LEGACY) == (None, None, None)
+        # The MD5 state over the ViewState is not sent to worker processes
+        assert pickle.loads(pickle.dumps(job)).md5_state is None
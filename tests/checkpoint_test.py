@@ -0,0 +1,169 @@
+import os
+import json
+
+import pytest
+
+import crapsecrets.errors
+
+from crapsecrets import modules_loaded
+from crapsecrets.checkpoint import Checkpoint
+
+Rails_SecretKeyBase = modules_loaded["rails_secretkeybase"]
+ASPNET_Viewstate = modules_loaded["aspnet_viewstate"]
+
+viewstate = ("/wEPDwUJODExMDE5NzY5ZGQMKS6jehX5HkJgXxrPh09vumNTKQ==", "EDD8C9AE")
+
+
+class Interrupted(BaseException):
+    pass
+
+
+def test_search_progress(tmp_path):
+    path = str(tmp_path / "state.json")
+    checkpoint = Checkpoint(path)
+    progress = checkpoint.search("test", 1)
+    assert progress.remaining(10) == [(0, 10)]
+    progress.done(0, 3)
+    progress.done(5)
+    progress.done(3)
+    progress.advance(4, (1, 2))
+    progress.add_found(0, {"secret": "x"})
+    assert progress.remaining(10) == [(4, 5), (6, 10)]
+
+    resumed = Checkpoint(path, resume=True).search("test", 1)
+    assert resumed.remaining(10) == [(4, 5), (6, 10)]
+    assert resumed.cursor(4) == (1, 2)
+    assert resumed.found() == {"0": {"secret": "x"}}
+    assert not resumed.complete
+    # Another search, or a fresh run, starts from scratch
+    assert Checkpoint(path, resume=True).search("test", 2).remaining(10) == [(0, 10)]
+    assert Checkpoint(path).search("test", 1).remaining(10) == [(0, 10)]
+
+    with open(path, "w") as f:
+        f.write("{}")
+    with pytest.raises(crapsecrets.errors.CheckpointException):
+        Checkpoint(path, resume=True)
+
+
+@pytest.mark.parametrize("num_threads", [1, 2])
+def test_key_major_search_resume(tmp_path, num_threads):
+    path = str(tmp_path / "state.json")
+    keys = [str(n) for n in range(5000)]
+    targets = [4001, 2500, 7]
+    tested = []
+    interrupt_at = [6600]
+
+    def verify(target, key, _):
+        tested.append(key)
+        if len(tested) == interrupt_at[0]:
+            interrupt_at[0] = None
+            raise Interrupted()
+        if int(key) and int(key) % target == 0 and int(key) > 1000:
+            return key
+
+    expected = Rails_SecretKeyBase().key_major_search(targets, keys, lambda t, k, _: str(k) if int(k) and int(k) % t == 0 and int(k) > 1000 else None)
+    assert expected == {0: "4001", 1: "2500", 2: "1001"}
+
+    x = Rails_SecretKeyBase(num_threads=num_threads, checkpoint=Checkpoint(path, interval=0))
+    x.min_shard_size = 256
+    with pytest.raises(Interrupted):
+        x.key_major_search(targets, keys, verify)
+    x.checkpoint.save()
+
+    tested.clear()
+    x = Rails_SecretKeyBase(num_threads=num_threads, checkpoint=Checkpoint(path, resume=True))
+    x.min_shard_size = 256
+    assert x.key_major_search(targets, keys, verify) == expected
+    # Only part of the keys were walked again
+    assert 0 < len(set(tested)) < 2000
+    with open(path) as f:
+        assert all(s["complete"] for s in json.load(f)["searches"].values())
+
+    # A complete search is answered from the checkpoint
+    tested.clear()
+    x = Rails_SecretKeyBase(checkpoint=Checkpoint(path, resume=True))
+    assert x.key_major_search(targets, keys, verify) == expected
+    assert not tested
+
+
+def test_viewstate_resume(tmp_path, monkeypatch):
+    calls = []
+    process_validationkey = ASPNET_Viewstate.process_validationkey
+
+    def counting_process_validationkey(self, *args, **kwargs):
+        calls.append(args[0])
+        return process_validationkey(self, *args, **kwargs)
+
+    monkeypatch.setattr(ASPNET_Viewstate, "process_validationkey", counting_process_validationkey)
+    expected = ASPNET_Viewstate().check_secret(*viewstate)
+    full_calls = len(calls)
+    assert full_calls > 200
+
+    def interrupted_process_validationkey(self, *args, **kwargs):
+        if len(calls) == 100:
+            raise Interrupted()
+        return counting_process_validationkey(self, *args, **kwargs)
+
+    path = str(tmp_path / "state.json")
+    calls.clear()
+    monkeypatch.setattr(ASPNET_Viewstate, "process_validationkey", interrupted_process_validationkey)
+    checkpoint = Checkpoint(path)
+    with pytest.raises(Interrupted):
+        ASPNET_Viewstate(checkpoint=checkpoint).check_secret(*viewstate)
+    checkpoint.save()
+
+    calls.clear()
+    monkeypatch.setattr(ASPNET_Viewstate, "process_validationkey", counting_process_validationkey)
+    checkpoint = Checkpoint(path, resume=True)
+    assert ASPNET_Viewstate(checkpoint=checkpoint).check_secret(*viewstate) == expected
+    assert len(calls) == full_calls - 100
+
+    # Resuming a finished search replays its hit without testing any key
+    calls.clear()
+    assert ASPNET_Viewstate(checkpoint=Checkpoint(path, resume=True)).check_secret(*viewstate) == expected
+    assert not calls
+
+
+def test_checkpoint_resources_identity(tmp_path):
+    path = str(tmp_path / "state.json")
+    wordlist = tmp_path / "secrets.txt"
+    wordlist.write_text("aaaa\nbbbb\n")
+    tested = []
+
+    def verify(target, key, _):
+        tested.append(key)
+        return key if key == target else None
+
+    def search(resume):
+        x = Rails_SecretKeyBase(custom_resource=str(wordlist), checkpoint=Checkpoint(path, resume=resume))
+        found = x.key_major_search(["bbbb"], x.load_resources([]), verify)
+        x.checkpoint.save()
+        return found
+
+    assert search(False) == {0: "bbbb"}
+    tested.clear()
+    assert search(True) == {0: "bbbb"}
+    assert not tested
+
+    # The same number of keys from an edited wordlist is another search
+    wordlist.write_text("bbbb\ncccc\n")
+    os.utime(wordlist, ns=(0, 0))
+    assert search(True) == {0: "bbbb"}
+    assert tested == ["bbbb"]
+
+
+def test_viewstate_remaining_keys_complete(tmp_path):
+    progress = Checkpoint(str(tmp_path / "state.json")).search("test")
+    keys = [("A", b"\x0a"), ("B", b"\x0b")]
+    assert ASPNET_Viewstate.remaining_keys(keys, progress) == [(0, "A", b"\x0a"), (1, "B", b"\x0b")]
+    progress.finish()
+    assert ASPNET_Viewstate.remaining_keys(keys, progress) == []
+
+
+def test_checkpoint_bytes(tmp_path):
+    path = str(tmp_path / "state.json")
+    checkpoint = Checkpoint(path)
+    checkpoint.search("test").add_found(0, ["key", b"\x00\xffkey"])
+    assert Checkpoint(path, resume=True).search("test").found() == {"0": ["key", b"\x00\xffkey"]}
+    with pytest.raises(crapsecrets.errors.CheckpointException):
+        checkpoint.search("test").add_found(1, object())
@@ -0,0 +1,134 @@
+import os
+import time
+import hashlib
+import threading
+import tempfile
+
+from crapsecrets import modules_loaded
+from crapsecrets.base import ResourceCache, derived_key_cache
+from crapsecrets.derived_keys import DerivedKeyCache, derived_keys_dir
+from crapsecrets.examples import cli
+
+Rails_SecretKeyBase = modules_loaded["rails_secretkeybase"]
+
+flask_cookie = "eyJoZWxsbyI6IndvcmxkIn0.XDtqeQ.1qsBdjyRJLokwRzJdzXMVCSyRTA"
+
+
+def derive(key):
+    # Keys starting with "bad" cannot be derived
+    if key.startswith("bad"):
+        return None
+    return hashlib.sha256(key.encode()).digest()
+
+
+def test_table_persisted_and_reused():
+    with tempfile.TemporaryDirectory() as d:
+        wordlist = os.path.join(d, "keys.txt")
+        with open(wordlist, "w") as f:
+            f.write("one\nbad_key\ntwo\n")
+        keys = ResourceCache(pack_path=None).load_files([wordlist])
+
+        table = DerivedKeyCache(os.path.join(d, "cache")).table("test", [wordlist], keys, derive, 32)
+        assert list(table) == [derive("one"), None, derive("two")]
+        assert table[2] == derive("two")
+        assert len(os.listdir(os.path.join(d, "cache"))) == 1
+
+        # A new process reads the saved table instead of deriving the keys again
+        def fail(key):
+            raise AssertionError("key derived again")
+
+        table = DerivedKeyCache(os.path.join(d, "cache")).table("test", [wordlist], keys, fail, 32)
+        assert list(table) == [derive("one"), None, derive("two")]
+
+
+def test_table_invalidated_on_change():
+    with tempfile.TemporaryDirectory() as d:
+        wordlist = os.path.join(d, "keys.txt")
+        with open(wordlist, "w") as f:
+            f.write("one\n")
+        cache = DerivedKeyCache(os.path.join(d, "cache"))
+        resources = ResourceCache(pack_path=None)
+        assert list(cache.table("test", [wordlist], resources.load_files([wordlist]), derive, 32)) == [derive("one")]
+
+        time.sleep(0.01)
+        with open(wordlist, "w") as f:
+            f.write("one\nthree\n")
+        table = cache.table("test", [wordlist], resources.load_files([wordlist]), derive, 32)
+        assert list(table) == [derive("one"), derive("three")]
+
+
+def test_memory_only_cache():
+    with tempfile.TemporaryDirectory() as d:
+        wordlist = os.path.join(d, "keys.txt")
+        with open(wordlist, "w") as f:
+            f.write("one\n")
+        cache = DerivedKeyCache(None)
+        keys = ResourceCache(pack_path=None).load_files([wordlist])
+        assert cache.table("test", [wordlist], keys, derive, 32) is cache.table("test", [wordlist], keys, derive, 32)
+        assert os.listdir(d) == ["keys.txt"]
+
+
+def test_tables_built_concurrently_and_bounded(tmp_path):
+    wordlist = tmp_path / "keys.txt"
+    wordlist.write_text("one\ntwo\n")
+    keys = ResourceCache(pack_path=None).load_files([str(wordlist)])
+    cache = DerivedKeyCache(None, max_bytes=2 * 33)
+    other_built = threading.Event()
+    calls = []
+
+    # Building "slow" waits for "fast", which a cache-wide lock held while building would deadlock
+    def slow(key):
+        assert other_built.wait(10)
+        return derive(key)
+
+    def fast(key):
+        calls.append(key)
+        return derive(key)
+
+    thread = threading.Thread(target=lambda: cache.table("slow", [str(wordlist)], keys, slow, 32))
+    thread.start()
+    cache.table("fast", [str(wordlist)], keys, fast, 32)
+    other_built.set()
+    thread.join()
+    assert calls == ["one", "two"]
+
+    # Only one table fits, the least recently used is dropped
+    assert len(cache._tables) == 1
+    cache.table("fast", [str(wordlist)], keys, fast, 32)
+    assert len(calls) == 4
+
+
+def test_rails_custom_resource_derived_keys(monkeypatch, tmp_path):
+    monkeypatch.setattr(derived_key_cache, "cache_dir", str(tmp_path))
+    monkeypatch.setattr(derived_key_cache, "_tables", {})
+    secret_key_base = "4698bc5d99f3103ca76ab57f28a6b8f75f5f0768aab4f2e3f3743383594ad91f43e78c1b86138602f5859a811927698180ebfae7c490333f37b87521ca5a5f8c"
+    cookie = "eyJfcmFpbHMiOnsibWVzc2FnZSI6IklraGxiR3h2TENCSklHRnRJR0VnYzJsbmJtVmtJSEpoYVd4ek5pQkRiMjlyYVdVaElnPT0iLCJleHAiOm51bGwsInB1ciI6ImNvb2tpZS5zaWduZWQifX0%3D--eb1ea3ddc55deb16ffc58ac165edfbb554067edc"
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(f"{secret_key_base}\n")
+    try:
+        x = Rails_SecretKeyBase(custom_resource=f.name)
+        keys, derived_keys = x.load_derived_resources(
+            ["rails_secret_key_base.txt"],
+            "rails-signed cookie",
+            lambda k: x.rails_derivekey(k, "signed cookie"),
+            64,
+        )
+        assert keys[0] == secret_key_base
+        assert derived_keys[0] == x.rails_derivekey(secret_key_base, "signed cookie")
+        assert x.check_secret(cookie)["secret"] == secret_key_base
+        assert len(os.listdir(tmp_path)) == 1
+    finally:
+        os.remove(f.name)
+
+
+def test_persistence_opt_in(monkeypatch, capsys, tmp_path):
+    monkeypatch.delenv("CRAPSECRETS_CACHE_DIR", raising=False)
+    assert derived_keys_dir() is None
+    monkeypatch.setenv("CRAPSECRETS_CACHE_DIR", str(tmp_path))
+    assert derived_keys_dir() == str(tmp_path)
+
+    monkeypatch.setattr(derived_key_cache, "cache_dir", None)
+    monkeypatch.setattr("sys.argv", ["python", "-nh", "--derived-key-cache", str(tmp_path / "cache"), flask_cookie])
+    cli.main()
+    assert "CHANGEME" in capsys.readouterr().out
+    assert derived_key_cache.cache_dir == str(tmp_path / "cache")
@@ -1,3 +1,5 @@
+import hmac
+from django.utils.crypto import salted_hmac
 from crapsecrets import modules_loaded
 
 DjangoSignedCookies = modules_loaded["django_signedcookies"]
@@ -24,3 +26,21 @@ def test_django_negative():
         ".eJxVjLsOAiEURP-F2hAuL8HSfr-BAPciq4ZNlt3K-O9KsoU2U8w5My8W4r7VsHdaw4zswoCdfrsU84PaAHiP7bbwvLRtnRMfCj9o59OC9Lwe7t9Bjb2OtbMkAEGQtQjekykmJy9JZIW-6CgUaCGsA6eSyV65s1Qya_xGKZrY-wPVYjdw:1ojOrE:bfOktjgLlUykwCBADSECRETSMM3-UypscEN57ECtXis"
     )
     assert not found_key
+
+
+def test_django_derivekey_matches_django():
+    x = DjangoSignedCookies()
+    value, signature_bytes = x.django_load(tests[0][0])
+    # Same key Django's Signer derives, so the direct HMAC matches its signature
+    assert salted_hmac(x.django_salt + "signer", value, secret="1234", algorithm="sha256").digest() == hmac.new(
+        x.django_derivekey("1234"), value, "sha256"
+    ).digest()
+    assert len(signature_bytes) == 32
+
+
+def test_django_batch():
+    x = DjangoSignedCookies()
+    results = x.check_secrets([tests[0][0], "no-cookie", "abc:!!!"])
+    assert results[0]["details"]["_auth_user_hash"] == tests[0][1]
+    assert results[1] is None
+    assert results[2] is None
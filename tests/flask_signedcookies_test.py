@@ -1,3 +1,4 @@
+from flask_unsign.session import get_serializer
 from crapsecrets import modules_loaded
 
 FlaskSignedCookies = modules_loaded["flask_signedcookies"]
@@ -18,3 +19,17 @@ def test_flask():
         found_key = x.check_secret(test[1])
         assert found_key
         assert found_key["secret"] == test[0]
+
+
+def test_flask_derivekey_matches_itsdangerous():
+    x = FlaskSignedCookies()
+    signer = get_serializer("CHANGEME", False, "cookie-session").make_signer()
+    assert signer.derive_key() == x.flask_derivekey("CHANGEME")
+
+
+def test_flask_batch():
+    x = FlaskSignedCookies()
+    results = x.check_secrets([tests[0][1], "eyJhIjoxfQ.XDtqeQ.!!!", tests[1][1]])
+    assert results[0]["secret"] == tests[0][0]
+    assert results[1] is None
+    assert results[2]["secret"] == tests[1][0]
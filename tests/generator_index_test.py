@@ -0,0 +1,63 @@
+import os
+import tempfile
+
+from crapsecrets.helpers import Viewstate_Helpers
+from crapsecrets.generator_index import build_index, load_generator_index, lists_signature, DEFAULT_INDEX_PATH
+
+
+class SmallViewstate_Helpers(Viewstate_Helpers):
+    common_directories = ["", "error"]
+    common_pages = ["error.aspx"]
+    default_pages_large_set = ["default.aspx"]
+
+
+def test_build_and_lookup_index():
+    helpers = SmallViewstate_Helpers("http://localhost/", calculate_generator=False)
+    locations = list(helpers.common_path_params())
+    assert locations == [
+        ("/error.aspx", "/"),
+        ("/default.aspx", "/"),
+        ("/error/error.aspx", "/"),
+        ("/error/error.aspx", "/error"),
+        ("/error/default.aspx", "/"),
+        ("/error/default.aspx", "/error"),
+    ]
+    with tempfile.TemporaryDirectory() as d:
+        index_path, count = build_index(helpers, os.path.join(d, "generators.idx"))
+        assert count == len(locations)
+        index = load_generator_index(index_path)
+        assert index.signature == lists_signature(helpers)
+        assert index.signature != lists_signature(Viewstate_Helpers)
+        for path, apppath in locations:
+            generator = int(helpers.calculate_generator_value(path, apppath), 16)
+            found = list(index.lookup(generator))
+            assert (path, apppath) in found
+            assert found == [l for l in locations if int(helpers.calculate_generator_value(*l), 16) == generator]
+        generators = {int(helpers.calculate_generator_value(*l), 16) for l in locations}
+        assert list(index.lookup(next(g for g in range(len(locations) + 1) if g not in generators))) == []
+
+
+def test_shipped_index_up_to_date():
+    # Rebuild with crapsecrets-build-generator-index after changing the lists
+    index = load_generator_index(DEFAULT_INDEX_PATH)
+    assert index is not None
+    assert index.signature == lists_signature(Viewstate_Helpers)
+    assert index.count == len(list(Viewstate_Helpers("http://localhost/", calculate_generator=False).common_path_params()))
+
+
+def test_generator_found_with_index():
+    # An error page in a directory, which is not part of the URL
+    helpers = Viewstate_Helpers("http://localhost/", calculate_generator=False)
+    generator = helpers.calculate_generator_value("/errors/CustomError.aspx", "/errors")
+    path, apppath = helpers.find_valid_path_params_by_generator(generator.lower())
+    assert helpers.calculate_generator_value(path, apppath) == generator
+    assert helpers.find_valid_path_params_by_generator("not a generator") == (None, None)
+
+
+def test_invalid_index_ignored():
+    with tempfile.NamedTemporaryFile("wb", suffix=".idx", delete=False) as f:
+        f.write(b"NOTANIDX" + b"\x00" * 32)
+    try:
+        assert load_generator_index(f.name) is None
+    finally:
+        os.remove(f.name)
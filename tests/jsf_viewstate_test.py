@@ -1,3 +1,5 @@
+from Crypto.Cipher import DES3
+from Crypto.Util.Padding import pad
 from crapsecrets import modules_loaded
 
 Jsf_viewstate = modules_loaded["jsf_viewstate"]
@@ -49,6 +51,16 @@ def test_des():
     assert "3DES Encrypted" in r["details"]["info"]
 
 
+# Only the last block is decrypted to filter the 3DES keys
+def test_des3_padding_filter():
+    x = Jsf_viewstate()
+    assert x.DES3_derivekey("PASSWORD").hex() == "d7eb057758209b15c0e82283f4ac318e6f054f535e7fe337"
+    ct = DES3.new(x.DES3_derivekey("PASSWORD"), DES3.MODE_CBC, iv=b"AAAAAAAA").encrypt(pad(b"\xac\xed\x00\x05java.", 8))
+    assert x.DES3_padding_valid(ct, DES3.new(x.DES3_derivekey("PASSWORD"), DES3.MODE_ECB))
+    assert x.DES3_decrypt_derived(ct, x.DES3_derivekey("PASSWORD"))
+    assert not x.DES3_padding_valid(ct[:-1], DES3.new(x.DES3_derivekey("PASSWORD"), DES3.MODE_ECB))
+
+
 # AES Encrypted Compressed
 def test_aes_compressed():
     s = "wZC+syugf1QV9sEcnIGY+sBWqC1MPsYh7cJb5ZB1uVucJ5DuWFpZkAnP/KZrPSxWrLWjfv41aWQyfTh3DMYL8+p2Zc8S8EVhvonNtvzvN5xORNN8LI939XI6DqfAdsC7g+1EMQ5fV7oFcs9pq3kqdShVoN/u2Rem3qISST6O3R/L4hNVQrISANO942HhznEmyTpLRWjeZthSVjBr74QRTNbzyf6goTcFuz288/c+MAIQQwRoggvaWg5Ou4VXEobKz6s1NLb80YNb9lkgtXIX3zeEAvBjgjkv/A5CHnKKb68="
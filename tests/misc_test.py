@@ -1,4 +1,7 @@
-from crapsecrets.helpers import write_vlq_string
+import pytest
+
+from crapsecrets.helpers import write_vlq_string, sp800_108_derivekey, sp800_108_derivekey_cached, sp800_108_get_key_derivation_parameters
+from crapsecrets.helpers import Viewstate_Helpers, legacy_string_hashcode
 
 
 def test_vlq_encoding_multi_bytes():
@@ -8,3 +11,34 @@ def test_vlq_encoding_multi_bytes():
     assert write_vlq_string(string_16384_chars)[0:2] == bytearray(
         [0x80, 0x80]
     )  # the first two bytes should both be 0x80
+
+
+def test_sp800_108_derivekey_cached():
+    key = bytes.fromhex("B5A8EB31F5A6F2A4C8F9A1B19A7BCB0E2C9F5B8EBAB4F8D2CB8A2B0F7A6C3E9D")
+    label, context = sp800_108_get_key_derivation_parameters(
+        "WebForms.HiddenFieldPageStatePersister.ClientState", ["TemplateSourceDirectory: /", "Type: DEFAULT_ASPX"]
+    )
+    sp800_108_derivekey_cached.cache_clear()
+    expected = sp800_108_derivekey(key, label, context, len(key) * 8)
+    assert sp800_108_derivekey_cached(key, label, context, len(key) * 8) == expected
+    assert sp800_108_derivekey_cached(bytearray(key), label, context, len(key) * 8) == expected
+    assert sp800_108_derivekey_cached.cache_info().hits == 1
+    assert sp800_108_derivekey_cached(key, label, context + b"\x00", len(key) * 8) != expected
+
+
+def test_viewstate_hashcode_cached():
+    helpers = Viewstate_Helpers("http://localhost/", calculate_generator=False)
+    assert helpers.calculate_generator_value("/default.aspx", "/") == "CA0B0334"
+    # Same hash codes and sort keys as the step by step computation, directories sharing their hash state
+    for s in ["", "/", "/errors/CustomError.aspx", "/errors/Áccess-denied.aspx", "ERRORS_CUSTOMERROR_ASPX", "ß\u00adx", "aª"]:
+        sort_key = helpers.build_sort_key(s)
+        assert helpers.get_sort_key(s) == sort_key
+        assert helpers.simulate_GetNonRandomizedStringComparerHashCode(s) == helpers.legacy_hash_sort_key(sort_key)
+    hits = legacy_string_hashcode.cache_info().hits
+    helpers.simulate_GetNonRandomizedStringComparerHashCode("/errors/CustomError.aspx")
+    assert legacy_string_hashcode.cache_info().hits == hits + 1
+    # Characters without a sort key still raise
+    with pytest.raises(ValueError, match="Control character"):
+        helpers.simulate_GetNonRandomizedStringComparerHashCode("/a\tb")
+    with pytest.raises(ValueError, match="not found in mapping"):
+        helpers.simulate_GetNonRandomizedStringComparerHashCode("/€")
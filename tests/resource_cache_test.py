@@ -0,0 +1,100 @@
+import os
+import time
+import tempfile
+
+from crapsecrets import modules_loaded
+from crapsecrets.base import MachineKeyStore, ResourceCache, resource_cache
+
+Generic_JWT = modules_loaded["generic_jwt"]
+
+
+def test_load_resources_deduplicated_and_stripped():
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("secret1\nsecret2  \nsecret1\r\nsecret3")
+    try:
+        x = Generic_JWT(custom_resource=f.name)
+        lines = x.load_resources([f.name], is_custom=True)
+        assert lines == ("secret1", "secret2", "secret3")
+    finally:
+        os.remove(f.name)
+
+
+def test_load_resources_shared_between_modules():
+    a = modules_loaded["flask_signedcookies"]().load_resources(["flask_secret_keys.txt", "top_100000_passwords.txt"])
+    b = modules_loaded["django_signedcookies"]().load_resources(["top_100000_passwords.txt"])
+    assert resource_cache.load_files([os.path.abspath(__file__)]) is resource_cache.load_files(
+        [os.path.abspath(__file__)]
+    )
+    # The merged list reuses the same string objects as the per-file entry
+    assert b[0] in a
+    assert len(a) == len(set(a))
+
+
+def test_cache_invalidated_on_change():
+    cache = ResourceCache()
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("first\n")
+    try:
+        assert cache.load_file(f.name) == ("first",)
+        time.sleep(0.01)
+        with open(f.name, "w") as f2:
+            f2.write("first\nsecond\n")
+        assert cache.load_file(f.name) == ("first", "second")
+    finally:
+        os.remove(f.name)
+
+
+def test_cache_lru_eviction():
+    cache = ResourceCache(max_bytes=1000)
+    cache.put("a", ("a",), 400)
+    cache.put("b", ("b",), 400)
+    assert cache.get("a") == ("a",)
+    cache.put("c", ("c",), 400)
+    # "b" was the least recently used entry
+    assert cache.get("b") is None
+    assert cache.get("a") == ("a",)
+    assert cache.get("c") == ("c",)
+    assert cache.current_bytes == 800
+
+    # Entries larger than the cap are never stored
+    cache.put("d", ("d",), 2000)
+    assert cache.get("d") is None
+    cache.clear()
+    assert cache.current_bytes == 0
+
+
+def test_machine_key_store():
+    store = MachineKeyStore.from_lines(
+        ["# comment", "", "0A0B,0C0D0E", "AutoGenerate,1F2F", "0A0B,0C0D0E", "  ABC,1234,5678  ", "nocomma"]
+    )
+    assert store.validation == ("0A0B", "AutoGenerate", "ABC")
+    assert store.decryption == ("0C0D0E", "1F2F", "1234,5678")
+    assert [store.validation_bytes(i) for i in range(len(store))] == [b"\x0a\x0b", None, None]
+    assert [store.decryption_bytes(i) for i in range(len(store))] == [b"\x0c\x0d\x0e", b"\x1f\x2f", None]
+
+    merged = store.merged()
+    assert merged.validation == merged.decryption == ("0A0B", "AutoGenerate", "ABC", "0C0D0E", "1F2F", "1234,5678")
+    assert merged is store.merged()
+
+
+def test_machine_key_store_shared():
+    viewstate = modules_loaded["aspnet_viewstate"]()
+    store = viewstate.load_machine_keys(viewstate.machinekeyfile, True)
+    assert store is modules_loaded["telerik_hashkey"]().load_machine_keys(["aspnet_machinekeys.txt"])
+    i = store.validation.index("AutoGenerate")
+    assert store.validation_bytes(i) is None
+    assert store.decryption_bytes(i) == bytes.fromhex(store.decryption[i])
+    assert "AutoGenerate" not in modules_loaded["telerik_hashkey"]().prepare_keylist()
+
+
+def test_load_encoded_resources():
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write(" pass1\npässword  \npass1\npässword")
+    try:
+        x = Generic_JWT()
+        encoded = x.load_encoded_resources([f.name], "utf_16_le", is_custom=True)
+        assert encoded == tuple(p.encode("utf_16_le") for p in ("pass1", "pässword", "pass1"))
+        assert encoded is Generic_JWT().load_encoded_resources([f.name], "utf_16_le", is_custom=True)
+        assert Generic_JWT(shard="1/1").load_encoded_resources([f.name], "utf_16_le", is_custom=True) == encoded
+    finally:
+        os.remove(f.name)
@@ -0,0 +1,61 @@
+import os
+import time
+import tempfile
+
+from crapsecrets.base import ResourceCache
+from crapsecrets.resource_pack import build_pack, load_pack, PackedWordlist
+
+
+def write_lists(directory):
+    with open(os.path.join(directory, "a.txt"), "w") as f:
+        f.write("shared\nonly_a\nshared\n")
+    with open(os.path.join(directory, "b.txt"), "w") as f:
+        f.write("only_b\nshared\n")
+
+
+def test_build_and_read_pack():
+    with tempfile.TemporaryDirectory() as d:
+        write_lists(d)
+        pack_path, list_count, entry_count = build_pack(d)
+        assert list_count == 2
+        assert entry_count == 3
+
+        pack = load_pack(pack_path)
+        a = pack.wordlist([os.path.join(d, "a.txt")])
+        assert isinstance(a, PackedWordlist)
+        assert list(a) == ["shared", "only_a"]
+        assert "only_b" not in a
+        # In the order of the requested files, like the text files
+        assert list(pack.wordlist([os.path.join(d, "a.txt"), os.path.join(d, "b.txt")])) == ["shared", "only_a", "only_b"]
+        assert list(pack.wordlist([os.path.join(d, "b.txt"), os.path.join(d, "a.txt")])) == ["only_b", "shared", "only_a"]
+        both = pack.wordlist([os.path.join(d, "a.txt"), os.path.join(d, "b.txt")])
+        assert "only_b" in both and "only_a" in both and "missing" not in both
+
+
+def test_cache_uses_fresh_pack_only():
+    with tempfile.TemporaryDirectory() as d:
+        write_lists(d)
+        pack_path, _, _ = build_pack(d)
+        filepaths = [os.path.join(d, "a.txt"), os.path.join(d, "b.txt")]
+
+        packed = ResourceCache(pack_path=pack_path).load_files(filepaths)
+        text = ResourceCache(pack_path=None).load_files(filepaths)
+        assert isinstance(packed, PackedWordlist)
+        assert list(packed) == list(text)
+
+        # A modified wordlist is read from the text file until the pack is rebuilt
+        time.sleep(0.01)
+        with open(filepaths[1], "a") as f:
+            f.write("new_b\n")
+        lines = ResourceCache(pack_path=pack_path).load_files(filepaths)
+        assert not isinstance(lines, PackedWordlist)
+        assert "new_b" in lines
+
+
+def test_invalid_pack_ignored():
+    with tempfile.NamedTemporaryFile("wb", suffix=".pack", delete=False) as f:
+        f.write(b"NOTAPACK" + b"\x00" * 32)
+    try:
+        assert load_pack(f.name) is None
+    finally:
+        os.remove(f.name)
@@ -2,6 +2,7 @@ import pytest
 import base64
 import urllib.parse
 from crapsecrets import modules_loaded
+from crapsecrets.base import derived_key_cache
 from crapsecrets.errors import Telerik_EncryptionKey_Exception
 from crapsecrets.helpers import Csharp_pbkdf1, Csharp_pbkdf1_exception
 
@@ -98,6 +99,36 @@ def test_derive_keys_error_handling():
         derivedKey, derivedIV = x.telerik_derivekeys(b"test", "something")
 
 
+def test_derived_keylist(monkeypatch, tmp_path):
+    monkeypatch.setattr(derived_key_cache, "cache_dir", str(tmp_path))
+    monkeypatch.setattr(derived_key_cache, "_tables", {})
+    x = Telerik_EncryptionKey()
+    for key_derive_mode in ["PBKDF1_MS", "PBKDF2"]:
+        derived_keylist = x.derived_keylist(key_derive_mode)
+        assert set(derived_keylist) == set(x.prepare_keylist())
+        for testing_encryption_key in testing_encryption_keys:
+            assert derived_keylist[testing_encryption_key] == x.telerik_derivekeys(
+                testing_encryption_key, key_derive_mode
+            )
+        # Keys outside of the wordlists are still derived directly
+        assert x.telerik_derivekeys_cached("not-a-wordlist-key", key_derive_mode) == x.telerik_derivekeys(
+            "not-a-wordlist-key", key_derive_mode
+        )
+    assert len(list(tmp_path.iterdir())) == 2
+
+    with pytest.raises(Telerik_EncryptionKey_Exception):
+        x.derived_keylist("something")
+
+
+def test_derivekeys_cached_single_key(monkeypatch):
+    # Without build, a key is derived on its own rather than building the table of every wordlist key
+    x = Telerik_EncryptionKey()
+    monkeypatch.setattr(x, "derived_keylist", lambda *args: pytest.fail("derived_keylist built"))
+    assert x.telerik_derivekeys_cached(testing_encryption_keys[0], "PBKDF2") == x.telerik_derivekeys(
+        testing_encryption_keys[0], "PBKDF2"
+    )
+
+
 def test_csharp_pbkdf1_error_handling():
     # try a key that isn't bytes
     with pytest.raises(Csharp_pbkdf1_exception):
@@ -0,0 +1,70 @@
+import httpx
+
+from crapsecrets.helpers import Viewstate_Helpers, ViewstateSite, ViewstateSites
+
+
+def profile_service_client(apppaths, requests):
+    def handler(request):
+        requests.append(request.url.path)
+        if request.url.path.rsplit("/profile_json_appservice.axd/js", 1)[0] in apppaths:
+            return httpx.Response(200, text="Type.registerNamespace('Sys.Services');")
+        return httpx.Response(404)
+
+    return httpx.Client(transport=httpx.MockTransport(handler))
+
+
+def test_apppaths_probed_once_per_site():
+    site = ViewstateSite("http://example.local")
+    requests = []
+    with profile_service_client({"/shop"}, requests) as client:
+        first = Viewstate_Helpers("http://example.local/shop/cart/view.aspx", site=site)
+        assert sorted(first.find_all_apppaths_actively(client)) == ["/", "/shop"]
+        assert len(requests) == 2
+
+        # The directories of the first page are not probed again, only the new one
+        second = Viewstate_Helpers("http://example.local/shop/cart/items/list.aspx", site=site)
+        assert sorted(second.find_all_apppaths_actively(client)) == ["/", "/shop"]
+        assert requests[2:] == ["/shop/cart/items/profile_json_appservice.axd/js"]
+
+    assert site.apppath("/shop") is True
+    assert site.apppath("/shop/cart") is False
+    assert site.apppath("/other") is None
+    assert site.apppaths() == ["/shop"]
+
+
+def test_page_results_shared_by_site():
+    site = ViewstateSite("http://example.local")
+    generator = Viewstate_Helpers("http://example.local/", calculate_generator=False).calculate_generator_value(
+        "/app/default.aspx", "/app"
+    )
+    first = Viewstate_Helpers("http://example.local/app/default.aspx", generator, site=site)
+    assert (first.verified_path, first.verified_apppath) == ("/app/default.aspx", "/app")
+    assert site.apppath("/app") is True
+
+    # Another page at the same path gets the generator search result without searching
+    calls = []
+    second = Viewstate_Helpers("http://example.local/app/default.aspx", site=site)
+    assert second.site_memoize(("path_params", generator), lambda: calls.append(generator)) == ("/app/default.aspx", "/app")
+    assert calls == []
+    assert second.generators == Viewstate_Helpers("http://example.local/app/default.aspx").generators
+    assert second.get_all_specific_purposes() == second.build_all_specific_purposes()
+    second.get_all_specific_purposes()[0].append("changed")
+    assert "changed" not in second.get_all_specific_purposes()[0]
+
+
+def test_sites_per_host():
+    sites = ViewstateSites(max_sites=2)
+    site = sites.site("http://Example.local/a.aspx")
+    assert sites.site("http://example.local/b/c.aspx") is site
+    assert sites.site("https://example.local/") is not site
+    sites.site("http://other.local/")
+    assert sites.site("http://example.local/") is not site
+
+
+def test_verified_apppaths_per_page():
+    first = Viewstate_Helpers("http://example.local/app/default.aspx", calculate_generator=False)
+    first.verified_potential_apppaths.add("/app")
+    second = Viewstate_Helpers("http://other.local/app/default.aspx", calculate_generator=False)
+    assert second.verified_potential_apppaths == set()
+    assert "verified_potential_apppaths" not in vars(Viewstate_Helpers)
+    assert first.get_all_specific_purposes() != second.get_all_specific_purposes()